@@ -2,30 +2,68 @@ import logging
 from datetime import datetime
 
 from django.contrib import admin
-from django.db.models import Sum
 from django.utils.html import format_html
 from django.http import HttpResponse
 from django.template.response import TemplateResponse
-from django.db.models.functions import TruncMonth
 from import_export.formats import base_formats
 
 from rangefilter.filters import DateRangeFilter
 
-from .models import Expenses, ExpenseType
+from tenant.models import BusinessUnit, Customer
+from thot.admin_actions import (
+    FastDeleteMixin,
+    fast_delete_selected,
+    soft_delete_selected,
+)
+from thot.admin_filters import CachedRelatedFieldListFilter
+from thot.conditional import ConditionalChangelistMixin
+
+from .budget import annotate_month_spend, over_budget_q
+from .models import Expenses, ExpenseType, ExpenseTypeMonthlySpend
 from .resources import ExpensesResource
+from .stats import get_expense_totals
 
 logger = logging.getLogger(__name__)
 
 
+class OverBudgetFilter(admin.SimpleListFilter):
+    """
+    Filtra según lo gastado en el mes (tipo y unidad) supere o no el límite
+    del tipo de gasto
+    """
+    title = 'presupuesto del mes'
+    parameter_name = 'presupuesto'
+    # Campo con lo gastado en el mes en el modelo filtrado
+    amount_field = 'amount'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('excedido', 'Excedido'),
+            ('dentro', 'Dentro del límite'),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == 'excedido':
+            return queryset.filter(over_budget_q(self.amount_field))
+        if self.value() == 'dentro':
+            return queryset.exclude(over_budget_q(self.amount_field))
+        return queryset
+
+
+class ExpenseOverBudgetFilter(OverBudgetFilter):
+    amount_field = 'month_spend'
+
+
 @admin.register(ExpenseType)
 class ExpenseTypeAdmin(admin.ModelAdmin):
-    list_display = ['code', 'name']
-    search_fields = ['code', 'name']
+    list_display = ['code', 'name', 'limit']
+    search_fields = ['^code', '^name']
     ordering = ['name']
+    actions = [soft_delete_selected]
 
 
 @admin.register(Expenses)
-class ExpensesAdmin(admin.ModelAdmin):
+class ExpensesAdmin(ConditionalChangelistMixin, FastDeleteMixin, admin.ModelAdmin):
     list_display = [
         'date',
         'business_unit_display',
@@ -36,10 +74,11 @@ class ExpensesAdmin(admin.ModelAdmin):
 
     list_filter = [
         ('date', DateRangeFilter),
-        'business_unit',
-        'business_unit__customer',
-        'expense_type',
-        'is_fixed'
+        ('business_unit', CachedRelatedFieldListFilter),
+        ('business_unit__customer', CachedRelatedFieldListFilter),
+        ('expense_type', CachedRelatedFieldListFilter),
+        'is_fixed',
+        ExpenseOverBudgetFilter
     ]
 
     search_fields = [
@@ -49,12 +88,15 @@ class ExpensesAdmin(admin.ModelAdmin):
         'business_unit__customer__name'
     ]
 
+    autocomplete_fields = ['business_unit', 'expense_type', 'supplier']
+
     fieldsets = (
         ('Información Principal', {
             'fields': (
                 'date',
                 'business_unit',
                 'expense_type',
+                'supplier',
                 'amount',
                 'is_fixed'
             )
@@ -107,16 +149,16 @@ class ExpensesAdmin(admin.ModelAdmin):
         """
         Optimización de consultas y filtrado por unidad de negocio del usuario
         """
-        queryset = super().get_queryset(request)
+        queryset = annotate_month_spend(super().get_queryset(request))
 
         # Si el usuario es superusuario, mostrar todos los registros
         if request.user.is_superuser:
-            return queryset.select_related('business_unit', 'expense_type')
+            return queryset.select_related('business_unit', 'expense_type', 'supplier')
 
         # Usar el filtro de unidad de negocio del middleware
         return queryset.filter(
             request.business_unit_filter
-        ).select_related('business_unit', 'expense_type')
+        ).select_related('business_unit', 'expense_type', 'supplier')
 
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
@@ -138,11 +180,7 @@ class ExpensesAdmin(admin.ModelAdmin):
         Muestra la unidad de negocio con formato especial
         """
         return format_html(
-            '<div class="business-unit-container">'
-            '<span style="background-color: #4A90E2; color: white; padding: 4px 12px; '
-            'border-radius: 4px; display: inline-block; min-width: 100px; '
-            'text-align: center; font-weight: 500;">{}</span>'
-            '</div>',
+            '<span class="badge badge-blue">{}</span>',
             obj.business_unit.name if obj.business_unit else 'Sin unidad'
         )
     business_unit_display.short_description = 'Unidad de Negocio'
@@ -189,23 +227,14 @@ class ExpensesAdmin(admin.ModelAdmin):
             return '#000000' if luminance > 0.5 else '#FFFFFF'
 
         if not obj.expense_type:
-            return format_html(
-                '<div class="expense-type-container">'
-                '<span style="background-color: #E6E6E6; color: #000000; padding: 4px 12px; '
-                'border-radius: 4px; display: inline-block; min-width: 100px; '
-                'text-align: center; font-weight: 500;">Sin tipo</span>'
-                '</div>'
-            )
+            return format_html('<span class="badge badge-muted">Sin tipo</span>')
 
         bg_color = generate_color_from_code(obj.expense_type.code)
         text_color = get_text_color(bg_color)
 
+        # El color depende del código, así que va como variable de la clase
         return format_html(
-            '<div class="expense-type-container">'
-            '<span style="background-color: {}; color: {}; padding: 4px 12px; '
-            'border-radius: 4px; display: inline-block; min-width: 100px; '
-            'text-align: center; font-weight: 500;">{}</span>'
-            '</div>',
+            '<span class="badge" style="--badge-bg:{};--badge-fg:{}">{}</span>',
             bg_color,
             text_color,
             obj.expense_type.name
@@ -215,22 +244,27 @@ class ExpensesAdmin(admin.ModelAdmin):
     def amount_display(self, obj):
         """
         Formatea el monto con color según su valor y alineación correcta.
-        Si el tipo de gasto tiene un límite definido,
-        muestra en rojo cuando se excede.
-        Si no hay límite definido, muestra en verde.
+        Si el tipo de gasto tiene un límite definido, muestra en rojo cuando
+        lo gastado en el mes (tipo y unidad de negocio) lo excede, con el
+        acumulado del mes debajo. Si no hay límite definido, muestra en verde.
         """
         formatted_amount = "${:,.2f}".format(float(obj.amount))
 
-        # Verifica si existe un tipo de gasto y si tiene límite definido
-        if obj.expense_type and obj.expense_type.limit is not None:
-            color = 'red' if obj.amount > obj.expense_type.limit else 'green'
-        else:
-            color = 'green'
+        limit = obj.expense_type.limit if obj.expense_type else None
+        month_spend = getattr(obj, 'month_spend', None)
+        if limit is None or month_spend is None:
+            return format_html(
+                '<div class="amount-cell amount-ok">{}</div>',
+                formatted_amount
+            )
 
         return format_html(
-            '<div class="amount-cell" style="color:{};">{}</div>',
-            color,
-            formatted_amount
+            '<div class="amount-cell {}">{}'
+            '<br><small>Mes: {} de {}</small></div>',
+            'amount-over' if month_spend > limit else 'amount-ok',
+            formatted_amount,
+            "${:,.2f}".format(float(month_spend)),
+            "${:,.2f}".format(float(limit))
         )
     amount_display.short_description = 'Monto'
 
@@ -256,42 +290,29 @@ class ExpensesAdmin(admin.ModelAdmin):
                     """
                     return f"${amount:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
+                stats = get_expense_totals(queryset)
                 totales = {
-                    'total': format_amount(
-                        queryset.aggregate(total=Sum('amount'))['total'] or 0
-                    ),
+                    'total': format_amount(stats['total']),
                     'por_mes': [
                         {
                             'mes': mes['mes'],
                             'total': format_amount(mes['total'])
                         }
-                        for mes in queryset.annotate(
-                            mes=TruncMonth('date')
-                        ).values('mes').annotate(
-                            total=Sum('amount')
-                        ).order_by('-mes')[:3]
+                        for mes in stats['por_mes']
                     ],
                     'por_categoria': [
                         {
                             'nombre': cat['expense_type__name'],
                             'total': format_amount(cat['total'])
                         }
-                        for cat in queryset.values(
-                            'expense_type__name'
-                        ).annotate(
-                            total=Sum('amount')
-                        ).order_by('-total')
+                        for cat in stats['por_categoria']
                     ],
                     'por_unidad': [
                         {
                             'nombre': unit['business_unit__name'] if unit['business_unit__name'] else 'Sin unidad',
                             'total': format_amount(unit['total'])
                         }
-                        for unit in queryset.values(
-                            'business_unit__name'
-                        ).annotate(
-                            total=Sum('amount')
-                        ).order_by('-total')
+                        for unit in stats['por_unidad']
                     ]
                 }
 
@@ -308,6 +329,86 @@ class ExpensesAdmin(admin.ModelAdmin):
 
         return response
 
-    actions = [export_selected_to_csv, export_selected_to_excel]
+    actions = [
+        export_selected_to_csv,
+        export_selected_to_excel,
+        soft_delete_selected,
+        fast_delete_selected
+    ]
     ordering = ['-date']
     list_per_page = 20
+    conditional_related_models = (BusinessUnit, Customer, ExpenseType)
+
+    class Media:
+        css = {'all': ('css/admin_badges.css',)}
+
+
+@admin.register(ExpenseTypeMonthlySpend)
+class ExpenseTypeMonthlySpendAdmin(admin.ModelAdmin):
+    """
+    Reporte de presupuesto: gastado por tipo, unidad de negocio y mes
+    contra el límite del tipo. Se lee de los contadores mensuales
+    """
+    list_display = (
+        'month_display',
+        'business_unit',
+        'expense_type',
+        'expense_count',
+        'amount_display',
+        'limit_display',
+        'usage_display'
+    )
+    list_filter = (
+        OverBudgetFilter,
+        ('business_unit__customer', CachedRelatedFieldListFilter),
+        ('business_unit', CachedRelatedFieldListFilter),
+        ('expense_type', CachedRelatedFieldListFilter)
+    )
+    list_select_related = ('business_unit', 'business_unit__customer', 'expense_type')
+    date_hierarchy = 'month'
+    ordering = ('-month', 'business_unit', 'expense_type')
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).filter(expense_count__gt=0)
+        if request.user.is_superuser:
+            return queryset
+        return queryset.filter(request.business_unit_filter)
+
+    def month_display(self, obj):
+        return obj.month.strftime('%m/%Y')
+    month_display.short_description = 'Mes'
+    month_display.admin_order_field = 'month'
+
+    def amount_display(self, obj):
+        return format_html(
+            '<span class="{}">${}</span>',
+            'amount-over' if obj.is_over_budget else 'amount-ok',
+            '{:,.2f}'.format(float(obj.amount))
+        )
+    amount_display.short_description = 'Gastado'
+    amount_display.admin_order_field = 'amount'
+
+    def limit_display(self, obj):
+        if obj.limit is None:
+            return '-'
+        return '${:,.2f}'.format(float(obj.limit))
+    limit_display.short_description = 'Límite'
+    limit_display.admin_order_field = 'expense_type__limit'
+
+    def usage_display(self, obj):
+        if not obj.limit:
+            return '-'
+        return f'{obj.amount / obj.limit * 100:.0f}%'
+    usage_display.short_description = 'Uso'
+
+    class Media:
+        css = {'all': ('css/admin_badges.css',)}
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
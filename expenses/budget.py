@@ -0,0 +1,33 @@
+"""
+Consultas de presupuesto sobre los contadores mensuales de
+ExpenseTypeMonthlySpend (no suman la tabla de gastos)
+"""
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import TruncMonth
+
+from .models import ExpenseTypeMonthlySpend
+
+
+def annotate_month_spend(queryset):
+    """
+    Agrega month_spend: lo gastado en el mes del gasto para su tipo y
+    unidad de negocio
+    """
+    return queryset.annotate(
+        spend_month=TruncMonth('date')
+    ).annotate(
+        month_spend=Subquery(
+            ExpenseTypeMonthlySpend.objects.filter(
+                expense_type_id=OuterRef('expense_type_id'),
+                business_unit_id=OuterRef('business_unit_id'),
+                month=OuterRef('spend_month')
+            ).values('amount')[:1]
+        )
+    )
+
+
+def over_budget_q(amount='month_spend', limit='expense_type__limit'):
+    """
+    Filtro de lo que supera el límite del tipo de gasto
+    """
+    return Q(**{f'{limit}__isnull': False, f'{amount}__gt': F(limit)})
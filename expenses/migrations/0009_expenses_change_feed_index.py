@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0008_expensetype_limit'),
+        ('tenant', '0004_alter_businessunituser_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expenses',
+            index=models.Index(fields=['business_unit', 'updated_at', 'id'], name='expenses_bu_updated_id_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0009_expenses_change_feed_index'),
+        ('tenant', '0004_alter_businessunituser_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expenses',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['business_unit', '-date'], name='expenses_live_bu_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenses',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['-date'], name='expenses_live_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expensetype',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['name'], name='expensetype_live_name_idx'),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+
+# Filas de una tabla de transición que cuentan para el presupuesto, con el
+# signo indicado (+1 altas, -1 bajas)
+DELTA_ROWS = """
+    SELECT
+        expense_type_id,
+        business_unit_id,
+        date_trunc('month', date)::date AS month,
+        {sign} * amount AS amount,
+        {sign} AS expense_count
+    FROM {table}
+    WHERE deleted_at IS NULL
+        AND expense_type_id IS NOT NULL
+        AND business_unit_id IS NOT NULL
+"""
+
+# Suma la diferencia agrupada por mes; el orden fijo evita deadlocks entre
+# sentencias concurrentes que tocan los mismos contadores
+APPLY_DELTA = """
+    INSERT INTO expenses_expensetypemonthlyspend
+        (expense_type_id, business_unit_id, month, amount, expense_count)
+    SELECT expense_type_id, business_unit_id, month, SUM(amount), SUM(expense_count)
+    FROM ({rows}) delta
+    GROUP BY expense_type_id, business_unit_id, month
+    HAVING SUM(amount) <> 0 OR SUM(expense_count) <> 0
+    ORDER BY expense_type_id, business_unit_id, month
+    ON CONFLICT (expense_type_id, business_unit_id, month) DO UPDATE SET
+        amount = expenses_expensetypemonthlyspend.amount + EXCLUDED.amount,
+        expense_count = (
+            expenses_expensetypemonthlyspend.expense_count + EXCLUDED.expense_count
+        );
+"""
+
+CREATE_TRIGGER_SQL = f"""
+CREATE FUNCTION expenses_apply_spend_delta() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {APPLY_DELTA.format(rows=DELTA_ROWS.format(sign=1, table='new_rows'))}
+    ELSIF TG_OP = 'DELETE' THEN
+        {APPLY_DELTA.format(rows=DELTA_ROWS.format(sign=-1, table='old_rows'))}
+    ELSE
+        {APPLY_DELTA.format(rows=DELTA_ROWS.format(sign=1, table='new_rows') +
+            ' UNION ALL ' + DELTA_ROWS.format(sign=-1, table='old_rows'))}
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER expenses_insert_spend
+    AFTER INSERT ON expenses_expenses
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION expenses_apply_spend_delta();
+
+CREATE TRIGGER expenses_delete_spend
+    AFTER DELETE ON expenses_expenses
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION expenses_apply_spend_delta();
+
+CREATE TRIGGER expenses_update_spend
+    AFTER UPDATE ON expenses_expenses
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION expenses_apply_spend_delta();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER expenses_update_spend ON expenses_expenses;
+DROP TRIGGER expenses_delete_spend ON expenses_expenses;
+DROP TRIGGER expenses_insert_spend ON expenses_expenses;
+DROP FUNCTION expenses_apply_spend_delta();
+"""
+
+# Carga inicial con los gastos existentes
+BACKFILL_SQL = APPLY_DELTA.format(
+    rows=DELTA_ROWS.format(sign=1, table='expenses_expenses')
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0010_expenses_live_partial_indexes'),
+        ('tenant', '0005_customer_reporting_currency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseTypeMonthlySpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Mes')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Gastado')),
+                ('expense_count', models.IntegerField(default=0, verbose_name='Cantidad de gastos')),
+                ('business_unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expense_monthly_spend', to='tenant.businessunit', verbose_name='Unidad de Negocio')),
+                ('expense_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_spend', to='expenses.expensetype', verbose_name='Tipo de gasto')),
+            ],
+            options={
+                'verbose_name': 'Presupuesto mensual',
+                'verbose_name_plural': 'Presupuesto mensual',
+                'ordering': ['-month', 'business_unit', 'expense_type'],
+                'indexes': [models.Index(fields=['business_unit', '-month'], name='expensespend_bu_month_idx')],
+                'constraints': [models.UniqueConstraint(fields=('expense_type', 'business_unit', 'month'), name='unique_expense_monthly_spend')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, reverse_sql=DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+
+# Mismo esquema que el presupuesto (0011): cada sentencia suma a
+# Supplier.spend_total solo la diferencia de las filas que tocó
+DELTA_ROWS = """
+    SELECT supplier_id, {sign} * amount AS amount, {sign} AS expense_count
+    FROM {table}
+    WHERE deleted_at IS NULL AND supplier_id IS NOT NULL
+"""
+
+# Los proveedores se bloquean en orden de id para evitar deadlocks entre
+# sentencias concurrentes
+APPLY_DELTA = """
+    WITH delta AS (
+        SELECT supplier_id, SUM(amount) AS amount, SUM(expense_count) AS expense_count
+        FROM ({rows}) changed
+        GROUP BY supplier_id
+        HAVING SUM(amount) <> 0 OR SUM(expense_count) <> 0
+    ), locked AS (
+        SELECT supplier.id
+        FROM suppliers_supplier supplier
+        WHERE supplier.id IN (SELECT supplier_id FROM delta)
+        ORDER BY supplier.id
+        FOR UPDATE
+    )
+    UPDATE suppliers_supplier supplier SET
+        spend_total = supplier.spend_total + delta.amount,
+        expense_count = supplier.expense_count + delta.expense_count
+    FROM delta
+    WHERE supplier.id = delta.supplier_id
+        AND supplier.id IN (SELECT id FROM locked);
+"""
+
+CREATE_TRIGGER_SQL = f"""
+CREATE FUNCTION expenses_apply_supplier_spend_delta() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {APPLY_DELTA.format(rows=DELTA_ROWS.format(sign=1, table='new_rows'))}
+    ELSIF TG_OP = 'DELETE' THEN
+        {APPLY_DELTA.format(rows=DELTA_ROWS.format(sign=-1, table='old_rows'))}
+    ELSE
+        {APPLY_DELTA.format(rows=DELTA_ROWS.format(sign=1, table='new_rows') +
+            ' UNION ALL ' + DELTA_ROWS.format(sign=-1, table='old_rows'))}
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER expenses_insert_supplier_spend
+    AFTER INSERT ON expenses_expenses
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION expenses_apply_supplier_spend_delta();
+
+CREATE TRIGGER expenses_delete_supplier_spend
+    AFTER DELETE ON expenses_expenses
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION expenses_apply_supplier_spend_delta();
+
+CREATE TRIGGER expenses_update_supplier_spend
+    AFTER UPDATE ON expenses_expenses
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION expenses_apply_supplier_spend_delta();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER expenses_update_supplier_spend ON expenses_expenses;
+DROP TRIGGER expenses_delete_supplier_spend ON expenses_expenses;
+DROP TRIGGER expenses_insert_supplier_spend ON expenses_expenses;
+DROP FUNCTION expenses_apply_supplier_spend_delta();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0011_expense_monthly_spend'),
+        ('suppliers', '0005_supplier_trigram_spend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expenses',
+            name='supplier',
+            field=models.ForeignKey(blank=True, help_text='Proveedor al que corresponde el gasto', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='expenses', to='suppliers.supplier', verbose_name='Proveedor'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, reverse_sql=DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:27
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0012_expenses_supplier'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expensetype',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), condition=models.Q(('deleted_at__isnull', True)), name='expensetype_upper_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expensetype',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('code'), name='text_pattern_ops'), condition=models.Q(('deleted_at__isnull', True)), name='expensetype_upper_code_idx'),
+        ),
+    ]
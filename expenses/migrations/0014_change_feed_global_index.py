@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0013_expensetype_upper_prefix_indexes'),
+        ('suppliers', '0005_supplier_trigram_spend'),
+        ('tenant', '0006_upper_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expenses',
+            index=models.Index(fields=['updated_at', 'id'], name='expenses_updated_id_idx'),
+        ),
+    ]
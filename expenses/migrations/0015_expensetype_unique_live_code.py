@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-19 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0014_change_feed_global_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expensetype',
+            name='code',
+            field=models.CharField(help_text='Código único para el tipo de gasto', max_length=3, verbose_name='Código'),
+        ),
+        migrations.AddConstraint(
+            model_name='expensetype',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('code',), name='unique_live_expensetype_code'),
+        ),
+    ]
@@ -1,6 +1,10 @@
+from django.core.exceptions import ValidationError
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
+from suppliers.models import Supplier
 from thot.models import TimestampsMixin
 from tenant.models import BusinessUnit
 
@@ -8,7 +12,6 @@ from tenant.models import BusinessUnit
 class ExpenseType(TimestampsMixin):
     code = models.CharField(
         max_length=3,
-        unique=True,
         verbose_name=_('Código'),
         help_text=_('Código único para el tipo de gasto')
     )
@@ -32,6 +35,34 @@ class ExpenseType(TimestampsMixin):
         verbose_name = _('Tipo de Gasto')
         verbose_name_plural = _('Tipos de Gastos')
         ordering = ['name']
+        indexes = [
+            models.Index(
+                fields=['name'],
+                name='expensetype_live_name_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            # Búsqueda por prefijo del autocompletado (^name, ^code):
+            # istartswith compara UPPER(...) LIKE 'TEXTO%'
+            models.Index(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='expensetype_upper_name_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            models.Index(
+                OpClass(Upper('code'), name='text_pattern_ops'),
+                name='expensetype_upper_code_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+        ]
+        # Solo entre los vigentes, como valida Django con el manager por
+        # defecto: un tipo eliminado no bloquea su código
+        constraints = [
+            models.UniqueConstraint(
+                fields=['code'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='unique_live_expensetype_code'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -62,6 +93,16 @@ class Expenses(TimestampsMixin):
         blank=True
     )
 
+    supplier = models.ForeignKey(
+        Supplier,
+        on_delete=models.PROTECT,
+        verbose_name=_('Proveedor'),
+        help_text=_('Proveedor al que corresponde el gasto'),
+        related_name='expenses',
+        null=True,
+        blank=True
+    )
+
     amount = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -85,6 +126,37 @@ class Expenses(TimestampsMixin):
         verbose_name = _('Gasto')
         verbose_name_plural = _('Gastos')
         ordering = ['-date']
+        indexes = [
+            models.Index(
+                fields=['business_unit', 'updated_at', 'id'],
+                name='expenses_bu_updated_id_idx'
+            ),
+            # Feed de cambios de superusuarios y de varias unidades
+            models.Index(
+                fields=['updated_at', 'id'],
+                name='expenses_updated_id_idx'
+            ),
+            models.Index(
+                fields=['business_unit', '-date'],
+                name='expenses_live_bu_date_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            models.Index(
+                fields=['-date'],
+                name='expenses_live_date_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+        ]
+
+    def clean(self):
+        super().clean()
+        if (
+            self.supplier_id and self.business_unit_id and
+            self.supplier.business_unit_id not in (None, self.business_unit_id)
+        ):
+            raise ValidationError({
+                'supplier': _('El proveedor pertenece a otra unidad de negocio.')
+            })
 
     def __str__(self):
         if self.business_unit and self.expense_type:
@@ -95,3 +167,60 @@ class Expenses(TimestampsMixin):
             return f"Sin unidad - {self.expense_type.name} - {self.date} - ${self.amount}"
         else:
             return f"Sin unidad - Sin tipo - {self.date} - ${self.amount}"
+
+
+class ExpenseTypeMonthlySpend(models.Model):
+    """
+    Gasto acumulado por tipo, unidad de negocio y mes, para compararlo con
+    ExpenseType.limit. Lo mantiene un trigger de la base sumando la
+    diferencia de cada alta, cambio o baja (migración 0011), así que nunca
+    se vuelve a sumar la tabla de gastos
+    """
+    expense_type = models.ForeignKey(
+        ExpenseType,
+        on_delete=models.CASCADE,
+        verbose_name=_('Tipo de gasto'),
+        related_name='monthly_spend'
+    )
+    business_unit = models.ForeignKey(
+        BusinessUnit,
+        on_delete=models.CASCADE,
+        verbose_name=_('Unidad de Negocio'),
+        related_name='expense_monthly_spend'
+    )
+    month = models.DateField(_('Mes'))
+    amount = models.DecimalField(
+        _('Gastado'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    expense_count = models.IntegerField(_('Cantidad de gastos'), default=0)
+
+    class Meta:
+        verbose_name = _('Presupuesto mensual')
+        verbose_name_plural = _('Presupuesto mensual')
+        ordering = ['-month', 'business_unit', 'expense_type']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['expense_type', 'business_unit', 'month'],
+                name='unique_expense_monthly_spend'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['business_unit', '-month'],
+                name='expensespend_bu_month_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.business_unit} - {self.expense_type} - {self.month:%m/%Y}"
+
+    @property
+    def limit(self):
+        return self.expense_type.limit
+
+    @property
+    def is_over_budget(self):
+        return self.limit is not None and self.amount > self.limit
@@ -2,6 +2,7 @@ from import_export import resources, fields
 from import_export.widgets import ForeignKeyWidget, DateWidget
 
 from .models import Expenses, ExpenseType
+from suppliers.models import Supplier
 from tenant.models import BusinessUnit
 
 
@@ -26,6 +27,12 @@ class ExpensesResource(resources.ModelResource):
         widget=ForeignKeyWidget(ExpenseType, 'name')
     )
 
+    supplier = fields.Field(
+        column_name='CUIT Proveedor',
+        attribute='supplier',
+        widget=ForeignKeyWidget(Supplier, 'tax_id')
+    )
+
     date = fields.Field(
         column_name='Fecha',
         attribute='date',
@@ -55,12 +62,12 @@ class ExpensesResource(resources.ModelResource):
     class Meta:
         model = Expenses
         fields = (
-            'id', 'date', 'business_unit', 'expense_type',
+            'id', 'date', 'business_unit', 'expense_type', 'supplier',
             'amount', 'is_fixed', 'observations',
             'created_at',
         )
         export_order = (
-            'id', 'date', 'business_unit', 'expense_type',
+            'id', 'date', 'business_unit', 'expense_type', 'supplier',
             'amount', 'is_fixed', 'observations',
             'created_at',
         )
@@ -0,0 +1,75 @@
+from rest_framework import serializers
+
+from suppliers.models import Supplier
+from thot.api import (
+    BusinessUnitScopedSerializer,
+    DynamicFieldsModelSerializer,
+    get_user_business_unit_ids,
+)
+from .models import Expenses, ExpenseType
+
+
+class ExpenseTypeSerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = ExpenseType
+        fields = ('id', 'code', 'name', 'limit', 'created_at', 'updated_at')
+        read_only_fields = ('created_at', 'updated_at')
+
+
+class ExpensesSerializer(BusinessUnitScopedSerializer):
+    business_unit_name = serializers.CharField(
+        source='business_unit.name',
+        read_only=True,
+        default=None
+    )
+    expense_type_name = serializers.CharField(
+        source='expense_type.name',
+        read_only=True,
+        default=None
+    )
+
+    supplier_name = serializers.CharField(
+        source='supplier.business_name',
+        read_only=True,
+        default=None
+    )
+
+    class Meta:
+        model = Expenses
+        fields = (
+            'id', 'date', 'business_unit', 'business_unit_name',
+            'expense_type', 'expense_type_name', 'supplier', 'supplier_name',
+            'amount', 'is_fixed', 'observations', 'created_at', 'updated_at'
+        )
+        read_only_fields = ('created_at', 'updated_at')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get('request')
+        field = self.fields.get('supplier')
+        if (
+            request is None or
+            not isinstance(field, serializers.RelatedField) or
+            request.user.is_superuser
+        ):
+            return
+
+        field.queryset = Supplier.objects.filter(
+            business_unit_id__in=get_user_business_unit_ids(request.user)
+        )
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        supplier = attrs.get('supplier', getattr(self.instance, 'supplier', None))
+        business_unit = attrs.get(
+            'business_unit', getattr(self.instance, 'business_unit', None)
+        )
+        if (
+            supplier and business_unit and
+            supplier.business_unit_id not in (None, business_unit.id)
+        ):
+            raise serializers.ValidationError({
+                'supplier': 'El proveedor pertenece a otra unidad de negocio.'
+            })
+        return attrs
@@ -0,0 +1,43 @@
+"""
+Estadísticas de gastos compartidas por el pie del changelist y la API
+"""
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def _grouped_totals(queryset):
+    return {
+        'por_mes': queryset.annotate(
+            mes=TruncMonth('date')
+        ).values('mes').annotate(
+            total=Sum('amount')
+        ).order_by('-mes')[:3],
+        'por_categoria': queryset.values(
+            'expense_type__name'
+        ).annotate(
+            total=Sum('amount')
+        ).order_by('-total'),
+        'por_unidad': queryset.values(
+            'business_unit__name'
+        ).annotate(
+            total=Sum('amount')
+        ).order_by('-total'),
+    }
+
+
+def get_expense_totals(queryset):
+    totals = {
+        'total': queryset.aggregate(total=Sum('amount'))['total'] or 0
+    }
+    for name, grouped in _grouped_totals(queryset).items():
+        totals[name] = list(grouped)
+    return totals
+
+
+async def aget_expense_totals(queryset):
+    totals = {
+        'total': (await queryset.aaggregate(total=Sum('amount')))['total'] or 0
+    }
+    for name, grouped in _grouped_totals(queryset).items():
+        totals[name] = [row async for row in grouped]
+    return totals
@@ -1,3 +1,199 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.urls import reverse
+
+from tenant.models import BusinessUnit, BusinessUnitUser, Customer
+
+from .budget import annotate_month_spend, over_budget_q
+from .models import Expenses, ExpenseType, ExpenseTypeMonthlySpend
+
+
+class BudgetTests(TestCase):
+    """
+    El trigger de la migración 0011 mantiene lo gastado por tipo, unidad y
+    mes en cualquier alta, cambio o baja
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(
+            name=f'Empresa {cls.__name__}', email='empresa@example.com'
+        )
+        cls.business_unit = BusinessUnit.objects.create(customer=customer, name='Propia')
+        cls.expense_type = ExpenseType.objects.create(
+            code='BDG', name='Publicidad', limit=Decimal('100')
+        )
+        cls.other_type = ExpenseType.objects.create(code='BDO', name='Alquiler')
+
+    def create_expense(self, amount, **fields):
+        fields.setdefault('date', date(2025, 3, 10))
+        fields.setdefault('expense_type', self.expense_type)
+        return Expenses.objects.create(
+            business_unit=self.business_unit, amount=Decimal(amount), **fields
+        )
+
+    def spend(self):
+        return {
+            (row.expense_type.code, row.month): (row.amount, row.expense_count)
+            for row in ExpenseTypeMonthlySpend.objects.filter(
+                business_unit=self.business_unit
+            ).select_related('expense_type')
+            if row.expense_count
+        }
+
+    def test_insert_update_and_delete(self):
+        march = date(2025, 3, 1)
+        expense = self.create_expense('60')
+        self.create_expense('50')
+        self.create_expense('5', expense_type=None)
+        self.assertEqual(self.spend(), {('BDG', march): (Decimal('110.00'), 2)})
+
+        Expenses.objects.filter(pk=expense.pk).update(amount=Decimal('30'))
+        self.assertEqual(self.spend(), {('BDG', march): (Decimal('80.00'), 2)})
+
+        Expenses.objects.filter(pk=expense.pk).update(
+            date=date(2025, 4, 2), expense_type=self.other_type
+        )
+        self.assertEqual(self.spend(), {
+            ('BDG', march): (Decimal('50.00'), 1),
+            ('BDO', date(2025, 4, 1)): (Decimal('30.00'), 1),
+        })
+
+        expense.soft_delete()
+        self.assertEqual(self.spend(), {('BDG', march): (Decimal('50.00'), 1)})
+        expense.restore()
+        self.assertEqual(len(self.spend()), 2)
+
+        Expenses.all_objects.filter(business_unit=self.business_unit).delete()
+        self.assertEqual(self.spend(), {})
+
+    def test_bulk_create_is_one_delta(self):
+        Expenses.objects.bulk_create([
+            Expenses(
+                business_unit=self.business_unit, expense_type=self.expense_type,
+                date=date(2025, 3, day), amount=Decimal('10')
+            )
+            for day in range(1, 11)
+        ])
+        self.assertEqual(
+            self.spend(), {('BDG', date(2025, 3, 1)): (Decimal('100.00'), 10)}
+        )
+
+    def test_over_budget(self):
+        within = self.create_expense('60')
+        over = [
+            self.create_expense('60', date=date(2025, 5, 1)),
+            self.create_expense('50', date=date(2025, 5, 2)),
+        ]
+
+        queryset = annotate_month_spend(
+            Expenses.objects.filter(business_unit=self.business_unit)
+        )
+        self.assertEqual(queryset.get(pk=within.pk).month_spend, Decimal('60.00'))
+        self.assertEqual(
+            set(queryset.filter(over_budget_q()).values_list('pk', flat=True)),
+            {expense.pk for expense in over}
+        )
+        self.assertTrue(
+            ExpenseTypeMonthlySpend.objects.get(
+                business_unit=self.business_unit, month=date(2025, 5, 1)
+            ).is_over_budget
+        )
+
+    def test_changelist_budget_filter(self):
+        self.create_expense('120')
+        admin = User.objects.create_superuser('budget-admin', 'admin@example.com', 'x')
+        cache.clear()
+        self.client.force_login(admin)
+
+        response = self.client.get(
+            reverse('admin:expenses_expenses_changelist'),
+            {'presupuesto': 'excedido', 'business_unit__id__exact': self.business_unit.pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'amount-over')
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+        response = self.client.get(
+            reverse('admin:expenses_expensetypemonthlyspend_changelist'),
+            {'presupuesto': 'excedido'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Publicidad')
+
+
+class ExpenseTypeCodeTests(TestCase):
+    """
+    El código es único solo entre los tipos vigentes
+    """
+
+    def test_code_of_deleted_type_reused(self):
+        ExpenseType.objects.create(code='UNQ', name='Viejo').soft_delete()
+        expense_type = ExpenseType(code='UNQ', name='Nuevo')
+        expense_type.full_clean()
+        expense_type.save()
+
+        duplicate = ExpenseType(code='UNQ', name='Repetido')
+        with self.assertRaises(ValidationError):
+            duplicate.full_clean()
+
+
+class MonthlySpendAdminTests(TestCase):
+    """
+    Los filtros del reporte de presupuesto solo ofrecen las unidades y
+    empresas del operador
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(
+            name=f'Empresa {cls.__name__}', email='empresa@example.com'
+        )
+        foreign_customer = Customer.objects.create(
+            name=f'Ajena {cls.__name__}', email='ajena@example.com'
+        )
+        second_customer = Customer.objects.create(
+            name=f'Segunda {cls.__name__}', email='segunda@example.com'
+        )
+        cls.own_units = [
+            BusinessUnit.objects.create(customer=customer, name='Propia'),
+            BusinessUnit.objects.create(customer=second_customer, name='Segunda'),
+        ]
+        BusinessUnit.objects.create(customer=foreign_customer, name='Ajena')
+        cls.operator = User.objects.create_user(
+            f'{cls.__name__}-operator', 'operator@example.com', 'x', is_staff=True
+        )
+        cls.operator.user_permissions.set(Permission.objects.filter(
+            content_type__app_label='expenses'
+        ))
+        for business_unit in cls.own_units:
+            BusinessUnitUser.objects.create(
+                user=cls.operator, business_unit=business_unit
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.operator)
 
-# Create your tests here.
+    def test_filter_choices_scoped(self):
+        response = self.client.get(
+            reverse('admin:expenses_expensetypemonthlyspend_changelist')
+        )
+        self.assertEqual(response.status_code, 200)
+        choices = {
+            spec.field_path: {pk for pk, _ in spec.lookup_choices}
+            for spec in response.context['cl'].filter_specs
+            if hasattr(spec, 'field_path')
+        }
+        self.assertEqual(
+            choices['business_unit'], {unit.pk for unit in self.own_units}
+        )
+        self.assertEqual(
+            choices['business_unit__customer'],
+            {unit.customer_id for unit in self.own_units}
+        )
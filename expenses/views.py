@@ -1,3 +1,42 @@
-from django.shortcuts import render
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import viewsets
 
-# Create your views here.
+from suppliers.models import Supplier
+from tenant.models import BusinessUnit, Customer
+from thot.api import (
+    BusinessUnitScopedViewSet, ascope_queryset, async_api_view,
+    conditional_api_view, filter_stats_queryset
+)
+
+from .models import Expenses, ExpenseType
+from .serializers import ExpensesSerializer, ExpenseTypeSerializer
+from .stats import aget_expense_totals
+
+
+@require_GET
+@async_api_view('expenses.view_expenses')
+@conditional_api_view(Expenses, (BusinessUnit, Customer, ExpenseType))
+async def expense_stats(request):
+    """
+    Totales de gastos (los mismos del pie del changelist), sin ocupar un
+    worker mientras espera a la base
+    """
+    queryset = await ascope_queryset(Expenses.objects.all(), request.api_user)
+    queryset = filter_stats_queryset(queryset, request)
+    return JsonResponse(await aget_expense_totals(queryset))
+
+
+class ExpenseTypeViewSet(viewsets.ModelViewSet):
+    queryset = ExpenseType.objects.all()
+    serializer_class = ExpenseTypeSerializer
+
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+
+
+class ExpensesViewSet(BusinessUnitScopedViewSet):
+    queryset = Expenses.all_objects.all()
+    serializer_class = ExpensesSerializer
+    select_related_fields = ('business_unit', 'expense_type', 'supplier')
+    conditional_related_models = (BusinessUnit, ExpenseType, Supplier)
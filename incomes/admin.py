@@ -1,11 +1,14 @@
 import logging
 from datetime import datetime
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.models import CHANGE
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from django.utils.html import format_html
-from django.db.models import Sum
 from django.template.response import TemplateResponse
-from django.db.models.functions import TruncMonth
 from django.core.exceptions import ValidationError
 from django.http import HttpResponse
 from django import forms
@@ -13,15 +16,46 @@ from import_export.formats import base_formats
 
 from rangefilter.filters import DateRangeFilter
 
-from .models import Income
+from thot.admin_actions import (
+    FastDeleteMixin,
+    fast_delete_selected,
+    log_bulk_action,
+    soft_delete_selected,
+)
+from thot.admin_filters import CachedRelatedFieldListFilter
+from thot.conditional import ConditionalChangelistMixin
+from products.catalog import link_lines
+from products.stock import sync_line_stock
+from tenant.models import BusinessUnit, Customer
+from thot.bulk import iter_pk_chunks
+
+from .constants import (
+    ORDER_STATUS_TRANSITIONS,
+    PAYMENT_STATUS_TRANSITIONS,
+    SHIPPING_STATUS_TRANSITIONS,
+    OrderStatus,
+    PaymentStatus,
+    ShippingStatus,
+    allowed_sources,
+)
+from .exchange import incomes_for_rate, recompute_exchange_rates
+from .models import (
+    ExchangeRate,
+    Income,
+    IncomeContact,
+    IncomeLine,
+    IncomeNotes,
+    IncomeShipping,
+)
 from .resources import IncomeResource
+from .stats import get_income_totals
 
 
 logger = logging.getLogger(__name__)
 
 
 class IncomeAdminForm(forms.ModelForm):
-    """Formulario personalizado para validar que el total no sea 0"""
+    """Formulario del ingreso con el total calculado como referencia"""
     # Campo calculado de solo lectura
     calculated_total = forms.DecimalField(
         label='Total Calculado',
@@ -46,32 +80,76 @@ class IncomeAdminForm(forms.ModelForm):
             shipping = self.instance.shipping_cost or 0
             self.fields['calculated_total'].initial = subtotal - discount + shipping
 
-    def clean(self):
-        cleaned_data = super().clean()
 
-        # Obtener valores
-        product_subtotal = cleaned_data.get('product_subtotal', 0) or 0
-        discount = cleaned_data.get('discount', 0) or 0
-        shipping_cost = cleaned_data.get('shipping_cost', 0) or 0
+class IncomeLineFormSet(forms.BaseInlineFormSet):
+    """
+    Valida que el total calculado con las líneas del formulario sea mayor
+    que 0 (el subtotal lo recalcula la base al guardar las líneas)
+    """
 
-        # Calcular total
-        calculated_total = product_subtotal - discount + shipping_cost
+    def clean(self):
+        super().clean()
+        if any(self.errors):
+            return
+
+        product_subtotal = sum(
+            (form.cleaned_data.get('price') or 0) *
+            (form.cleaned_data.get('quantity') or 0)
+            for form in self.forms
+            if form.cleaned_data and not form.cleaned_data.get('DELETE')
+        )
+        discount = self.instance.discount or 0
+        shipping_cost = self.instance.shipping_cost or 0
+        calculated_total = (
+            product_subtotal - min(discount, product_subtotal) + shipping_cost
+        )
 
-        # Validar que el total sea mayor que 0
         if calculated_total <= 0:
-            raise ValidationError({
-                'product_subtotal': f'El total calculado ({calculated_total}) debe ser mayor que 0. Ajuste el subtotal, descuento o costo de envío.'
-            })
+            raise ValidationError(
+                f'El total calculado ({calculated_total}) debe ser mayor que 0. '
+                f'Agregue productos o ajuste el descuento o costo de envío.'
+            )
+
+
+class IncomeLineInline(admin.TabularInline):
+    model = IncomeLine
+    formset = IncomeLineFormSet
+    fields = ('product_name', 'sku', 'price', 'quantity', 'subtotal')
+    readonly_fields = ('subtotal',)
+    extra = 1
+
+
+class IncomeDetailInline(admin.StackedInline):
+    """
+    Tabla lateral uno a uno: se carga solo en el formulario de edición
+    """
+    extra = 1
+    max_num = 1
+    can_delete = False
+    classes = ('collapse',)
+
+
+class IncomeContactInline(IncomeDetailInline):
+    model = IncomeContact
 
-        # Asignar el total calculado
-        cleaned_data['total'] = calculated_total
 
-        return cleaned_data
+class IncomeShippingInline(IncomeDetailInline):
+    model = IncomeShipping
+
+
+class IncomeNotesInline(IncomeDetailInline):
+    model = IncomeNotes
 
 
 @admin.register(Income)
-class IncomeAdmin(admin.ModelAdmin):
+class IncomeAdmin(ConditionalChangelistMixin, FastDeleteMixin, admin.ModelAdmin):
     form = IncomeAdminForm
+    inlines = (
+        IncomeLineInline,
+        IncomeContactInline,
+        IncomeShippingInline,
+        IncomeNotesInline,
+    )
     list_display = (
         'id',
         'business_unit_display',
@@ -83,8 +161,8 @@ class IncomeAdmin(admin.ModelAdmin):
     )
     list_filter = (
         'business_type',
-        'business_unit__customer',
-        'business_unit',
+        ('business_unit__customer', CachedRelatedFieldListFilter),
+        ('business_unit', CachedRelatedFieldListFilter),
         ('date', DateRangeFilter),
         'order_status',
         'payment_status',
@@ -93,13 +171,15 @@ class IncomeAdmin(admin.ModelAdmin):
     search_fields = (
         'id',
         'order_number',
-        'email',
-        'product_name',
-        'tax_id',
+        'contact_detail__email',
+        'lines__product_name',
+        'lines__sku',
+        'contact_detail__tax_id',
         'payment_transaction_id',
         'business_unit__name',
         'business_unit__customer__name'
     )
+    autocomplete_fields = ('business_unit',)
 
     def export_selected_to_csv(modeladmin, request, queryset):
         """
@@ -153,19 +233,13 @@ class IncomeAdmin(admin.ModelAdmin):
         }),
         ('Información del Producto', {
             'fields': (
-                'product_name',
-                'product_price',
-                'product_quantity',
-                'sku',
-                'is_physical_product'
-            )
+                'is_physical_product',
+            ),
+            'description': 'Los productos se cargan en las líneas al pie del formulario'
         }),
         ('Información del Cliente', {
             'fields': (
                 'buyer_name',
-                'email',
-                'tax_id',
-                'phone'
             )
         }),
         ('Información de Pago', {
@@ -180,33 +254,21 @@ class IncomeAdmin(admin.ModelAdmin):
                 'product_subtotal',
                 'discount',
                 'shipping_cost',
+                'calculated_total',
                 'total',
+                'exchange_rate',
+                'total_base',
                 'discount_coupon'
             ),
-            'description': 'El total se calcula automáticamente: Subtotal - Descuento + Envío'
+            'description': (
+                'El total se calcula automáticamente: Subtotal - Descuento + Envío. '
+                'El total en moneda de reporte usa la cotización de la fecha del ingreso'
+            )
         }),
         ('Información de Envío', {
             'fields': (
                 'shipping_status',
                 'shipping_method',
-                'shipping_name',
-                'shipping_phone',
-                'address',
-                'address_number',
-                'floor_apt',
-                'locality',
-                'city',
-                'postal_code',
-                'state_province',
-                'country',
-                'tracking_code'
-            ),
-            'classes': ('collapse',)
-        }),
-        ('Notas', {
-            'fields': (
-                'buyer_notes',
-                'seller_notes'
             ),
             'classes': ('collapse',)
         }),
@@ -229,7 +291,7 @@ class IncomeAdmin(admin.ModelAdmin):
             return obj.id
         else:
             try:
-                last_income = Income.objects.order_by('-id').first()
+                last_income = Income.all_objects.order_by('-id').first()
                 next_id = (last_income.id + 1) if last_income else 1
                 return f"{next_id} (próximo)"
             except Exception:
@@ -250,20 +312,8 @@ class IncomeAdmin(admin.ModelAdmin):
                 form.base_fields['business_unit'].initial = request.user_business_units[0]
                 form.base_fields['business_unit'].widget.attrs['disabled'] = True
 
-        if 'total' in form.base_fields:
-            form.base_fields['total'].widget.attrs.update({
-                'readonly': 'readonly',
-                'style': 'background-color: #f8f9fa;'
-            })
-
         return form
 
-    def get_fields(self, request, obj=None):
-        fields = list(super().get_fields(request, obj))
-        if 'total' not in fields:
-            fields.append('total')
-        return fields
-
     def get_fieldsets(self, request, obj=None):
         fieldsets = super().get_fieldsets(request, obj)
 
@@ -282,16 +332,11 @@ class IncomeAdmin(admin.ModelAdmin):
         """Mostrar la unidad de negocio con formato especial"""
         if not obj.business_unit:
             return format_html(
-                '<div style="line-height: 1.5;">'
-                '<span style="color: #666;">Sin cliente</span><br>'
-                '<strong style="color: #2c3e50;">Sin unidad</strong>'
-                '</div>'
+                '<div class="unit-cell"><span>Sin cliente</span>'
+                '<strong>Sin unidad</strong></div>'
             )
         return format_html(
-            '<div style="line-height: 1.5;">'
-            '<span style="color: #666;">{}</span><br>'
-            '<strong style="color: #2c3e50;">{}</strong>'
-            '</div>',
+            '<div class="unit-cell"><span>{}</span><strong>{}</strong></div>',
             obj.business_unit.customer.name,
             obj.business_unit.name
         )
@@ -300,15 +345,13 @@ class IncomeAdmin(admin.ModelAdmin):
     def business_type_display(self, obj):
         """Mostrar el tipo de negocio con formato especial"""
         colors = {
-            'ecommerce': '#4A90E2',  # Azul
-            'physical': '#2ECC71',   # Verde
-            'mixed': '#F1C40F'       # Amarillo
+            'ecommerce': 'badge-blue',
+            'physical': 'badge-green',
+            'mixed': 'badge-yellow'
         }
         return format_html(
-            '<span style="background-color: {}; color: white; padding: 4px 12px; '
-            'border-radius: 4px; display: inline-block; min-width: 100px; '
-            'text-align: center; font-weight: 500;">{}</span>',
-            colors.get(obj.business_type, '#95A5A6'),
+            '<span class="badge {}">{}</span>',
+            colors.get(obj.business_type, ''),
             obj.get_business_type_display()
         )
     business_type_display.short_description = 'Tipo de Negocio'
@@ -317,21 +360,19 @@ class IncomeAdmin(admin.ModelAdmin):
         """Mostrar el estado de envío con formato especial"""
         if not obj.shipping_status:
             return format_html(
-                '<span style="color: #95A5A6;">No requiere envío</span>'
+                '<span class="text-muted">No requiere envío</span>'
             )
         colors = {
-            'not_packaged': '#E74C3C',  # Rojo
-            'packaged': '#F39C12',      # Naranja
-            'shipped': '#3498DB',       # Azul
-            'delivered': '#2ECC71',     # Verde
-            'returned': '#E74C3C',      # Rojo
-            'not_required': '#95A5A6'   # Gris
+            'not_packaged': 'badge-red',
+            'packaged': 'badge-orange',
+            'shipped': 'badge-sky',
+            'delivered': 'badge-green',
+            'returned': 'badge-red',
+            'not_required': ''
         }
         return format_html(
-            '<span style="background-color: {}; color: white; padding: 4px 12px; '
-            'border-radius: 4px; display: inline-block; min-width: 100px; '
-            'text-align: center; font-weight: 500;">{}</span>',
-            colors.get(obj.shipping_status, '#95A5A6'),
+            '<span class="badge {}">{}</span>',
+            colors.get(obj.shipping_status, ''),
             obj.get_shipping_status_display()
         )
     shipping_status_display.short_description = 'Estado de Envío'
@@ -339,8 +380,9 @@ class IncomeAdmin(admin.ModelAdmin):
     def total_display(self, obj):
         """Mostrar el total con formato de moneda"""
         return format_html(
-            '<span style="color: {}; font-weight: bold">{} {}</span>',
-            '#28a745',  # Color verde para las ventas
+            '<span class="amount-ok" title="{}">{} {}</span>',
+            f'En moneda de reporte: {obj.total_base}'
+            if obj.total_base is not None else 'Sin cotización',
             obj.total,
             obj.currency
         )
@@ -362,57 +404,45 @@ class IncomeAdmin(admin.ModelAdmin):
                 if hasattr(response.context_data.get('cl', None), 'get_queryset'):
                     queryset = response.context_data['cl'].get_queryset(request)
 
-                def format_amount(amount):
-                    """Formatea el monto con separadores de miles y dos decimales"""
-                    return f"${amount:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+                def format_amount(amount, currency):
+                    """Formatea el monto con separadores de miles, dos decimales y su moneda"""
+                    formatted = f"{amount:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+                    return f"{currency} {formatted}"
 
+                stats = get_income_totals(queryset)
                 totales = {
-                    'total': format_amount(
-                        queryset.aggregate(total=Sum('total'))['total'] or 0
-                    ),
+                    'por_moneda': [
+                        format_amount(row['total'], row['moneda'])
+                        for row in stats['por_moneda']
+                    ],
+                    'sin_cotizacion': stats['sin_cotizacion'],
                     'por_tipo': [
                         {
                             'nombre': tipo['business_type'],
-                            'total': format_amount(tipo['total'])
+                            'total': format_amount(tipo['total'], tipo['moneda'])
                         }
-                        for tipo in queryset.values(
-                            'business_type'
-                        ).annotate(
-                            total=Sum('total')
-                        ).order_by('-total')
+                        for tipo in stats['por_tipo']
                     ],
                     'por_mes': [
                         {
                             'mes': mes['mes'],
-                            'total': format_amount(mes['total'])
+                            'total': format_amount(mes['total'], mes['moneda'])
                         }
-                        for mes in queryset.annotate(
-                            mes=TruncMonth('date')
-                        ).values('mes').annotate(
-                            total=Sum('total')
-                        ).order_by('-mes')[:3]
+                        for mes in stats['por_mes']
                     ],
                     'por_unidad': [
                         {
                             'nombre': unit['business_unit__name'] or 'Sin unidad',
-                            'total': format_amount(unit['total'])
+                            'total': format_amount(unit['total'], unit['moneda'])
                         }
-                        for unit in queryset.values(
-                            'business_unit__name'
-                        ).annotate(
-                            total=Sum('total')
-                        ).order_by('-total')
+                        for unit in stats['por_unidad']
                     ],
                     'por_cliente': [
                         {
                             'nombre': client['business_unit__customer__name'] or 'Sin cliente',
-                            'total': format_amount(client['total'])
+                            'total': format_amount(client['total'], client['moneda'])
                         }
-                        for client in queryset.values(
-                            'business_unit__customer__name'
-                        ).annotate(
-                            total=Sum('total')
-                        ).order_by('-total')
+                        for client in stats['por_cliente']
                     ]
                 }
 
@@ -420,7 +450,7 @@ class IncomeAdmin(admin.ModelAdmin):
 
             except Exception as e:
                 response.context_data['totales'] = {
-                    'total': format_amount(0),
+                    'por_moneda': [],
                     'por_tipo': [],
                     'por_mes': [],
                     'por_unidad': [],
@@ -429,6 +459,16 @@ class IncomeAdmin(admin.ModelAdmin):
 
         return response
 
+    def save_related(self, request, form, formsets, change):
+        previous = list(form.instance.lines.values_list('id', flat=True))
+        super().save_related(request, form, formsets, change)
+
+        # Vincular con el catálogo las líneas nuevas o con SKU modificado y
+        # ajustar el stock, incluido el de las líneas borradas
+        current = list(form.instance.lines.values_list('id', flat=True))
+        link_lines(current)
+        sync_line_stock(set(previous) | set(current))
+
     def get_queryset(self, request):
         """Optimización de consultas y filtrado por unidad de negocio del usuario"""
         queryset = super().get_queryset(request)
@@ -448,17 +488,183 @@ class IncomeAdmin(admin.ModelAdmin):
             'business_unit__customer'
         )
 
+    def _change_status(self, request, queryset, field, choices, transitions):
+        """
+        Cambia el estado de los ingresos seleccionados con un UPDATE por lote.
+        Solo se actualizan las filas cuyo estado actual permite la transición;
+        el resto se informa como omitidas
+        """
+        title = Income._meta.get_field(field).verbose_name
+        target = request.POST.get('status')
+
+        if 'apply' not in request.POST or target not in choices.values:
+            return TemplateResponse(request, 'admin/incomes/income/change_status.html', {
+                **self.admin_site.each_context(request),
+                'title': f'Cambiar {title}',
+                'opts': self.model._meta,
+                'field_label': title,
+                'choices': choices.choices,
+                'queryset_count': queryset.count(),
+                'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+                'select_across': request.POST.get('select_across', '0'),
+                'action': request.POST.get('action'),
+                'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            })
+
+        sources = allowed_sources(transitions, target)
+        allowed = Q(**{f'{field}__in': sources})
+        # Un estado de envío vacío equivale a "no requiere envío"
+        if field == 'shipping_status' and ShippingStatus.NOT_REQUIRED in sources:
+            allowed |= Q(shipping_status__isnull=True)
+
+        total = queryset.count()
+        updated = 0
+        label = choices(target).label
+        for pks in iter_pk_chunks(queryset.filter(allowed)):
+            with transaction.atomic():
+                count = Income.objects.filter(allowed, pk__in=pks).update(**{
+                    field: target,
+                    'updated_at': timezone.now(),
+                })
+                # Cancelar o reembolsar devuelve el stock de las líneas
+                if field == 'order_status':
+                    sync_line_stock(IncomeLine.objects.filter(
+                        income_id__in=pks
+                    ).values_list('id', flat=True))
+                log_bulk_action(
+                    request, Income, CHANGE, count,
+                    f'{title} cambiado a "{label}" en {count} ingreso(s): '
+                    f'IDs {pks[0]}-{pks[-1]}'
+                )
+            updated += count
+
+        self.message_user(
+            request,
+            f'{updated} ingreso(s) actualizados a "{label}".',
+            messages.SUCCESS
+        )
+        if total > updated:
+            self.message_user(
+                request,
+                f'{total - updated} ingreso(s) omitidos: su {title} actual '
+                f'no permite pasar a "{label}".',
+                messages.WARNING
+            )
+        return None
+
+    def soft_delete_chunk(self, pks):
+        """Elimina el lote y devuelve el stock de sus líneas"""
+        deleted = Income.all_objects.filter(pk__in=pks).soft_delete()
+        sync_line_stock(IncomeLine.objects.filter(
+            income_id__in=pks
+        ).values_list('id', flat=True))
+        return deleted
+
+    def fast_delete_chunk(self, pks):
+        """Borra el lote y devuelve el stock de las líneas borradas"""
+        line_ids = list(IncomeLine.objects.filter(
+            income_id__in=pks
+        ).values_list('id', flat=True))
+        deleted = super().fast_delete_chunk(pks)
+        sync_line_stock(line_ids)
+        return deleted
+
+    def change_order_status(self, request, queryset):
+        return self._change_status(
+            request, queryset, 'order_status', OrderStatus,
+            ORDER_STATUS_TRANSITIONS
+        )
+    change_order_status.short_description = 'Cambiar estado de la orden'
+    change_order_status.allowed_permissions = ('change',)
+
+    def change_payment_status(self, request, queryset):
+        return self._change_status(
+            request, queryset, 'payment_status', PaymentStatus,
+            PAYMENT_STATUS_TRANSITIONS
+        )
+    change_payment_status.short_description = 'Cambiar estado del pago'
+    change_payment_status.allowed_permissions = ('change',)
+
+    def change_shipping_status(self, request, queryset):
+        return self._change_status(
+            request, queryset, 'shipping_status', ShippingStatus,
+            SHIPPING_STATUS_TRANSITIONS
+        )
+    change_shipping_status.short_description = 'Cambiar estado del envío'
+    change_shipping_status.allowed_permissions = ('change',)
+
     date_hierarchy = 'date'
-    readonly_fields = ('id_display', 'created_at', 'updated_at')
+    readonly_fields = (
+        'id_display',
+        'product_subtotal',
+        'total',
+        'exchange_rate',
+        'total_base',
+        'created_at',
+        'updated_at'
+    )
     list_per_page = 20
+    conditional_related_models = (BusinessUnit, Customer)
     actions = [
         export_selected_to_csv,
-        export_selected_to_excel
+        export_selected_to_excel,
+        'change_order_status',
+        'change_payment_status',
+        'change_shipping_status',
+        soft_delete_selected,
+        fast_delete_selected
     ]
 
     class Media:
+        css = {'all': ('css/admin_badges.css',)}
         js = ('js/income_calculator.js',)
 
     def get_readonly_fields(self, request, obj=None):
         readonly_fields = list(super().get_readonly_fields(request, obj))
         return readonly_fields
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    """
+    Cotizaciones por fecha. Al cargarlas, corregirlas o borrarlas se
+    recalcula el total en moneda de reporte de los ingresos afectados
+    """
+    list_display = ('date', 'from_currency', 'to_currency', 'rate', 'updated_at')
+    list_filter = ('from_currency', 'to_currency')
+    date_hierarchy = 'date'
+    ordering = ('-date', 'from_currency', 'to_currency')
+
+    def save_model(self, request, obj, form, change):
+        previous = None
+        if change:
+            previous = ExchangeRate.objects.get(pk=obj.pk)
+        super().save_model(request, obj, form, change)
+
+        self._recompute(request, obj)
+        if previous is not None and (
+            previous.from_currency, previous.to_currency, previous.date
+        ) != (obj.from_currency, obj.to_currency, obj.date):
+            self._recompute(request, previous)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._recompute(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        rates = list(queryset)
+        super().delete_queryset(request, queryset)
+        for rate in rates:
+            self._recompute(request, rate)
+
+    def _recompute(self, request, rate):
+        updated = recompute_exchange_rates(
+            incomes_for_rate(rate.from_currency, rate.to_currency, rate.date)
+        )
+        if updated:
+            self.message_user(
+                request,
+                f'{updated} ingreso(s) en {rate.from_currency} recalculados '
+                f'desde el {rate.date:%d/%m/%Y}.',
+                messages.INFO
+            )
@@ -64,4 +64,77 @@ class Currency(models.TextChoices):
     UYU = 'UYU', _('Peso Uruguayo')
     PEN = 'PEN', _('Sol Peruano')
     COP = 'COP', _('Peso Colombiano')
-    MXN = 'MXN', _('Peso Mexicano')
\ No newline at end of file
+    MXN = 'MXN', _('Peso Mexicano')
+
+
+# Moneda de reporte de los ingresos sin unidad de negocio (y por defecto de
+# las empresas)
+DEFAULT_REPORTING_CURRENCY = Currency.ARS
+
+
+# Órdenes anuladas: no cuentan como venta ni descuentan stock
+VOID_ORDER_STATUSES = (OrderStatus.CANCELLED, OrderStatus.REFUNDED)
+
+
+# Transiciones de estado permitidas: estado actual -> estados destino
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatus.OPEN: (
+        OrderStatus.PENDING, OrderStatus.PROCESSING, OrderStatus.COMPLETED,
+        OrderStatus.CANCELLED, OrderStatus.ON_HOLD
+    ),
+    OrderStatus.PENDING: (
+        OrderStatus.PROCESSING, OrderStatus.COMPLETED,
+        OrderStatus.CANCELLED, OrderStatus.ON_HOLD
+    ),
+    OrderStatus.PROCESSING: (
+        OrderStatus.COMPLETED, OrderStatus.CANCELLED, OrderStatus.ON_HOLD
+    ),
+    OrderStatus.ON_HOLD: (
+        OrderStatus.PENDING, OrderStatus.PROCESSING, OrderStatus.CANCELLED
+    ),
+    OrderStatus.COMPLETED: (
+        OrderStatus.REFUNDED, OrderStatus.PARTIALLY_REFUNDED
+    ),
+    OrderStatus.PARTIALLY_REFUNDED: (OrderStatus.REFUNDED,),
+    OrderStatus.CANCELLED: (),
+    OrderStatus.REFUNDED: (),
+}
+
+PAYMENT_STATUS_TRANSITIONS = {
+    PaymentStatus.PENDING: (
+        PaymentStatus.PAID, PaymentStatus.PARTIALLY_PAID,
+        PaymentStatus.FAILED, PaymentStatus.CANCELLED
+    ),
+    PaymentStatus.PARTIALLY_PAID: (
+        PaymentStatus.PAID, PaymentStatus.REFUNDED, PaymentStatus.CANCELLED
+    ),
+    PaymentStatus.PAID: (PaymentStatus.REFUNDED,),
+    PaymentStatus.FAILED: (PaymentStatus.PENDING, PaymentStatus.CANCELLED),
+    PaymentStatus.REFUNDED: (),
+    PaymentStatus.CANCELLED: (),
+}
+
+SHIPPING_STATUS_TRANSITIONS = {
+    ShippingStatus.NOT_REQUIRED: (ShippingStatus.NOT_PACKAGED,),
+    ShippingStatus.NOT_PACKAGED: (
+        ShippingStatus.PACKAGED, ShippingStatus.NOT_REQUIRED
+    ),
+    ShippingStatus.PACKAGED: (
+        ShippingStatus.SHIPPED, ShippingStatus.NOT_PACKAGED
+    ),
+    ShippingStatus.SHIPPED: (
+        ShippingStatus.DELIVERED, ShippingStatus.RETURNED
+    ),
+    ShippingStatus.DELIVERED: (ShippingStatus.RETURNED,),
+    ShippingStatus.RETURNED: (),
+}
+
+
+def allowed_sources(transitions, target):
+    """
+    Retorna los estados desde los que se puede pasar al estado destino
+    """
+    return [
+        source for source, targets in transitions.items()
+        if target in targets
+    ]
@@ -0,0 +1,106 @@
+"""
+Conversión de los ingresos a la moneda de reporte de cada empresa.
+
+La cotización se resuelve en la base con una sola sentencia UPDATE por
+lote, tanto al guardar un ingreso como al corregir cotizaciones, así que
+total_base (columna generada) queda siempre listo para sumar
+"""
+from django.db import transaction
+from django.db.models import (
+    Case, DecimalField, OuterRef, Q, Subquery, Value, When
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from tenant.models import BusinessUnit
+from thot.bulk import BULK_CHUNK_SIZE, iter_pk_chunks
+from thot.cache import bump_tenant_version
+
+from .constants import DEFAULT_REPORTING_CURRENCY
+from .models import ExchangeRate, Income
+
+
+def reporting_currency(business_unit_ref):
+    """
+    Moneda de reporte de la empresa de la unidad indicada (o la moneda por
+    defecto si el ingreso no tiene unidad)
+    """
+    return Coalesce(
+        Subquery(
+            BusinessUnit.objects.filter(
+                pk=business_unit_ref
+            ).order_by().values('customer__reporting_currency')[:1]
+        ),
+        Value(DEFAULT_REPORTING_CURRENCY)
+    )
+
+
+def exchange_rate_expression():
+    """
+    Cotización de cada ingreso: 1 si ya está en la moneda de reporte; si no,
+    la última cotización cargada hasta su fecha (NULL si no hay ninguna)
+    """
+    latest_rate = ExchangeRate.objects.filter(
+        from_currency=OuterRef('currency'),
+        to_currency=reporting_currency(OuterRef(OuterRef('business_unit_id'))),
+        date__lte=OuterRef('date')
+    ).order_by('-date').values('rate')[:1]
+
+    return Case(
+        When(currency=reporting_currency(OuterRef('business_unit_id')), then=Value(1)),
+        default=Subquery(latest_rate),
+        output_field=DecimalField(max_digits=18, decimal_places=6)
+    )
+
+
+def apply_exchange_rates(queryset, chunk_size=None):
+    """
+    Recalcula exchange_rate (y con él total_base) de los ingresos del
+    queryset. En lotes si se indica chunk_size. Retorna la cantidad de filas
+    actualizadas
+    """
+    if chunk_size is None:
+        return queryset.update(exchange_rate=exchange_rate_expression())
+
+    updated = 0
+    for pks in iter_pk_chunks(queryset, chunk_size=chunk_size):
+        with transaction.atomic():
+            # Se marca updated_at para que el feed de cambios informe el
+            # nuevo total_base
+            updated += Income.all_objects.filter(pk__in=pks).update(
+                exchange_rate=exchange_rate_expression(),
+                updated_at=timezone.now()
+            )
+    return updated
+
+
+def incomes_for_rate(from_currency, to_currency, since=None):
+    """
+    Ingresos a los que puede afectar una cotización del par indicado a
+    partir de la fecha since
+    """
+    queryset = Income.all_objects.filter(currency=from_currency)
+    if to_currency == DEFAULT_REPORTING_CURRENCY:
+        queryset = queryset.filter(
+            Q(business_unit__customer__reporting_currency=to_currency) |
+            Q(business_unit__isnull=True)
+        )
+    else:
+        queryset = queryset.filter(
+            business_unit__customer__reporting_currency=to_currency
+        )
+    if since is not None:
+        queryset = queryset.filter(date__gte=since)
+    return queryset
+
+
+def recompute_exchange_rates(incomes, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Recalcula la conversión de los ingresos después de corregir
+    cotizaciones o la moneda de reporte de una empresa. Las ventas mensuales
+    por producto de los meses afectados las encolan los triggers. Retorna la
+    cantidad de ingresos actualizados
+    """
+    updated = apply_exchange_rates(incomes, chunk_size=chunk_size)
+    bump_tenant_version(Income)
+    return updated
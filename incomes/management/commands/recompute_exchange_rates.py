@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from incomes.exchange import incomes_for_rate, recompute_exchange_rates
+from incomes.models import Income
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula la cotización y el total en moneda de reporte de los '
+        'ingresos, en lotes. Sirve después de cargar o corregir cotizaciones '
+        'fuera del admin. Sin opciones recalcula todos los ingresos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-currency',
+            help='Solo los ingresos en esta moneda'
+        )
+        parser.add_argument(
+            '--to-currency',
+            help='Solo las empresas que reportan en esta moneda'
+        )
+        parser.add_argument(
+            '--since',
+            help='Solo los ingresos desde esta fecha (AAAA-MM-DD)'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since debe tener formato AAAA-MM-DD.')
+
+        if options['from_currency'] and options['to_currency']:
+            incomes = incomes_for_rate(
+                options['from_currency'], options['to_currency'], since
+            )
+        elif options['from_currency'] or options['to_currency']:
+            raise CommandError(
+                'Indique --from-currency y --to-currency juntas.'
+            )
+        else:
+            incomes = Income.all_objects.all()
+            if since is not None:
+                incomes = incomes.filter(date__gte=since)
+
+        updated = recompute_exchange_rates(
+            incomes, chunk_size=options['batch_size']
+        )
+        missing = incomes.filter(exchange_rate__isnull=True).count()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} ingresos recalculados.'
+        ))
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'{missing} ingresos sin cotización para su fecha.'
+            ))
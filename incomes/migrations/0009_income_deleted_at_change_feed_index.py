@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0007_alter_income_total'),
+        ('tenant', '0004_alter_businessunituser_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='income',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Fecha de eliminación'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['business_unit', 'updated_at', 'id'], name='income_bu_updated_id_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0009_income_deleted_at_change_feed_index'),
+        ('tenant', '0004_alter_businessunituser_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['business_unit', '-date'], name='income_live_bu_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['-date'], name='income_live_date_idx'),
+        ),
+    ]
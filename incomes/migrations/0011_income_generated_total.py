@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:57
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0010_incomes_live_partial_indexes'),
+    ]
+
+    # Una columna existente no se puede convertir en generada: se elimina y
+    # se vuelve a crear. Postgres calcula el valor de todas las filas
+    # existentes al agregar la columna STORED.
+    operations = [
+        migrations.RemoveField(
+            model_name='income',
+            name='total',
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='total',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Greatest(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('product_subtotal'), '-', django.db.models.functions.comparison.Least(models.F('discount'), models.F('product_subtotal'))), '+', models.F('shipping_cost')), models.Value(Decimal('0'))), output_field=models.DecimalField(decimal_places=2, max_digits=12), verbose_name='Total'),
+        ),
+    ]
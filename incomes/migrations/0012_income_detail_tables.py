@@ -0,0 +1,178 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Tablas laterales y columnas que se mueven desde incomes_income
+DETAIL_COLUMNS = {
+    'incomes_incomecontact': (
+        'email',
+        'tax_id',
+        'phone',
+    ),
+    'incomes_incomeshipping': (
+        'shipping_name',
+        'shipping_phone',
+        'address',
+        'address_number',
+        'floor_apt',
+        'locality',
+        'city',
+        'postal_code',
+        'state_province',
+        'country',
+        'tracking_code',
+    ),
+    'incomes_incomenotes': (
+        'buyer_notes',
+        'seller_notes',
+    ),
+}
+
+
+def copy_to_detail_sql(table, columns):
+    """
+    Copia en un único INSERT ... SELECT las filas que tienen algún dato
+    """
+    column_list = ', '.join(columns)
+    not_empty = ' OR '.join(f"COALESCE({column}, '') <> ''" for column in columns)
+    return (
+        f'INSERT INTO {table} (income_id, {column_list}) '
+        f'SELECT id, {column_list} FROM incomes_income WHERE {not_empty}'
+    )
+
+
+def copy_from_detail_sql(table, columns):
+    assignments = ', '.join(f'{column} = detail.{column}' for column in columns)
+    return (
+        f'UPDATE incomes_income SET {assignments} '
+        f'FROM {table} detail WHERE detail.income_id = incomes_income.id'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0011_income_generated_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncomeContact',
+            fields=[
+                ('income', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contact_detail', serialize=False, to='incomes.income', verbose_name='Ingreso')),
+                ('email', models.EmailField(blank=True, max_length=255, null=True, verbose_name='Email')),
+                ('tax_id', models.CharField(blank=True, max_length=20, null=True, verbose_name='DNI / CUIT')),
+                ('phone', models.CharField(blank=True, max_length=20, null=True, verbose_name='Teléfono')),
+            ],
+            options={
+                'verbose_name': 'Contacto del cliente',
+                'verbose_name_plural': 'Contactos del cliente',
+            },
+        ),
+        migrations.CreateModel(
+            name='IncomeNotes',
+            fields=[
+                ('income', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notes_detail', serialize=False, to='incomes.income', verbose_name='Ingreso')),
+                ('buyer_notes', models.TextField(blank=True, null=True, verbose_name='Notas del cliente')),
+                ('seller_notes', models.TextField(blank=True, null=True, verbose_name='Notas del vendedor')),
+            ],
+            options={
+                'verbose_name': 'Notas',
+                'verbose_name_plural': 'Notas',
+            },
+        ),
+        migrations.CreateModel(
+            name='IncomeShipping',
+            fields=[
+                ('income', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shipping_detail', serialize=False, to='incomes.income', verbose_name='Ingreso')),
+                ('shipping_name', models.CharField(blank=True, max_length=255, null=True, verbose_name='Nombre para el envío')),
+                ('shipping_phone', models.CharField(blank=True, max_length=20, null=True, verbose_name='Teléfono para el envío')),
+                ('address', models.CharField(blank=True, max_length=255, null=True, verbose_name='Dirección')),
+                ('address_number', models.CharField(blank=True, max_length=20, null=True, verbose_name='Número')),
+                ('floor_apt', models.CharField(blank=True, max_length=50, null=True, verbose_name='Piso')),
+                ('locality', models.CharField(blank=True, max_length=100, null=True, verbose_name='Localidad')),
+                ('city', models.CharField(blank=True, max_length=100, null=True, verbose_name='Ciudad')),
+                ('postal_code', models.CharField(blank=True, max_length=20, null=True, verbose_name='Código postal')),
+                ('state_province', models.CharField(blank=True, max_length=100, null=True, verbose_name='Provincia o estado')),
+                ('country', models.CharField(blank=True, max_length=100, null=True, verbose_name='País')),
+                ('tracking_code', models.CharField(blank=True, max_length=100, null=True, verbose_name='Código de tracking')),
+            ],
+            options={
+                'verbose_name': 'Datos de envío',
+                'verbose_name_plural': 'Datos de envío',
+            },
+        ),
+        *(
+            migrations.RunSQL(
+                copy_to_detail_sql(table, columns),
+                reverse_sql=copy_from_detail_sql(table, columns)
+            )
+            for table, columns in DETAIL_COLUMNS.items()
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='address',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='address_number',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='buyer_notes',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='city',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='country',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='email',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='floor_apt',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='locality',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='phone',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='postal_code',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='seller_notes',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='shipping_name',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='shipping_phone',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='state_province',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='tax_id',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='tracking_code',
+        ),
+    ]
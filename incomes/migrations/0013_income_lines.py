@@ -0,0 +1,233 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:05
+
+import django.db.models.deletion
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+# Hasta ahora una orden con varios productos se guardaba como varios
+# ingresos con el mismo número de orden. Cada grupo (unidad de negocio,
+# número de orden) queda en un solo encabezado: el primero vivo, o el primero
+# si todos están eliminados. Los productos de los ingresos vivos del grupo
+# (de todos, si el grupo está eliminado) pasan a ser líneas de ese
+# encabezado; los ingresos eliminados de un grupo vivo se descartan. Los
+# ingresos sin unidad de negocio no se agrupan. Las claves foráneas se
+# verifican en el momento para que no queden eventos pendientes que impidan
+# quitar las columnas del producto
+MERGE_ORDERS_SQL = """
+SET CONSTRAINTS ALL IMMEDIATE;
+
+CREATE TEMPORARY TABLE income_merge AS
+SELECT
+    id,
+    deleted_at IS NOT NULL AS is_deleted,
+    CASE WHEN business_unit_id IS NULL THEN id ELSE FIRST_VALUE(id) OVER orders END
+        AS keeper_id,
+    CASE WHEN business_unit_id IS NULL THEN deleted_at IS NOT NULL
+        ELSE FIRST_VALUE(deleted_at IS NOT NULL) OVER orders END
+        AS keeper_deleted
+FROM incomes_income
+WINDOW orders AS (
+    PARTITION BY business_unit_id, order_number
+    ORDER BY deleted_at IS NOT NULL, id
+);
+"""
+
+# Una línea por producto. Si el subtotal cargado no coincide con precio x
+# cantidad se conserva el subtotal como una línea de cantidad 1, para que el
+# trigger no cambie los totales ya registrados
+COPY_LINES_SQL = """
+INSERT INTO incomes_incomeline (income_id, product_name, sku, price, quantity)
+SELECT
+    merge.keeper_id,
+    income.product_name,
+    income.sku,
+    CASE WHEN income.product_price * income.product_quantity = income.product_subtotal
+        THEN income.product_price ELSE income.product_subtotal END,
+    CASE WHEN income.product_price * income.product_quantity = income.product_subtotal
+        THEN income.product_quantity ELSE 1 END
+FROM incomes_income income
+JOIN income_merge merge USING (id)
+WHERE NOT merge.is_deleted OR merge.keeper_deleted
+ORDER BY merge.keeper_id, income.id;
+"""
+
+# Los datos de contacto, envío y notas del encabezado se conservan; si no
+# tiene, se toman del primer ingreso del grupo que sí tenga
+MERGE_DETAIL_SQL = """
+UPDATE {table} detail SET income_id = moved.keeper_id
+FROM (
+    SELECT DISTINCT ON (merge.keeper_id) merge.id, merge.keeper_id
+    FROM income_merge merge
+    JOIN {table} source ON source.income_id = merge.id
+    WHERE merge.id <> merge.keeper_id
+        AND NOT EXISTS (
+            SELECT 1 FROM {table} kept WHERE kept.income_id = merge.keeper_id
+        )
+    ORDER BY merge.keeper_id, merge.id
+) moved
+WHERE detail.income_id = moved.id;
+
+DELETE FROM {table} detail
+USING income_merge merge
+WHERE detail.income_id = merge.id AND merge.id <> merge.keeper_id;
+"""
+
+REMOVE_MERGED_SQL = """
+DELETE FROM incomes_income income
+USING income_merge merge
+WHERE income.id = merge.id AND merge.id <> merge.keeper_id;
+
+UPDATE incomes_income income SET
+    product_subtotal = COALESCE((
+        SELECT SUM(line.subtotal)
+        FROM incomes_incomeline line
+        WHERE line.income_id = income.id
+    ), 0)
+WHERE income.id IN (
+    SELECT keeper_id FROM income_merge WHERE id <> keeper_id
+);
+
+DROP TABLE income_merge;
+SET CONSTRAINTS ALL DEFERRED;
+"""
+
+DETAIL_TABLES = (
+    'incomes_incomecontact', 'incomes_incomeshipping', 'incomes_incomenotes'
+)
+
+# Al revertir cada encabezado recupera su primera línea; las órdenes
+# unificadas no se vuelven a separar
+COPY_BACK_SQL = """
+UPDATE incomes_income SET
+    product_name = line.product_name,
+    sku = line.sku,
+    product_price = line.price,
+    product_quantity = line.quantity
+FROM (
+    SELECT DISTINCT ON (income_id) *
+    FROM incomes_incomeline
+    ORDER BY income_id, id
+) line
+WHERE line.income_id = incomes_income.id
+"""
+
+# Triggers por sentencia con tablas de transición: una carga masiva de líneas
+# recalcula cada ingreso afectado una sola vez
+CREATE_TRIGGER_SQL = """
+CREATE FUNCTION incomes_refresh_product_subtotal() RETURNS trigger AS $$
+BEGIN
+    UPDATE incomes_income income SET
+        product_subtotal = COALESCE((
+            SELECT SUM(line.subtotal)
+            FROM incomes_incomeline line
+            WHERE line.income_id = income.id
+        ), 0),
+        updated_at = now()
+    WHERE income.id IN (SELECT income_id FROM changed_lines);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER incomeline_insert_subtotal
+    AFTER INSERT ON incomes_incomeline
+    REFERENCING NEW TABLE AS changed_lines
+    FOR EACH STATEMENT EXECUTE FUNCTION incomes_refresh_product_subtotal();
+
+CREATE TRIGGER incomeline_delete_subtotal
+    AFTER DELETE ON incomes_incomeline
+    REFERENCING OLD TABLE AS changed_lines
+    FOR EACH STATEMENT EXECUTE FUNCTION incomes_refresh_product_subtotal();
+
+CREATE FUNCTION incomes_refresh_product_subtotal_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE incomes_income income SET
+        product_subtotal = COALESCE((
+            SELECT SUM(line.subtotal)
+            FROM incomes_incomeline line
+            WHERE line.income_id = income.id
+        ), 0),
+        updated_at = now()
+    WHERE income.id IN (
+        SELECT income_id FROM new_lines
+        UNION
+        SELECT income_id FROM old_lines
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER incomeline_update_subtotal
+    AFTER UPDATE ON incomes_incomeline
+    REFERENCING OLD TABLE AS old_lines NEW TABLE AS new_lines
+    FOR EACH STATEMENT EXECUTE FUNCTION incomes_refresh_product_subtotal_update();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER incomeline_update_subtotal ON incomes_incomeline;
+DROP TRIGGER incomeline_delete_subtotal ON incomes_incomeline;
+DROP TRIGGER incomeline_insert_subtotal ON incomes_incomeline;
+DROP FUNCTION incomes_refresh_product_subtotal_update();
+DROP FUNCTION incomes_refresh_product_subtotal();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0012_income_detail_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncomeLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(blank=True, max_length=255, null=True, verbose_name='Nombre del producto')),
+                ('sku', models.CharField(blank=True, max_length=50, null=True, verbose_name='SKU')),
+                ('price', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Precio unitario')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='Cantidad')),
+                ('subtotal', models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('price'), '*', models.F('quantity')), output_field=models.DecimalField(decimal_places=2, max_digits=12), verbose_name='Subtotal')),
+                ('income', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='incomes.income', verbose_name='Ingreso')),
+            ],
+            options={
+                'verbose_name': 'Línea de producto',
+                'verbose_name_plural': 'Líneas de producto',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['sku'], name='incomeline_sku_idx'), models.Index(fields=['product_name'], name='incomeline_product_name_idx')],
+            },
+        ),
+        migrations.AlterField(
+            model_name='income',
+            name='product_subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Subtotal de productos'),
+        ),
+        migrations.RunSQL(
+            MERGE_ORDERS_SQL + COPY_LINES_SQL + ''.join(
+                MERGE_DETAIL_SQL.format(table=table) for table in DETAIL_TABLES
+            ) + REMOVE_MERGED_SQL,
+            reverse_sql=COPY_BACK_SQL
+        ),
+        # Recién con las órdenes unificadas no quedan números repetidos
+        migrations.AddConstraint(
+            model_name='income',
+            constraint=models.UniqueConstraint(fields=('business_unit', 'order_number'), name='unique_income_order_per_business_unit'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, reverse_sql=DROP_TRIGGER_SQL),
+        migrations.RemoveField(
+            model_name='income',
+            name='product_name',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='product_price',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='product_quantity',
+        ),
+        migrations.RemoveField(
+            model_name='income',
+            name='sku',
+        ),
+    ]
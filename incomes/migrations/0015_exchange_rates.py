@@ -0,0 +1,81 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:14
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0014_incomeline_product'),
+        ('tenant', '0005_customer_reporting_currency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('from_currency', models.CharField(choices=[('ARS', 'Peso Argentino'), ('USD', 'Dólar Estadounidense'), ('EUR', 'Euro'), ('BRL', 'Real Brasileño'), ('CLP', 'Peso Chileno'), ('UYU', 'Peso Uruguayo'), ('PEN', 'Sol Peruano'), ('COP', 'Peso Colombiano'), ('MXN', 'Peso Mexicano')], max_length=3, verbose_name='Moneda origen')),
+                ('to_currency', models.CharField(choices=[('ARS', 'Peso Argentino'), ('USD', 'Dólar Estadounidense'), ('EUR', 'Euro'), ('BRL', 'Real Brasileño'), ('CLP', 'Peso Chileno'), ('UYU', 'Peso Uruguayo'), ('PEN', 'Sol Peruano'), ('COP', 'Peso Colombiano'), ('MXN', 'Peso Mexicano')], max_length=3, verbose_name='Moneda destino')),
+                ('rate', models.DecimalField(decimal_places=6, help_text='Unidades de la moneda destino por unidad de la moneda origen', max_digits=18, verbose_name='Cotización')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+            ],
+            options={
+                'verbose_name': 'Cotización',
+                'verbose_name_plural': 'Cotizaciones',
+                'ordering': ['-date', 'from_currency', 'to_currency'],
+            },
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='exchange_rate',
+            field=models.DecimalField(blank=True, decimal_places=6, editable=False, max_digits=18, null=True, verbose_name='Cotización'),
+        ),
+        migrations.AddConstraint(
+            model_name='exchangerate',
+            constraint=models.UniqueConstraint(fields=('from_currency', 'to_currency', 'date'), name='unique_exchange_rate_per_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='exchangerate',
+            constraint=models.CheckConstraint(condition=models.Q(('rate__gt', 0)), name='exchange_rate_positive'),
+        ),
+        migrations.AddConstraint(
+            model_name='exchangerate',
+            constraint=models.CheckConstraint(condition=models.Q(('from_currency', models.F('to_currency')), _negated=True), name='exchange_rate_distinct_currencies'),
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='total_base',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Greatest(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('product_subtotal'), '-', django.db.models.functions.comparison.Least(models.F('discount'), models.F('product_subtotal'))), '+', models.F('shipping_cost')), models.Value(Decimal('0'))), '*', models.F('exchange_rate')), 2), output_field=models.DecimalField(decimal_places=2, max_digits=14), verbose_name='Total en moneda de reporte'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['business_unit', 'date'], include=('total_base',), name='income_live_bu_date_base_idx'),
+        ),
+        # Los ingresos existentes ya en la moneda de reporte quedan con
+        # cotización 1; el resto espera a que se carguen cotizaciones y se
+        # ejecute recompute_exchange_rates
+        migrations.RunSQL(
+            sql="""
+                UPDATE incomes_income AS income
+                SET exchange_rate = 1
+                WHERE income.currency = COALESCE(
+                    (
+                        SELECT customer.reporting_currency
+                        FROM tenant_businessunit AS unit
+                        JOIN tenant_customer AS customer
+                            ON customer.id = unit.customer_id
+                        WHERE unit.id = income.business_unit_id
+                    ),
+                    'ARS'
+                )
+            """,
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0015_exchange_rates'),
+        ('tenant', '0006_upper_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['updated_at', 'id'], name='income_updated_id_idx'),
+        ),
+    ]
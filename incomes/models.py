@@ -1,4 +1,10 @@
-from django.db import models
+from decimal import Decimal
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least, Round
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from .constants import (
@@ -6,9 +12,39 @@ from .constants import (
     ShippingMethod, BusinessType, Currency
 )
 from tenant.models import BusinessUnit
+from thot.models import SoftDeleteModel
+
+
+def total_expression():
+    """
+    Subtotal - descuento (hasta el subtotal) + envío, nunca negativo. Las
+    columnas generadas no pueden referirse a otras, así que total y
+    total_base repiten la expresión
+    """
+    return Greatest(
+        F('product_subtotal') - Least(F('discount'), F('product_subtotal')) +
+        F('shipping_cost'),
+        Value(Decimal('0'))
+    )
 
 
-class Income(models.Model):
+def detail_property(relation, name):
+    """
+    Propiedad que lee y escribe un campo de una tabla lateral como si fuera
+    propio del ingreso. Los cambios se guardan en Income.save()
+    """
+    def getter(self):
+        detail = self.get_detail(relation)
+        return getattr(detail, name) if detail is not None else None
+
+    def setter(self, value):
+        setattr(self.get_detail(relation, create=True), name, value)
+        self.__dict__.setdefault('_pending_details', set()).add(relation)
+
+    return property(getter, setter)
+
+
+class Income(SoftDeleteModel):
     """
     Modelo para almacenar los ingresos (ventas) de diferentes tipos de negocios
     """
@@ -53,12 +89,14 @@ class Income(models.Model):
         default=Currency.ARS
     )
 
-    # Información financiera
+    # Información financiera. product_subtotal es la suma de las líneas y lo
+    # mantiene un trigger de la base (migración 0013)
     product_subtotal = models.DecimalField(
         _('Subtotal de productos'),
         max_digits=12,
         decimal_places=2,
-        default=0
+        default=0,
+        editable=False
     )
     discount = models.DecimalField(
         _('Descuento'),
@@ -72,11 +110,29 @@ class Income(models.Model):
         decimal_places=2,
         default=0
     )
-    total = models.DecimalField(
-        _('Total'),
-        max_digits=12,
-        decimal_places=2,
-        default=0,
+    total = models.GeneratedField(
+        verbose_name=_('Total'),
+        expression=total_expression(),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
+
+    # Conversión a la moneda de reporte de la empresa. La cotización se
+    # resuelve en la base al guardar (incomes.exchange) y queda en NULL si
+    # no hay una cargada para la fecha
+    exchange_rate = models.DecimalField(
+        _('Cotización'),
+        max_digits=18,
+        decimal_places=6,
+        blank=True,
+        null=True,
+        editable=False
+    )
+    total_base = models.GeneratedField(
+        verbose_name=_('Total en moneda de reporte'),
+        expression=Round(total_expression() * F('exchange_rate'), 2),
+        output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        db_persist=True,
     )
 
     # Información del cliente
@@ -86,42 +142,397 @@ class Income(models.Model):
         blank=True,
         null=True
     )
-    email = models.EmailField(
-        _('Email'),
-        max_length=255,
+
+    # Información de envío (opcional)
+    shipping_status = models.CharField(
+        _('Estado del envío'),
+        max_length=20,
+        choices=ShippingStatus.choices,
+        default=ShippingStatus.NOT_REQUIRED,
         blank=True,
         null=True
     )
-    tax_id = models.CharField(
-        _('DNI / CUIT'),
+    shipping_method = models.CharField(
+        _('Medio de envío'),
         max_length=20,
+        choices=ShippingMethod.choices,
+        default=ShippingMethod.NOT_REQUIRED,
         blank=True,
         null=True
     )
-    phone = models.CharField(
-        _('Teléfono'),
+
+    # Información de pago
+    payment_method = models.CharField(
+        _('Medio de pago'),
         max_length=20,
+        choices=PaymentMethod.choices,
+        default=PaymentMethod.CASH
+    )
+    payment_date = models.DateField(
+        _('Fecha de pago'),
+        blank=True,
+        null=True
+    )
+    payment_transaction_id = models.CharField(
+        _('ID de transacción'),
+        max_length=255,
+        blank=True,
+        null=True
+    )
+    discount_coupon = models.CharField(
+        _('Cupón de descuento'),
+        max_length=100,
         blank=True,
         null=True
     )
 
-    # Información de envío (opcional)
-    shipping_status = models.CharField(
-        _('Estado del envío'),
+    # Información del producto (el detalle está en IncomeLine)
+    is_physical_product = models.BooleanField(
+        _('Producto Físico'),
+        default=True
+    )
+
+    # Información adicional
+    channel = models.CharField(
+        _('Canal de venta'),
+        max_length=50,
+        blank=True,
+        null=True
+    )
+
+    # Información de personal
+    registered_by = models.CharField(
+        _('Registrado por'),
+        max_length=100,
+        blank=True,
+        null=True
+    )
+    sales_branch = models.CharField(
+        _('Sucursal'),
+        max_length=100,
+        blank=True,
+        null=True
+    )
+    seller = models.CharField(
+        _('Vendedor'),
+        max_length=100,
+        blank=True,
+        null=True
+    )
+
+    # Metadatos
+    created_at = models.DateTimeField(
+        _('Fecha de creación'),
+        auto_now_add=True
+    )
+    updated_at = models.DateTimeField(
+        _('Fecha de actualización'),
+        auto_now=True
+    )
+    deleted_at = models.DateTimeField(
+        _('Fecha de eliminación'),
+        null=True,
+        blank=True,
+        editable=False
+    )
+
+    # Datos poco consultados, guardados en tablas uno a uno para que las filas
+    # de la tabla principal sean angostas
+    DETAIL_RELATIONS = ('contact_detail', 'shipping_detail', 'notes_detail')
+
+    # Campos que escribe la base y no se envían en los UPDATE
+    DATABASE_MANAGED_FIELDS = ('product_subtotal', 'exchange_rate')
+
+    # Campos de los que depende la cotización
+    EXCHANGE_RATE_FIELDS = frozenset({'business_unit', 'currency', 'date'})
+
+    # Campos que deciden si las líneas descuentan stock
+    STOCK_FIELDS = frozenset({'order_status', 'deleted_at'})
+
+    email = detail_property('contact_detail', 'email')
+    tax_id = detail_property('contact_detail', 'tax_id')
+    phone = detail_property('contact_detail', 'phone')
+    shipping_name = detail_property('shipping_detail', 'shipping_name')
+    shipping_phone = detail_property('shipping_detail', 'shipping_phone')
+    address = detail_property('shipping_detail', 'address')
+    address_number = detail_property('shipping_detail', 'address_number')
+    floor_apt = detail_property('shipping_detail', 'floor_apt')
+    locality = detail_property('shipping_detail', 'locality')
+    city = detail_property('shipping_detail', 'city')
+    postal_code = detail_property('shipping_detail', 'postal_code')
+    state_province = detail_property('shipping_detail', 'state_province')
+    country = detail_property('shipping_detail', 'country')
+    tracking_code = detail_property('shipping_detail', 'tracking_code')
+    buyer_notes = detail_property('notes_detail', 'buyer_notes')
+    seller_notes = detail_property('notes_detail', 'seller_notes')
+
+    class Meta:
+        verbose_name = _('Ingreso')
+        verbose_name_plural = _('Ingresos')
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['order_number']),
+            models.Index(fields=['date']),
+            models.Index(fields=['order_status']),
+            models.Index(fields=['payment_status']),
+            models.Index(fields=['business_type']),
+            models.Index(fields=['business_unit']),
+            models.Index(fields=['buyer_name']),
+            models.Index(fields=['id']),
+            models.Index(
+                fields=['business_unit', 'updated_at', 'id'],
+                name='income_bu_updated_id_idx'
+            ),
+            # Feed de cambios de superusuarios y de varias unidades
+            models.Index(
+                fields=['updated_at', 'id'],
+                name='income_updated_id_idx'
+            ),
+            models.Index(
+                fields=['business_unit', '-date'],
+                name='income_live_bu_date_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            models.Index(
+                fields=['-date'],
+                name='income_live_date_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            # Los totales en moneda de reporte se suman desde el índice
+            models.Index(
+                fields=['business_unit', 'date'],
+                include=['total_base'],
+                name='income_live_bu_date_base_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['business_unit', 'order_number'],
+                name='unique_income_order_per_business_unit'
+            ),
+        ]
+
+    def __str__(self):
+        business_unit_name = self.business_unit.name if self.business_unit else 'Sin unidad'
+        return (f"{business_unit_name} - {self.get_business_type_display()} - "
+                f"#{self.order_number} - {self.buyer_name or 'Sin cliente'} - "
+                f"{self.total} {self.currency}")
+
+    def save(self, *args, **kwargs):
+        # create() fuerza el INSERT; al ocupar una fila eliminada es un UPDATE
+        if self._state.adding and self.reuse_deleted_order():
+            kwargs.pop('force_insert', None)
+
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+
+        # product_subtotal lo escribe el trigger de las líneas y
+        # exchange_rate se resuelve después del guardado: en un UPDATE se
+        # omiten para no pisarlos con un valor leído antes
+        if not adding and update_fields is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated and
+                field.name not in self.DATABASE_MANAGED_FIELDS and
+                field.attname not in deferred
+            ]
+
+        super().save(*args, **kwargs)
+
+        if update_fields is None or self.EXCHANGE_RATE_FIELDS & set(update_fields):
+            from .exchange import apply_exchange_rates
+            apply_exchange_rates(Income.all_objects.filter(pk=self.pk))
+            self.__dict__.pop('exchange_rate', None)
+            self.__dict__.pop('total_base', None)
+
+        # El total lo calcula la base. En un INSERT vuelve con RETURNING; en
+        # un UPDATE se difiere para leerlo recién cuando se use
+        if not adding:
+            self.__dict__.pop('total', None)
+            self.__dict__.pop('product_subtotal', None)
+            self.__dict__.pop('total_base', None)
+
+        if update_fields is None:
+            for detail in self.pop_pending_details().values():
+                detail.save_or_delete()
+        elif self.STOCK_FIELDS & set(update_fields):
+            # soft_delete(), restore() y cambios de estado puntuales
+            self.sync_stock()
+
+    def reuse_deleted_order(self):
+        """
+        La restricción única incluye a los eliminados: si el número de orden
+        ya existió en la unidad, el ingreso nuevo ocupa esa fila en lugar de
+        insertar otra. Se descartan sus líneas (devolviendo el stock) y sus
+        datos laterales, y el guardado pasa a ser un UPDATE. Retorna si
+        reutilizó una fila
+        """
+        if self.pk is not None or not self.business_unit_id or not self.order_number:
+            return False
+        from products.stock import sync_line_stock
+
+        with transaction.atomic():
+            pk = Income.all_objects.deleted().select_for_update().filter(
+                business_unit_id=self.business_unit_id,
+                order_number=self.order_number
+            ).values_list('pk', flat=True).first()
+            if pk is None:
+                return False
+
+            lines = IncomeLine.objects.filter(income_id=pk)
+            line_ids = list(lines.values_list('id', flat=True))
+            lines.delete()
+            sync_line_stock(line_ids)
+            for relation in self.DETAIL_RELATIONS:
+                self._meta.get_field(relation).related_model.objects.filter(
+                    income_id=pk
+                ).delete()
+
+        self.pk = pk
+        self.created_at = timezone.now()
+        self.deleted_at = None
+        self._state.adding = False
+        return True
+
+    def sync_stock(self):
+        """
+        Ajusta el stock de las líneas al estado actual del ingreso
+        """
+        from products.stock import sync_line_stock
+
+        return sync_line_stock(self.lines.values_list('id', flat=True))
+
+    def replace_lines(self, lines):
+        """
+        Reemplaza las líneas del ingreso por las recibidas (diccionarios con
+        los campos de IncomeLine), las vincula con el catálogo y actualiza el
+        stock. El trigger recalcula product_subtotal
+        """
+        from products.catalog import link_lines
+        from products.stock import sync_line_stock
+
+        previous = list(self.lines.values_list('id', flat=True))
+        self.lines.all().delete()
+        created = [
+            line.pk for line in IncomeLine.objects.bulk_create(
+                IncomeLine(income=self, **line) for line in lines
+            )
+        ]
+        link_lines(created)
+        sync_line_stock(previous + created)
+        self.__dict__.pop('total', None)
+        self.__dict__.pop('product_subtotal', None)
+        self.__dict__.pop('total_base', None)
+
+    def get_detail(self, relation, create=False):
+        """
+        Retorna la fila lateral de la relación, o None si no existe. Con
+        create=True la crea en memoria para poder asignarle valores
+        """
+        try:
+            return getattr(self, relation)
+        except ObjectDoesNotExist:
+            if not create:
+                return None
+
+        detail = self._meta.get_field(relation).related_model(income=self)
+        setattr(self, relation, detail)
+        return detail
+
+    def pop_pending_details(self):
+        """
+        Retorna y olvida las filas laterales modificadas desde el último
+        guardado
+        """
+        return {
+            relation: getattr(self, relation)
+            for relation in self.__dict__.pop('_pending_details', ())
+        }
+
+
+class IncomeDetail(models.Model):
+    """
+    Base de las tablas laterales uno a uno de Income
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def detail_field_names(cls):
+        return [
+            field.name for field in cls._meta.concrete_fields
+            if not field.primary_key
+        ]
+
+    def is_empty(self):
+        return all(
+            getattr(self, name) in (None, '')
+            for name in self.detail_field_names()
+        )
+
+    def save_or_delete(self):
+        """
+        Guarda la fila si tiene algún dato; si quedó vacía la elimina en
+        lugar de conservar una fila sin información
+        """
+        if not self.is_empty():
+            self.save()
+        elif not self._state.adding:
+            self.delete()
+
+
+class IncomeContact(IncomeDetail):
+    """
+    Datos de contacto del cliente de un ingreso
+    """
+    income = models.OneToOneField(
+        Income,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='contact_detail',
+        verbose_name=_('Ingreso')
+    )
+    email = models.EmailField(
+        _('Email'),
+        max_length=255,
+        blank=True,
+        null=True
+    )
+    tax_id = models.CharField(
+        _('DNI / CUIT'),
         max_length=20,
-        choices=ShippingStatus.choices,
-        default=ShippingStatus.NOT_REQUIRED,
         blank=True,
         null=True
     )
-    shipping_method = models.CharField(
-        _('Medio de envío'),
+    phone = models.CharField(
+        _('Teléfono'),
         max_length=20,
-        choices=ShippingMethod.choices,
-        default=ShippingMethod.NOT_REQUIRED,
         blank=True,
         null=True
     )
+
+    class Meta:
+        verbose_name = _('Contacto del cliente')
+        verbose_name_plural = _('Contactos del cliente')
+
+    def __str__(self):
+        return self.email or self.phone or str(self.income_id)
+
+
+class IncomeShipping(IncomeDetail):
+    """
+    Dirección y datos de envío de un ingreso
+    """
+    income = models.OneToOneField(
+        Income,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shipping_detail',
+        verbose_name=_('Ingreso')
+    )
     shipping_name = models.CharField(
         _('Nombre para el envío'),
         max_length=255,
@@ -182,107 +593,134 @@ class Income(models.Model):
         blank=True,
         null=True
     )
-
-    # Información de pago
-    payment_method = models.CharField(
-        _('Medio de pago'),
-        max_length=20,
-        choices=PaymentMethod.choices,
-        default=PaymentMethod.CASH
-    )
-    payment_date = models.DateField(
-        _('Fecha de pago'),
+    tracking_code = models.CharField(
+        _('Código de tracking'),
+        max_length=100,
         blank=True,
         null=True
     )
-    payment_transaction_id = models.CharField(
-        _('ID de transacción'),
-        max_length=255,
+
+    class Meta:
+        verbose_name = _('Datos de envío')
+        verbose_name_plural = _('Datos de envío')
+
+    def __str__(self):
+        return self.address or self.tracking_code or str(self.income_id)
+
+
+class IncomeNotes(IncomeDetail):
+    """
+    Notas del cliente y del vendedor de un ingreso
+    """
+    income = models.OneToOneField(
+        Income,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notes_detail',
+        verbose_name=_('Ingreso')
+    )
+    buyer_notes = models.TextField(
+        _('Notas del cliente'),
         blank=True,
         null=True
     )
-    discount_coupon = models.CharField(
-        _('Cupón de descuento'),
-        max_length=100,
+    seller_notes = models.TextField(
+        _('Notas del vendedor'),
         blank=True,
         null=True
     )
 
-    # Información del producto
+    class Meta:
+        verbose_name = _('Notas')
+        verbose_name_plural = _('Notas')
+
+    def __str__(self):
+        return str(self.income_id)
+
+
+class IncomeLine(models.Model):
+    """
+    Línea de producto de un ingreso. Al insertar, modificar o borrar líneas
+    un trigger recalcula Income.product_subtotal
+    """
+    income = models.ForeignKey(
+        Income,
+        on_delete=models.CASCADE,
+        related_name='lines',
+        verbose_name=_('Ingreso')
+    )
     product_name = models.CharField(
         _('Nombre del producto'),
         max_length=255,
         blank=True,
         null=True
     )
-    product_price = models.DecimalField(
-        _('Precio del producto'),
-        max_digits=12,
-        decimal_places=2,
-        default=0
-    )
-    product_quantity = models.PositiveIntegerField(
-        _('Cantidad del producto'),
-        default=1
-    )
     sku = models.CharField(
         _('SKU'),
         max_length=50,
         blank=True,
         null=True
     )
-    is_physical_product = models.BooleanField(
-        _('Producto Físico'),
-        default=True
-    )
-
-    # Información adicional
-    channel = models.CharField(
-        _('Canal de venta'),
-        max_length=50,
-        blank=True,
-        null=True
-    )
-    tracking_code = models.CharField(
-        _('Código de tracking'),
-        max_length=100,
-        blank=True,
-        null=True
+    price = models.DecimalField(
+        _('Precio unitario'),
+        max_digits=12,
+        decimal_places=2,
+        default=0
     )
-
-    # Información de personal
-    registered_by = models.CharField(
-        _('Registrado por'),
-        max_length=100,
-        blank=True,
-        null=True
+    quantity = models.PositiveIntegerField(
+        _('Cantidad'),
+        default=1
     )
-    sales_branch = models.CharField(
-        _('Sucursal'),
-        max_length=100,
-        blank=True,
-        null=True
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.SET_NULL,
+        verbose_name=_('Producto del catálogo'),
+        related_name='income_lines',
+        null=True,
+        blank=True
     )
-    seller = models.CharField(
-        _('Vendedor'),
-        max_length=100,
-        blank=True,
-        null=True
+    subtotal = models.GeneratedField(
+        verbose_name=_('Subtotal'),
+        expression=F('price') * F('quantity'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
     )
 
-    # Notas
-    buyer_notes = models.TextField(
-        _('Notas del cliente'),
-        blank=True,
-        null=True
+    class Meta:
+        verbose_name = _('Línea de producto')
+        verbose_name_plural = _('Líneas de producto')
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['sku'], name='incomeline_sku_idx'),
+            models.Index(fields=['product_name'], name='incomeline_product_name_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name or self.sku or '-'}"
+
+
+class ExchangeRate(models.Model):
+    """
+    Cotización de una moneda a otra vigente desde una fecha. A un ingreso
+    se le aplica la última cotización con fecha menor o igual a la suya
+    """
+    date = models.DateField(_('Fecha'))
+    from_currency = models.CharField(
+        _('Moneda origen'),
+        max_length=3,
+        choices=Currency.choices
     )
-    seller_notes = models.TextField(
-        _('Notas del vendedor'),
-        blank=True,
-        null=True
+    to_currency = models.CharField(
+        _('Moneda destino'),
+        max_length=3,
+        choices=Currency.choices
+    )
+    rate = models.DecimalField(
+        _('Cotización'),
+        max_digits=18,
+        decimal_places=6,
+        help_text=_('Unidades de la moneda destino por unidad de la moneda origen')
     )
-
-    # Metadatos
     created_at = models.DateTimeField(
         _('Fecha de creación'),
         auto_now_add=True
@@ -293,36 +731,25 @@ class Income(models.Model):
     )
 
     class Meta:
-        verbose_name = _('Ingreso')
-        verbose_name_plural = _('Ingresos')
-        ordering = ['-date']
-        indexes = [
-            models.Index(fields=['order_number']),
-            models.Index(fields=['date']),
-            models.Index(fields=['order_status']),
-            models.Index(fields=['payment_status']),
-            models.Index(fields=['business_type']),
-            models.Index(fields=['business_unit']),
-            models.Index(fields=['buyer_name']),
-            models.Index(fields=['id']),
+        verbose_name = _('Cotización')
+        verbose_name_plural = _('Cotizaciones')
+        ordering = ['-date', 'from_currency', 'to_currency']
+        constraints = [
+            # También sirve para buscar la última cotización por fecha
+            models.UniqueConstraint(
+                fields=['from_currency', 'to_currency', 'date'],
+                name='unique_exchange_rate_per_date'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(rate__gt=0),
+                name='exchange_rate_positive'
+            ),
+            models.CheckConstraint(
+                condition=~models.Q(from_currency=F('to_currency')),
+                name='exchange_rate_distinct_currencies'
+            ),
         ]
 
     def __str__(self):
-        business_unit_name = self.business_unit.name if self.business_unit else 'Sin unidad'
-        return (f"{business_unit_name} - {self.get_business_type_display()} - "
-                f"#{self.order_number} - {self.buyer_name or 'Sin cliente'} - "
-                f"{self.total} {self.currency}")
-
-    def save(self, *args, **kwargs):
-        from decimal import Decimal
-
-        product_subtotal = self.product_subtotal or Decimal('0')
-        discount = self.discount or Decimal('0')
-        shipping_cost = self.shipping_cost or Decimal('0')
-
-        discount = min(discount, product_subtotal)
-
-        self.total = product_subtotal - discount + shipping_cost
-        self.total = max(self.total, Decimal('0'))
-
-        super().save(*args, **kwargs)
+        return (f"{self.date:%d/%m/%Y} - 1 {self.from_currency} = "
+                f"{self.rate} {self.to_currency}")
@@ -1,11 +1,18 @@
 from import_export import resources, fields
-from import_export.widgets import ForeignKeyWidget, DateWidget
+from import_export.widgets import (
+    DateWidget, DecimalWidget, ForeignKeyWidget, IntegerWidget
+)
 
 from .models import Income
 from tenant.models import BusinessUnit
 
 
 class IncomeResource(resources.ModelResource):
+    """
+    Exporta una fila por línea de producto, repitiendo los datos de la orden.
+    Al importar, las filas con la misma unidad de negocio y número de orden
+    se agrupan en un único ingreso con varias líneas
+    """
     business_unit = fields.Field(
         column_name='Unidad Negocio',
         attribute='business_unit',
@@ -35,7 +42,8 @@ class IncomeResource(resources.ModelResource):
 
     total = fields.Field(
         column_name='Total',
-        attribute='total'
+        attribute='total',
+        readonly=True
     )
 
     currency = fields.Field(
@@ -43,6 +51,18 @@ class IncomeResource(resources.ModelResource):
         attribute='currency'
     )
 
+    exchange_rate = fields.Field(
+        column_name='Cotización',
+        attribute='exchange_rate',
+        readonly=True
+    )
+
+    total_base = fields.Field(
+        column_name='Total Moneda Reporte',
+        attribute='total_base',
+        readonly=True
+    )
+
     payment_status = fields.Field(
         column_name='Estado de Pago',
         attribute='payment_status'
@@ -63,24 +83,30 @@ class IncomeResource(resources.ModelResource):
         attribute='payment_method'
     )
 
+    # Columnas de la línea de producto: no son atributos del ingreso, se
+    # completan en dehydrate_* y se agrupan en before_import
     product_name = fields.Field(
-        column_name='Producto',
-        attribute='product_name'
+        column_name='Producto'
+    )
+
+    sku = fields.Field(
+        column_name='SKU'
     )
 
     product_price = fields.Field(
         column_name='Precio Producto',
-        attribute='product_price'
+        widget=DecimalWidget()
     )
 
     product_quantity = fields.Field(
         column_name='Cantidad',
-        attribute='product_quantity'
+        widget=IntegerWidget()
     )
 
     product_subtotal = fields.Field(
         column_name='Subtotal',
-        attribute='product_subtotal'
+        attribute='product_subtotal',
+        readonly=True
     )
 
     discount = fields.Field(
@@ -198,8 +224,9 @@ class IncomeResource(resources.ModelResource):
         model = Income
         fields = (
             'id', 'date', 'business_unit', 'business_type', 'order_number',
-            'buyer_name', 'total', 'currency', 'payment_status', 'order_status',
-            'shipping_status', 'payment_method', 'product_name', 'product_price',
+            'buyer_name', 'total', 'currency', 'exchange_rate', 'total_base',
+            'payment_status', 'order_status',
+            'shipping_status', 'payment_method', 'product_name', 'sku', 'product_price',
             'product_quantity', 'product_subtotal', 'discount', 'shipping_cost',
             'discount_coupon', 'email', 'tax_id', 'phone', 'shipping_name',
             'shipping_phone', 'address', 'address_number', 'floor_apt',
@@ -209,8 +236,9 @@ class IncomeResource(resources.ModelResource):
         )
         export_order = (
             'id', 'date', 'business_unit', 'business_type', 'order_number',
-            'buyer_name', 'total', 'currency', 'payment_status', 'order_status',
-            'shipping_status', 'payment_method', 'product_name', 'product_price',
+            'buyer_name', 'total', 'currency', 'exchange_rate', 'total_base',
+            'payment_status', 'order_status',
+            'shipping_status', 'payment_method', 'product_name', 'sku', 'product_price',
             'product_quantity', 'product_subtotal', 'discount', 'shipping_cost',
             'discount_coupon', 'email', 'tax_id', 'phone', 'shipping_name',
             'shipping_phone', 'address', 'address_number', 'floor_apt',
@@ -219,3 +247,79 @@ class IncomeResource(resources.ModelResource):
             'buyer_notes', 'seller_notes', 'created_at'
         )
         import_id_fields = ['id']
+
+    def filter_export(self, queryset, **kwargs):
+        # Las tablas laterales se traen en la misma consulta
+        return super().filter_export(queryset, **kwargs).select_related(
+            'business_unit', *Income.DETAIL_RELATIONS
+        ).prefetch_related('lines')
+
+    def iter_queryset(self, queryset):
+        for income in super().iter_queryset(queryset):
+            for line in income.lines.all() or [None]:
+                income._export_line = line
+                yield income
+
+    def _line_value(self, obj, name):
+        line = getattr(obj, '_export_line', None)
+        return getattr(line, name) if line is not None else None
+
+    def dehydrate_product_name(self, obj):
+        return self._line_value(obj, 'product_name')
+
+    def dehydrate_sku(self, obj):
+        return self._line_value(obj, 'sku')
+
+    def dehydrate_product_price(self, obj):
+        return self._line_value(obj, 'price')
+
+    def dehydrate_product_quantity(self, obj):
+        return self._line_value(obj, 'quantity')
+
+    def _order_key(self, row):
+        return (
+            row.get(self.fields['business_unit'].column_name),
+            row.get(self.fields['order_number'].column_name),
+        )
+
+    def _clean_line_value(self, row, name):
+        field = self.fields[name]
+        if field.column_name not in row:
+            return None
+        return field.clean(row)
+
+    def before_import(self, dataset, **kwargs):
+        """
+        Junta las líneas de cada orden y deja una sola fila por orden
+        """
+        super().before_import(dataset, **kwargs)
+        self.lines_by_order = {}
+        rows = []
+
+        for data_row in dataset:
+            row = dict(zip(dataset.headers, data_row))
+            key = self._order_key(row)
+            if key not in self.lines_by_order:
+                self.lines_by_order[key] = []
+                rows.append(data_row)
+
+            line = {
+                'product_name': self._clean_line_value(row, 'product_name'),
+                'sku': self._clean_line_value(row, 'sku'),
+                'price': self._clean_line_value(row, 'product_price') or 0,
+                'quantity': self._clean_line_value(row, 'product_quantity') or 1,
+            }
+            if line['product_name'] or line['sku'] or line['price']:
+                self.lines_by_order[key].append(line)
+
+        headers = dataset.headers
+        dataset.wipe()
+        dataset.headers = headers
+        for data_row in rows:
+            dataset.append(data_row)
+
+    def after_save_instance(self, instance, row, **kwargs):
+        super().after_save_instance(instance, row, **kwargs)
+        lines = self.lines_by_order.get(self._order_key(row))
+        if instance.pk is not None and lines:
+            instance.replace_lines(lines)
@@ -0,0 +1,146 @@
+from rest_framework import serializers
+
+from thot.api import BusinessUnitScopedSerializer
+from .models import Income, IncomeLine
+
+# Los campos de las tablas laterales son opcionales y admiten nulos
+OPTIONAL = {'required': False, 'allow_null': True, 'allow_blank': True}
+
+
+class IncomeLineSerializer(serializers.ModelSerializer):
+    subtotal = serializers.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        read_only=True
+    )
+
+    class Meta:
+        model = IncomeLine
+        fields = ('id', 'product_name', 'sku', 'price', 'quantity', 'subtotal')
+
+
+class IncomeSerializer(BusinessUnitScopedSerializer):
+    business_unit_name = serializers.CharField(
+        source='business_unit.name',
+        read_only=True,
+        default=None
+    )
+    customer_name = serializers.CharField(
+        source='business_unit.customer.name',
+        read_only=True,
+        default=None
+    )
+    total = serializers.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        read_only=True
+    )
+    total_base = serializers.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        read_only=True
+    )
+    # Al enviar lines se reemplazan todas las líneas del ingreso
+    lines = IncomeLineSerializer(many=True, required=False)
+
+    # Campos guardados en las tablas laterales (ver Income.DETAIL_RELATIONS)
+    email = serializers.EmailField(max_length=255, **OPTIONAL)
+    tax_id = serializers.CharField(max_length=20, **OPTIONAL)
+    phone = serializers.CharField(max_length=20, **OPTIONAL)
+    shipping_name = serializers.CharField(max_length=255, **OPTIONAL)
+    shipping_phone = serializers.CharField(max_length=20, **OPTIONAL)
+    address = serializers.CharField(max_length=255, **OPTIONAL)
+    address_number = serializers.CharField(max_length=20, **OPTIONAL)
+    floor_apt = serializers.CharField(max_length=50, **OPTIONAL)
+    locality = serializers.CharField(max_length=100, **OPTIONAL)
+    city = serializers.CharField(max_length=100, **OPTIONAL)
+    postal_code = serializers.CharField(max_length=20, **OPTIONAL)
+    state_province = serializers.CharField(max_length=100, **OPTIONAL)
+    country = serializers.CharField(max_length=100, **OPTIONAL)
+    tracking_code = serializers.CharField(max_length=100, **OPTIONAL)
+    buyer_notes = serializers.CharField(**OPTIONAL)
+    seller_notes = serializers.CharField(**OPTIONAL)
+
+    class Meta:
+        model = Income
+        fields = '__all__'
+        read_only_fields = ('product_subtotal', 'created_at', 'updated_at')
+
+    def validate(self, attrs):
+        """
+        Misma validación que el admin: el total calculado debe ser mayor que 0
+        """
+        attrs = super().validate(attrs)
+
+        def current(name):
+            if name in attrs:
+                return attrs[name] or 0
+            return getattr(self.instance, name, 0) or 0
+
+        if 'lines' in attrs:
+            product_subtotal = sum(
+                line.get('price', 0) * line.get('quantity', 1)
+                for line in attrs['lines']
+            )
+        else:
+            product_subtotal = self.current_product_subtotal(attrs)
+
+        calculated_total = (
+            product_subtotal - min(current('discount'), product_subtotal) +
+            current('shipping_cost')
+        )
+        if calculated_total <= 0:
+            raise serializers.ValidationError({
+                'lines': f'El total calculado ({calculated_total}) debe ser mayor que 0. Agregue productos o ajuste el descuento o costo de envío.'
+            })
+
+        return attrs
+
+    def current_product_subtotal(self, attrs):
+        """
+        Subtotal de las líneas ya guardadas, para los datos sin lines
+        """
+        return getattr(self.instance, 'product_subtotal', 0) or 0
+
+    def create(self, validated_data):
+        lines = validated_data.pop('lines', None)
+        instance = super().create(validated_data)
+        if lines is not None:
+            instance.replace_lines(lines)
+        return instance
+
+    def update(self, instance, validated_data):
+        lines = validated_data.pop('lines', None)
+        instance = super().update(instance, validated_data)
+        if lines is not None:
+            instance.replace_lines(lines)
+        elif 'order_status' in validated_data:
+            instance.sync_stock()
+        return instance
+
+
+class IncomeBulkSerializer(IncomeSerializer):
+    """
+    Serializer usado por la carga masiva: la unidad de negocio y el
+    subtotal de las órdenes existentes se validan contra lo precargado en
+    el contexto para no consultar la base por cada fila, y la unicidad de la
+    orden la resuelve el upsert
+    """
+    business_unit = serializers.IntegerField()
+
+    class Meta(IncomeSerializer.Meta):
+        validators = []
+
+    def validate_business_unit(self, value):
+        if value not in self.context['business_unit_ids']:
+            raise serializers.ValidationError(
+                'Unidad de negocio inexistente o sin acceso.'
+            )
+        return value
+
+    def current_product_subtotal(self, attrs):
+        # Sin instancia: una fila sin lines conserva las líneas de la orden
+        # que reemplaza
+        return self.context['product_subtotals'].get(
+            (attrs['business_unit'], attrs['order_number']), 0
+        )
@@ -0,0 +1,91 @@
+"""
+Estadísticas de ingresos compartidas por el pie del changelist y la API.
+Los montos están en la moneda de reporte de cada empresa (total_base), así
+que cada total se agrupa además por esa moneda; los ingresos sin cotización
+para su fecha no suman y se informan aparte
+"""
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .constants import DEFAULT_REPORTING_CURRENCY
+
+# Moneda de total_base: la de reporte de la empresa, o la moneda por defecto
+# para los ingresos sin unidad de negocio
+REPORTING_CURRENCY = Coalesce(
+    F('business_unit__customer__reporting_currency'),
+    Value(DEFAULT_REPORTING_CURRENCY)
+)
+
+LAST_MONTHS = 3
+
+_TOTALS = {
+    'sin_cotizacion': Count('id', filter=Q(exchange_rate__isnull=True)),
+}
+
+
+def _grouped_totals(queryset):
+    queryset = queryset.annotate(moneda=REPORTING_CURRENCY)
+    return {
+        'por_moneda': queryset.values(
+            'moneda'
+        ).annotate(
+            total=Sum('total_base')
+        ).order_by('moneda'),
+        'por_tipo': queryset.values(
+            'moneda', 'business_type'
+        ).annotate(
+            total=Sum('total_base')
+        ).order_by('moneda', '-total'),
+        'por_mes': queryset.annotate(
+            mes=TruncMonth('date')
+        ).values('moneda', 'mes').annotate(
+            total=Sum('total_base')
+        ).order_by('-mes', 'moneda'),
+        'por_unidad': queryset.values(
+            'moneda', 'business_unit__name'
+        ).annotate(
+            total=Sum('total_base')
+        ).order_by('moneda', '-total'),
+        'por_cliente': queryset.values(
+            'moneda', 'business_unit__customer__name'
+        ).annotate(
+            total=Sum('total_base')
+        ).order_by('moneda', '-total'),
+    }
+
+
+def _last_months(rows):
+    """
+    Filas de los últimos LAST_MONTHS meses con ingresos, en cualquier moneda
+    """
+    months = sorted({row['mes'] for row in rows}, reverse=True)[:LAST_MONTHS]
+    return [row for row in rows if row['mes'] in months]
+
+
+def _totals(aggregated, grouped):
+    totals = {'sin_cotizacion': aggregated['sin_cotizacion']}
+    for name, rows in grouped.items():
+        for row in rows:
+            row['total'] = row['total'] or 0
+        totals[name] = _last_months(rows) if name == 'por_mes' else rows
+    return totals
+
+
+def get_income_totals(queryset):
+    return _totals(
+        queryset.aggregate(**_TOTALS),
+        {
+            name: list(grouped)
+            for name, grouped in _grouped_totals(queryset).items()
+        }
+    )
+
+
+async def aget_income_totals(queryset):
+    return _totals(
+        await queryset.aaggregate(**_TOTALS),
+        {
+            name: [row async for row in grouped]
+            for name, grouped in _grouped_totals(queryset).items()
+        }
+    )
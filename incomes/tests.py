@@ -1,3 +1,812 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.admin import helpers
+from django.contrib.admin.models import CHANGE, DELETION, LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from products.models import Product
+from tenant.models import BusinessUnit, BusinessUnitUser, Customer, DeletedRecord
+from thot.admin_actions import _delete_chunk
+
+from .constants import Currency, OrderStatus, ShippingStatus
+from .exchange import incomes_for_rate, recompute_exchange_rates
+from .models import (
+    ExchangeRate, Income, IncomeContact, IncomeLine, IncomeNotes, IncomeShipping
+)
+from .stats import get_income_totals
+
+User = get_user_model()
+
+
+class IncomeTestData:
+    """
+    Empresa con una unidad propia y una ajena, y un operador con todos los
+    permisos de ingresos asignado a la propia
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = User.objects.create_user(
+            f'{cls.__name__}-operator', 'operator@example.com', 'x', is_staff=True
+        )
+        cls.operator.user_permissions.set(Permission.objects.filter(
+            content_type__app_label='incomes'
+        ))
+        cls.customer = Customer.objects.create(
+            name=f'Empresa {cls.__name__}', email='empresa@example.com'
+        )
+        cls.own_unit = BusinessUnit.objects.create(customer=cls.customer, name='Propia')
+        cls.other_unit = BusinessUnit.objects.create(customer=cls.customer, name='Ajena')
+        BusinessUnitUser.objects.create(user=cls.operator, business_unit=cls.own_unit)
+
+    @staticmethod
+    def create_income(business_unit, order_number, **fields):
+        fields.setdefault('date', date(2025, 3, 1))
+        fields.setdefault('shipping_cost', Decimal('10'))
+        return Income.objects.create(
+            business_unit=business_unit, order_number=order_number, **fields
+        )
+
+
+class IncomeApiTests(IncomeTestData, TestCase):
+    """
+    /api/incomes/: filtrado por unidad de negocio, selección de campos y
+    paginación por cursor
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.incomes = [
+            cls.create_income(cls.own_unit, f'API-{number}') for number in range(5)
+        ]
+        cls.foreign = cls.create_income(cls.other_unit, 'API-AJENA')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.operator)
+
+    def test_only_own_units(self):
+        response = self.client.get('/api/incomes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {row['id'] for row in response.data['results']},
+            {income.pk for income in self.incomes}
+        )
+        self.assertEqual(
+            self.client.get(f'/api/incomes/{self.foreign.pk}/').status_code, 404
+        )
+
+    def test_sparse_fields(self):
+        response = self.client.get('/api/incomes/?fields=id,order_number,total')
+        for row in response.data['results']:
+            self.assertEqual(set(row), {'id', 'order_number', 'total'})
+
+    def test_cursor_pagination(self):
+        seen = []
+        url = '/api/incomes/?page_size=2&fields=id'
+        while url:
+            response = self.client.get(url)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, sorted((income.pk for income in self.incomes), reverse=True))
+
+    def test_changes_feed(self):
+        # El feed no entrega lo modificado en los últimos segundos
+        past = timezone.now() - timedelta(minutes=5)
+        Income.all_objects.update(updated_at=past)
+        Income.all_objects.filter(pk=self.incomes[1].pk).soft_delete()
+        Income.all_objects.filter(pk=self.incomes[1].pk).update(updated_at=past)
+
+        seen = []
+        params = {'limit': 2}
+        while True:
+            response = self.client.get('/api/incomes/changes/', params)
+            self.assertEqual(response.status_code, 200)
+            seen += response.data['results']
+            if not response.data['has_more']:
+                break
+            params = {'limit': 2, **response.data['next']}
+
+        self.assertEqual(
+            [row['id'] for row in seen], [income.pk for income in self.incomes]
+        )
+        self.assertTrue(seen[1]['deleted'])
+        self.assertEqual(seen[0]['order_number'], 'API-0')
+
+        # Lo modificado recién se ve una vez pasado el margen
+        self.incomes[0].save()
+        response = self.client.get('/api/incomes/changes/', response.data['next'])
+        self.assertEqual(response.data['results'], [])
+
+    def test_changes_feed_hard_deletes(self):
+        # Los borrados físicos (acciones del admin) dejan tombstone en su lugar
+        past = timezone.now() - timedelta(minutes=5)
+        Income.all_objects.update(updated_at=past)
+        deleted = [self.incomes[2].pk, self.foreign.pk]
+        Income.all_objects.filter(pk__in=deleted).delete()
+        DeletedRecord.objects.filter(
+            model='incomes.income', object_id__in=deleted
+        ).update(deleted_at=past)
+
+        seen = []
+        params = {'limit': 2}
+        while True:
+            response = self.client.get('/api/incomes/changes/', params)
+            seen += response.data['results']
+            if not response.data['has_more']:
+                break
+            params = {'limit': 2, **response.data['next']}
+
+        self.assertEqual(
+            [row['id'] for row in seen], [income.pk for income in self.incomes]
+        )
+        self.assertEqual(seen[2], {
+            'id': self.incomes[2].pk,
+            'deleted': True,
+            'deleted_at': past.isoformat(),
+            'updated_at': past.isoformat(),
+        })
+
+    def test_changes_invalid_limit(self):
+        for limit in ('0', '-5'):
+            response = self.client.get('/api/incomes/changes/', {'limit': limit})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('limit', response.data)
+
+    def test_create_and_soft_delete(self):
+        response = self.client.post('/api/incomes/', {
+            'business_unit': self.own_unit.pk,
+            'order_number': 'API-NUEVA',
+            'date': '2025-03-02',
+            'lines': [{'product_name': 'Remera', 'price': '100', 'quantity': 2}],
+            'email': 'cliente@example.com',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['total'], '200.00')
+
+        income = Income.objects.get(pk=response.data['id'])
+        self.assertEqual(income.contact_detail.email, 'cliente@example.com')
+
+        self.assertEqual(self.client.delete(f'/api/incomes/{income.pk}/').status_code, 204)
+        self.assertTrue(Income.all_objects.get(pk=income.pk).is_deleted)
+
+    def test_foreign_business_unit_rejected(self):
+        response = self.client.post('/api/incomes/', {
+            'business_unit': self.other_unit.pk,
+            'order_number': 'API-X',
+            'date': '2025-03-02',
+            'shipping_cost': '10',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('business_unit', response.data)
+
+
+class IncomeBulkApiTests(IncomeTestData, TestCase):
+    """
+    /api/incomes/bulk/: upsert por número de orden, reemplazo completo de
+    las órdenes existentes y permisos de alta
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.operator)
+
+    def bulk(self, rows):
+        return self.client.post('/api/incomes/bulk/', rows, format='json')
+
+    def row(self, order_number, **fields):
+        return {
+            'business_unit': self.own_unit.pk,
+            'order_number': order_number,
+            'date': '2025-04-01',
+            'shipping_cost': '10',
+            **fields,
+        }
+
+    def test_insert_then_replace(self):
+        response = self.bulk([
+            self.row(
+                'B-1', email='uno@example.com', seller_notes='Nota', discount='1',
+                lines=[{'sku': 'a-1', 'price': '5', 'quantity': 2}]
+            ),
+            self.row('B-2', lines=[{'sku': 'a-1', 'price': '5', 'quantity': 3}]),
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['upserted'], 2)
+
+        income = Income.objects.get(order_number='B-1')
+        self.assertEqual(income.total, Decimal('19.00'))
+        self.assertEqual(income.contact_detail.email, 'uno@example.com')
+        self.assertEqual(
+            Income.objects.get(order_number='B-2').total, Decimal('25.00')
+        )
+
+        # La fila reemplaza la orden: lo omitido vuelve al valor por defecto,
+        # salvo las líneas, que solo se reemplazan si vienen
+        response = self.bulk([self.row('B-1', shipping_cost='20')])
+        self.assertEqual(response.status_code, 200, response.data)
+        income = Income.objects.get(pk=income.pk)
+        self.assertEqual(income.discount, 0)
+        self.assertEqual(income.total, Decimal('30.00'))
+        self.assertIsNone(income.email)
+        self.assertIsNone(income.seller_notes)
+        self.assertEqual(Income.objects.filter(order_number='B-1').count(), 1)
+
+    def test_row_without_lines_keeps_existing_subtotal(self):
+        income = self.create_income(self.own_unit, 'B-8', shipping_cost=0)
+        income.replace_lines([{'sku': 'a-1', 'price': '5', 'quantity': 2}])
+
+        response = self.bulk([self.row('B-8', shipping_cost='0')])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(Income.objects.get(pk=income.pk).total, Decimal('10.00'))
+
+        response = self.bulk([self.row('B-9', shipping_cost='0')])
+        self.assertEqual(response.status_code, 400)
+
+    def test_row_errors_do_not_stop_the_batch(self):
+        response = self.bulk([
+            self.row('B-3'),
+            self.row('B-3'),
+            self.row('B-4', business_unit=self.other_unit.pk),
+            self.row('B-5', shipping_cost='0'),
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['upserted'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4])
+
+    def test_new_orders_require_add_permission(self):
+        self.create_income(self.own_unit, 'B-6')
+        self.operator.user_permissions.remove(
+            Permission.objects.get(codename='add_income')
+        )
+
+        self.assertEqual(self.bulk([self.row('B-6', shipping_cost='30')]).status_code, 200)
+        self.assertEqual(Income.objects.get(order_number='B-6').total, Decimal('30.00'))
+
+        response = self.bulk([self.row('B-6'), self.row('B-7')])
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Income.all_objects.filter(order_number='B-7').exists())
+
+
+class ReuseDeletedOrderTests(IncomeTestData, TestCase):
+    """
+    Volver a cargar un número de orden eliminado reutiliza su fila en lugar
+    de chocar con la restricción única
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_recreate_deleted_order(self):
+        deleted = self.create_income(self.own_unit, 'R-1', email='viejo@example.com')
+        deleted.replace_lines([{'product_name': 'Remera', 'price': 50, 'quantity': 1}])
+        deleted.soft_delete()
+
+        income = self.create_income(self.own_unit, 'R-1', shipping_cost=Decimal('5'))
+        self.assertEqual(income.pk, deleted.pk)
+
+        income = Income.objects.get(pk=income.pk)
+        self.assertEqual(income.total, Decimal('5.00'))
+        self.assertFalse(income.lines.exists())
+        self.assertIsNone(income.email)
+        self.assertEqual(Income.all_objects.filter(order_number='R-1').count(), 1)
+
+    def test_recreate_deleted_order_from_api(self):
+        self.create_income(self.own_unit, 'R-2').soft_delete()
+
+        client = APIClient()
+        client.force_authenticate(self.operator)
+        response = client.post('/api/incomes/', {
+            'business_unit': self.own_unit.pk,
+            'order_number': 'R-2',
+            'date': '2025-03-02',
+            'shipping_cost': '15',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['total'], '15.00')
+        self.assertFalse(Income.all_objects.get(order_number='R-2').is_deleted)
+
+    def test_live_order_still_rejected(self):
+        self.create_income(self.own_unit, 'R-3')
+
+        client = APIClient()
+        client.force_authenticate(self.operator)
+        response = client.post('/api/incomes/', {
+            'business_unit': self.own_unit.pk,
+            'order_number': 'R-3',
+            'date': '2025-03-02',
+            'shipping_cost': '15',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class IncomeStatsTests(IncomeTestData, TestCase):
+    """
+    /api/stats/incomes/: vista async con autenticación JWT o de sesión
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.create_income(cls.own_unit, 'S-1', date=date(2025, 3, 1))
+        cls.create_income(cls.own_unit, 'S-2', date=date(2025, 4, 1), shipping_cost=Decimal('30'))
+        cls.create_income(cls.other_unit, 'S-3', shipping_cost=Decimal('500'))
+
+    def setUp(self):
+        cache.clear()
+        token = RefreshToken.for_user(self.operator).access_token
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    async def test_totals_of_own_units(self):
+        response = await self.async_client.get('/api/stats/incomes/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['por_moneda'], [{'moneda': 'ARS', 'total': '40.00'}])
+        self.assertEqual(
+            [row['business_unit__name'] for row in data['por_unidad']], ['Propia']
+        )
+
+    async def test_filters(self):
+        response = await self.async_client.get(
+            '/api/stats/incomes/', {'date_from': '2025-04-01'}, headers=self.headers
+        )
+        self.assertEqual(response.json()['por_moneda'][0]['total'], '30.00')
+
+        response = await self.async_client.get(
+            '/api/stats/incomes/', {'date_to': '01/04/2025'}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+    async def test_requires_credentials_and_permission(self):
+        response = await self.async_client.get('/api/stats/incomes/')
+        self.assertEqual(response.status_code, 401)
+
+        viewer = await User.objects.acreate_user('sin-permisos', password='x')
+        token = RefreshToken.for_user(viewer).access_token
+        response = await self.async_client.get(
+            '/api/stats/incomes/', headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class ConditionalGetTests(IncomeTestData, TestCase):
+    """
+    Las listas de ingresos, sus totales y la API responden 304 mientras no
+    cambie nada en las unidades de negocio del usuario. Solo con una caché
+    compartida entre workers; aquí una en archivos
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.income = cls.create_income(cls.own_unit, 'E-1')
+
+    def setUp(self):
+        self.enterContext(override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': self.enterContext(tempfile.TemporaryDirectory()),
+            }
+        }))
+        self.client.force_login(self.operator)
+
+    def create_change(self, business_unit, order_number):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_income(business_unit, order_number, date=date(2025, 3, 2))
+
+    def assertRevalidates(self, url, **headers):
+        # El primer pedido fija la cookie CSRF, que forma parte del ETag
+        self.client.get(url, **headers)
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotIn('no-store', response['Cache-Control'])
+
+        # Solo sesión, usuario y unidades: ninguna consulta de la lista
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([
+            query for query in queries if 'incomes_income' in query['sql']
+        ])
+
+        # Un cambio en otra unidad no invalida la página del operador
+        self.create_change(self.other_unit, f'{url}-ajena')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(response.status_code, 304)
+
+        self.create_change(self.own_unit, f'{url}-propia')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_changelist(self):
+        self.assertRevalidates(reverse('admin:incomes_income_changelist'))
+
+    def test_stats(self):
+        self.assertRevalidates(reverse('income_stats'))
+
+    def test_api_list(self):
+        token = RefreshToken.for_user(self.operator).access_token
+        self.assertRevalidates('/api/incomes/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_etag_depends_on_query_string(self):
+        url = reverse('admin:incomes_income_changelist')
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url + '?o=1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_business_units(self):
+        url = reverse('admin:incomes_income_changelist')
+        # La unidad que se asigna después tiene cambios más viejos que la
+        # propia: la versión no sube
+        self.create_change(self.other_unit, 'E-AJENA')
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            BusinessUnitUser.objects.create(
+                user=self.operator, business_unit=self.other_unit
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_move_to_other_unit_invalidates(self):
+        url = reverse('admin:incomes_income_changelist')
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+
+        income = Income.objects.get(pk=self.income.pk)
+        income.business_unit = self.other_unit
+        with self.captureOnCommitCallbacks(execute=True):
+            income.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_action_invalidates(self):
+        url = reverse('admin:incomes_income_changelist')
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {
+                'action': 'soft_delete_selected',
+                '_selected_action': [self.income.pk],
+            })
+        # Muestra (y consume) el mensaje de la acción
+        self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_disabled_with_local_cache(self):
+        url = reverse('admin:incomes_income_changelist')
+        with override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        }):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertIn('no-store', response['Cache-Control'])
+
+
+class GeneratedTotalTests(IncomeTestData, TestCase):
+    """
+    total lo calcula la base: subtotal menos descuento (sin pasar del
+    subtotal) más envío, nunca negativo
+    """
+
+    def test_total_follows_every_write(self):
+        income = self.create_income(self.own_unit, 'T-1', shipping_cost=Decimal('10'))
+        self.assertEqual(income.total, Decimal('10.00'))
+
+        income.replace_lines([{'product_name': 'Remera', 'price': 40, 'quantity': 2}])
+        self.assertEqual(income.total, Decimal('90.00'))
+
+        # Un UPDATE sin pasar por save() también recalcula
+        Income.objects.filter(pk=income.pk).update(discount=Decimal('25'))
+        income.refresh_from_db()
+        self.assertEqual(income.total, Decimal('65.00'))
+
+        income.discount = Decimal('500')
+        income.save()
+        self.assertEqual(income.total, Decimal('10.00'))
+
+    def test_never_negative(self):
+        income = self.create_income(
+            self.own_unit, 'T-2', shipping_cost=Decimal('-20')
+        )
+        self.assertEqual(income.total, Decimal('0.00'))
+
+
+class IncomeAdminActionTests(IncomeTestData, TestCase):
+    """
+    Acciones masivas del changelist de ingresos
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.operator)
+
+    def run_action(self, action, incomes, **data):
+        return self.client.post(
+            reverse('admin:incomes_income_changelist'),
+            {
+                'action': action,
+                helpers.ACTION_CHECKBOX_NAME: [income.pk for income in incomes],
+                **data,
+            }
+        )
+
+    def test_change_status_asks_for_target(self):
+        income = self.create_income(self.own_unit, 'A-1')
+        response = self.run_action('change_order_status', [income])
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'admin/incomes/income/change_status.html')
+
+    def test_change_status_only_allowed_transitions(self):
+        open_order = self.create_income(self.own_unit, 'A-2')
+        completed = self.create_income(
+            self.own_unit, 'A-3', order_status=OrderStatus.COMPLETED
+        )
+        foreign = self.create_income(self.other_unit, 'A-4')
+
+        response = self.run_action(
+            'change_order_status', [open_order, completed, foreign],
+            status=OrderStatus.CANCELLED, apply='1'
+        )
+        self.assertEqual(response.status_code, 302)
+
+        statuses = dict(Income.objects.values_list('order_number', 'order_status'))
+        self.assertEqual(statuses['A-2'], OrderStatus.CANCELLED)
+        self.assertEqual(statuses['A-3'], OrderStatus.COMPLETED)
+        self.assertEqual(statuses['A-4'], OrderStatus.OPEN)
+        self.assertEqual(
+            LogEntry.objects.filter(user=self.operator, action_flag=CHANGE).count(), 1
+        )
+
+    def test_empty_shipping_status_counts_as_not_required(self):
+        income = self.create_income(self.own_unit, 'A-5', shipping_status=None)
+        self.run_action(
+            'change_shipping_status', [income],
+            status=ShippingStatus.NOT_PACKAGED, apply='1'
+        )
+        income.refresh_from_db()
+        self.assertEqual(income.shipping_status, ShippingStatus.NOT_PACKAGED)
+
+    def test_soft_delete_selected(self):
+        income = self.create_income(self.own_unit, 'A-6')
+        foreign = self.create_income(self.other_unit, 'A-7')
+        self.run_action('soft_delete_selected', [income, foreign])
+
+        self.assertTrue(Income.all_objects.get(pk=income.pk).is_deleted)
+        self.assertFalse(Income.all_objects.get(pk=foreign.pk).is_deleted)
+        self.assertEqual(
+            LogEntry.objects.filter(user=self.operator, action_flag=DELETION).count(), 1
+        )
+
+    def test_fast_delete_selected(self):
+        income = self.create_income(self.own_unit, 'A-8', email='a8@example.com')
+        income.replace_lines([{'product_name': 'Remera', 'price': 10, 'quantity': 1}])
+
+        response = self.run_action('fast_delete_selected', [income])
+        self.assertContains(response, 'Líneas de producto')
+        self.assertTrue(Income.objects.filter(pk=income.pk).exists())
+
+        self.run_action('fast_delete_selected', [income], post='yes')
+        self.assertFalse(Income.all_objects.filter(pk=income.pk).exists())
+        self.assertTrue(DeletedRecord.objects.filter(
+            model='incomes.income', object_id=income.pk,
+            business_unit_id=self.own_unit.pk
+        ).exists())
+        self.assertFalse(IncomeLine.objects.filter(income_id=income.pk).exists())
+        self.assertFalse(IncomeContact.objects.filter(income_id=income.pk).exists())
+
+
+class DeleteChunkTests(IncomeTestData, TestCase):
+    """
+    _delete_chunk resuelve las relaciones igual que el Collector de Django
+    """
+
+    def test_protect_is_left_to_the_database(self):
+        business_unit = BusinessUnit.objects.create(customer=self.customer, name='Borrar')
+        self.create_income(business_unit, 'D-1')
+
+        # Las FK de Django se verifican al confirmar la transacción
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            _delete_chunk(BusinessUnit, [business_unit.pk])
+            with connection.cursor() as cursor:
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+        self.assertTrue(BusinessUnit.objects.filter(pk=business_unit.pk).exists())
+
+    def test_nested_cascade_and_set_null(self):
+        # Empresa -> productos (CASCADE) -> líneas (SET_NULL)
+        customer = Customer.objects.create(name='Borrar', email='borrar@example.com')
+        product = Product.objects.create(customer=customer, sku='d-2', name='Taza')
+        income = self.create_income(self.own_unit, 'D-2')
+        income.replace_lines([{'product_name': 'Taza', 'price': 10, 'quantity': 1}])
+        income.lines.update(product=product)
+
+        with transaction.atomic():
+            self.assertEqual(_delete_chunk(Customer, [customer.pk]), 1)
+        self.assertFalse(Product.objects.filter(pk=product.pk).exists())
+        self.assertIsNone(income.lines.get().product)
+
+
+class IncomeDetailTests(IncomeTestData, TestCase):
+    """
+    Contacto, envío y notas viven en tablas uno a uno que solo tienen fila
+    si hay algún dato
+    """
+
+    def test_rows_only_when_there_is_data(self):
+        income = self.create_income(self.own_unit, 'L-1', email='l1@example.com')
+        self.assertTrue(IncomeContact.objects.filter(income=income).exists())
+        self.assertFalse(IncomeShipping.objects.filter(income=income).exists())
+        self.assertFalse(IncomeNotes.objects.filter(income=income).exists())
+
+        income = Income.objects.get(pk=income.pk)
+        income.email = None
+        income.city = 'Rosario'
+        income.save()
+        self.assertFalse(IncomeContact.objects.filter(income=income).exists())
+        self.assertEqual(IncomeShipping.objects.get(income=income).city, 'Rosario')
+
+    def test_update_fields_leaves_details_alone(self):
+        income = self.create_income(self.own_unit, 'L-2', seller_notes='Frágil')
+        income = Income.objects.get(pk=income.pk)
+        income.seller_notes = None
+        income.discount = Decimal('1')
+        income.save(update_fields=['discount'])
+        self.assertEqual(IncomeNotes.objects.get(income=income).seller_notes, 'Frágil')
+
+    def test_read_with_one_query(self):
+        self.create_income(self.own_unit, 'L-3', email='l3@example.com', city='Salta')
+        self.create_income(self.own_unit, 'L-4')
+
+        with self.assertNumQueries(1):
+            rows = {
+                income.order_number: (income.email, income.city, income.buyer_notes)
+                for income in Income.objects.select_related(*Income.DETAIL_RELATIONS)
+            }
+        self.assertEqual(rows['L-3'], ('l3@example.com', 'Salta', None))
+        self.assertEqual(rows['L-4'], (None, None, None))
+
+
+class IncomeLineTriggerTests(IncomeTestData, TestCase):
+    """
+    product_subtotal lo mantiene un trigger por sentencia sobre las líneas
+    """
+
+    def subtotal(self, income):
+        return Income.objects.values_list('product_subtotal', flat=True).get(pk=income.pk)
+
+    def test_insert_update_delete(self):
+        income = self.create_income(self.own_unit, 'P-1')
+        IncomeLine.objects.bulk_create([
+            IncomeLine(income=income, product_name='Remera', price=Decimal('10'), quantity=2),
+            IncomeLine(income=income, product_name='Taza', price=Decimal('5.5'), quantity=1),
+        ])
+        self.assertEqual(self.subtotal(income), Decimal('25.50'))
+
+        IncomeLine.objects.filter(income=income, product_name='Taza').update(quantity=3)
+        self.assertEqual(self.subtotal(income), Decimal('36.50'))
+
+        IncomeLine.objects.filter(income=income, product_name='Remera').delete()
+        self.assertEqual(self.subtotal(income), Decimal('16.50'))
+        self.assertEqual(
+            Income.objects.get(pk=income.pk).total, Decimal('26.50')
+        )
+
+    def test_moving_a_line_updates_both_incomes(self):
+        source = self.create_income(self.own_unit, 'P-2')
+        target = self.create_income(self.own_unit, 'P-3')
+        line = IncomeLine.objects.create(
+            income=source, product_name='Remera', price=Decimal('10'), quantity=1
+        )
+
+        IncomeLine.objects.filter(pk=line.pk).update(income=target)
+        self.assertEqual(self.subtotal(source), Decimal('0'))
+        self.assertEqual(self.subtotal(target), Decimal('10.00'))
+
+    def test_save_does_not_overwrite_subtotal(self):
+        income = self.create_income(self.own_unit, 'P-4')
+        stale = Income.objects.get(pk=income.pk)
+        income.replace_lines([{'product_name': 'Remera', 'price': 10, 'quantity': 4}])
+
+        stale.discount = Decimal('5')
+        stale.save()
+        self.assertEqual(self.subtotal(income), Decimal('40.00'))
+
+
+class ExchangeRateTests(IncomeTestData, TestCase):
+    """
+    total_base en la moneda de reporte de cada empresa
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.uyu_customer = Customer.objects.create(
+            name='Empresa UYU', email='uyu@example.com',
+            reporting_currency=Currency.UYU
+        )
+        cls.uyu_unit = BusinessUnit.objects.create(customer=cls.uyu_customer, name='Montevideo')
+
+    def test_latest_rate_until_income_date(self):
+        ExchangeRate.objects.create(
+            date=date(2025, 1, 1), from_currency=Currency.BRL,
+            to_currency=Currency.UYU, rate=Decimal('7')
+        )
+        ExchangeRate.objects.create(
+            date=date(2025, 6, 1), from_currency=Currency.BRL,
+            to_currency=Currency.UYU, rate=Decimal('8')
+        )
+        income = self.create_income(
+            self.uyu_unit, 'X-1', currency=Currency.BRL, date=date(2025, 3, 1)
+        )
+        income = Income.objects.get(pk=income.pk)
+        self.assertEqual(income.exchange_rate, Decimal('7'))
+        self.assertEqual(income.total_base, Decimal('70.00'))
+
+        same_currency = self.create_income(self.uyu_unit, 'X-2', currency=Currency.UYU)
+        self.assertEqual(
+            Income.objects.get(pk=same_currency.pk).total_base, Decimal('10.00')
+        )
+
+    def test_missing_rate_then_recompute(self):
+        income = self.create_income(
+            self.uyu_unit, 'X-3', currency=Currency.BRL, date=date(2025, 3, 1)
+        )
+        income = Income.objects.get(pk=income.pk)
+        self.assertIsNone(income.total_base)
+
+        rate = ExchangeRate.objects.create(
+            date=date(2025, 2, 1), from_currency=Currency.BRL,
+            to_currency=Currency.UYU, rate=Decimal('7.5')
+        )
+        recompute_exchange_rates(
+            incomes_for_rate(rate.from_currency, rate.to_currency, rate.date)
+        )
+        self.assertEqual(Income.objects.get(pk=income.pk).total_base, Decimal('75.00'))
+
+    def test_totals_grouped_by_reporting_currency(self):
+        self.create_income(self.own_unit, 'X-4', date=date(2025, 5, 1))
+        self.create_income(self.uyu_unit, 'X-5', currency=Currency.UYU, date=date(2025, 5, 1))
+        self.create_income(self.uyu_unit, 'X-6', currency=Currency.BRL, date=date(2025, 5, 1))
+
+        totals = get_income_totals(
+            Income.objects.filter(order_number__in=['X-4', 'X-5', 'X-6'])
+        )
+        self.assertEqual(totals['sin_cotizacion'], 1)
+        self.assertEqual(
+            [(row['moneda'], row['total']) for row in totals['por_moneda']],
+            [('ARS', Decimal('10.00')), ('UYU', Decimal('10.00'))]
+        )
+        self.assertEqual(
+            [(row['moneda'], row['total']) for row in totals['por_mes']],
+            [('ARS', Decimal('10.00')), ('UYU', Decimal('10.00'))]
+        )
+
+    def test_changelist_footer_labels_currency(self):
+        self.create_income(self.own_unit, 'X-7', shipping_cost=Decimal('1234.5'))
+        self.client.force_login(self.operator)
+        response = self.client.get(reverse('admin:incomes_income_changelist'))
+        self.assertContains(response, 'ARS 1.234,50')
@@ -1,3 +1,269 @@
-from django.shortcuts import render
+from django.db import transaction
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-# Create your views here.
+from products.catalog import link_lines
+from products.stock import sync_line_stock
+from tenant.models import BusinessUnit, Customer
+from thot.api import (
+    BusinessUnitScopedViewSet, ascope_queryset, async_api_view,
+    conditional_api_view, filter_stats_queryset, get_user_business_unit_ids
+)
+from thot.cache import bump_tenant_version
+from thot.parsers import NDJSONParser
+
+from .exchange import apply_exchange_rates
+from .models import Income, IncomeLine
+from .serializers import IncomeBulkSerializer, IncomeSerializer
+from .stats import aget_income_totals
+
+
+@require_GET
+@async_api_view('incomes.view_income')
+@conditional_api_view(Income, (BusinessUnit, Customer))
+async def income_stats(request):
+    """
+    Totales de ingresos (los mismos del pie del changelist), sin ocupar un
+    worker mientras espera a la base
+    """
+    queryset = await ascope_queryset(Income.objects.all(), request.api_user)
+    queryset = filter_stats_queryset(queryset, request)
+    return JsonResponse(await aget_income_totals(queryset))
+
+
+class IncomeViewSet(BusinessUnitScopedViewSet):
+    queryset = Income.all_objects.all()
+    serializer_class = IncomeSerializer
+    select_related_fields = (
+        'business_unit', 'business_unit__customer', *Income.DETAIL_RELATIONS
+    )
+    prefetch_related_fields = ('lines',)
+    conditional_related_models = (BusinessUnit, Customer)
+
+    bulk_max_rows = 5000
+    bulk_batch_size = 500
+
+    @action(
+        detail=False,
+        methods=['post'],
+        parser_classes=[JSONParser, NDJSONParser],
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk(self, request):
+        """
+        Carga masiva de ingresos desde un arreglo JSON o NDJSON.
+
+        Cada fila se valida igual que en el formulario del admin y luego se
+        hace un upsert por (business_unit, order_number); el total lo calcula
+        la base de datos. Las órdenes nuevas se crean (requiere además
+        incomes.add_income) y las existentes se reemplazan con los valores
+        recibidos: los campos omitidos vuelven a su valor por defecto y los
+        datos de contacto, envío y notas que no vienen se borran. Si la fila
+        trae lines, también se reemplazan sus líneas de producto; si no, se
+        conservan y cuentan para validar el total. Los errores se informan
+        por número de fila sin frenar al resto.
+        """
+        # DjangoModelPermissions pediría add_income para cualquier POST: aquí
+        # alcanza con change_income si la carga solo actualiza órdenes
+        if not request.user.has_perm('incomes.change_income'):
+            raise PermissionDenied()
+
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response(
+                {'detail': 'Se esperaba un arreglo de ingresos.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > self.bulk_max_rows:
+            return Response(
+                {'detail': f'Máximo {self.bulk_max_rows} filas por solicitud.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.user.is_superuser:
+            business_unit_ids = set(
+                BusinessUnit.objects.values_list('id', flat=True)
+            )
+        else:
+            business_unit_ids = set(get_user_business_unit_ids(request.user))
+
+        serializer = IncomeBulkSerializer(context={
+            'request': request,
+            'business_unit_ids': business_unit_ids,
+            'product_subtotals': self._product_subtotals(rows, business_unit_ids),
+        })
+
+        errors = []
+        instances = {}
+        for number, row in enumerate(rows, start=1):
+            try:
+                attrs = serializer.run_validation(row)
+            except serializers.ValidationError as exc:
+                errors.append({'row': number, 'errors': exc.detail})
+                continue
+
+            key = (attrs['business_unit'], attrs['order_number'])
+            if key in instances:
+                errors.append({
+                    'row': number,
+                    'errors': {
+                        'order_number': [
+                            f'Orden repetida en la fila {instances[key][0]}.'
+                        ]
+                    }
+                })
+                continue
+
+            instances[key] = (number, self._build_instance(attrs))
+
+        if (
+            self._new_keys(instances) and
+            not request.user.has_perm('incomes.add_income')
+        ):
+            raise PermissionDenied(
+                'La carga incluye órdenes nuevas y no tiene permiso para crearlas.'
+            )
+
+        self._upsert([instance for _, instance in instances.values()])
+
+        return Response(
+            {
+                'received': len(rows),
+                'upserted': len(instances),
+                'errors': errors,
+            },
+            status=status.HTTP_200_OK if instances or not errors
+            else status.HTTP_400_BAD_REQUEST
+        )
+
+    def _product_subtotals(self, rows, business_unit_ids):
+        """
+        Subtotal de productos de las órdenes ya cargadas que aparecen en la
+        carga, por (business_unit, order_number), en una sola consulta
+        """
+        order_numbers = {
+            str(row['order_number']) for row in rows
+            if isinstance(row, dict) and row.get('order_number') is not None
+        }
+        if not order_numbers:
+            return {}
+        return {
+            (business_unit_id, order_number): product_subtotal
+            for business_unit_id, order_number, product_subtotal
+            in Income.all_objects.filter(
+                business_unit_id__in=business_unit_ids,
+                order_number__in=order_numbers
+            ).values_list('business_unit_id', 'order_number', 'product_subtotal')
+        }
+
+    def _new_keys(self, keys):
+        """
+        Pares (business_unit, order_number) sin un ingreso vigente. Los
+        eliminados cuentan como nuevos: el upsert los restaura
+        """
+        keys = set(keys)
+        if not keys:
+            return keys
+        existing = Income.objects.filter(
+            business_unit_id__in={business_unit for business_unit, _ in keys},
+            order_number__in={order_number for _, order_number in keys}
+        ).values_list('business_unit_id', 'order_number')
+        return keys - set(existing)
+
+    def _build_instance(self, attrs):
+        attrs['business_unit_id'] = attrs.pop('business_unit')
+        lines = attrs.pop('lines', None)
+        instance = Income(**attrs)
+        instance._bulk_lines = lines
+        return instance
+
+    def _upsert(self, instances):
+        update_fields = [
+            field.name for field in Income._meta.concrete_fields
+            if not field.primary_key and not field.generated and field.name not in (
+                'business_unit', 'order_number', 'created_at',
+                *Income.DATABASE_MANAGED_FIELDS
+            )
+        ]
+        with transaction.atomic():
+            Income.objects.bulk_create(
+                instances,
+                batch_size=self.bulk_batch_size,
+                update_conflicts=True,
+                unique_fields=['business_unit', 'order_number'],
+                update_fields=update_fields
+            )
+            apply_exchange_rates(
+                Income.all_objects.filter(pk__in=[instance.pk for instance in instances])
+            )
+            self._upsert_details(instances)
+            self._replace_lines(instances)
+            bump_tenant_version(
+                Income, {instance.business_unit_id for instance in instances}
+            )
+
+    def _replace_lines(self, instances):
+        """
+        Reemplaza las líneas de los ingresos que las enviaron y actualiza el
+        stock de todas: el upsert también puede cambiar el estado de la orden
+        o restaurarla. Borrar e insertar en bloque dispara el trigger de
+        subtotal una vez por sentencia
+        """
+        with_lines = [
+            instance for instance in instances
+            if instance._bulk_lines is not None
+        ]
+        previous = IncomeLine.objects.filter(income__in=with_lines)
+        previous_ids = list(previous.values_list('id', flat=True))
+        previous.delete()
+        created = IncomeLine.objects.bulk_create(
+            [
+                IncomeLine(income=instance, **line)
+                for instance in with_lines
+                for line in instance._bulk_lines
+            ],
+            batch_size=self.bulk_batch_size
+        )
+        created_ids = [line.pk for line in created]
+        link_lines(created_ids)
+        kept_ids = list(IncomeLine.objects.filter(
+            income__in=[
+                instance for instance in instances
+                if instance._bulk_lines is None
+            ]
+        ).values_list('id', flat=True))
+        sync_line_stock(previous_ids + created_ids + kept_ids)
+
+    def _upsert_details(self, instances):
+        """
+        Upsert de las tablas laterales de los ingresos ya guardados. Como la
+        fila reemplaza al ingreso, las tablas laterales sin datos en la fila
+        se eliminan, igual que en Income.save()
+        """
+        pending = [
+            (instance, instance.pop_pending_details()) for instance in instances
+        ]
+        for relation in Income.DETAIL_RELATIONS:
+            model = Income._meta.get_field(relation).related_model
+            details = [
+                details[relation] for _, details in pending
+                if relation in details and not details[relation].is_empty()
+            ]
+            model.objects.bulk_create(
+                details,
+                batch_size=self.bulk_batch_size,
+                update_conflicts=True,
+                unique_fields=['income'],
+                update_fields=model.detail_field_names()
+            )
+            model.objects.filter(
+                income__in=[instance.pk for instance, _ in pending]
+            ).exclude(
+                income__in=[detail.income.pk for detail in details]
+            ).delete()
@@ -1,3 +1,149 @@
 from django.contrib import admin
+from django.db.models import Q, Sum
+from django.utils.html import format_html
 
-# Register your models here.
+from tenant.models import Customer
+from thot.admin_actions import soft_delete_selected
+
+from .models import Product, ProductMonthlySales, StockMovement
+from .stock import add_stock
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ('sku', 'name', 'customer', 'stock_display', 'updated_at')
+    list_filter = ('customer',)
+    search_fields = ('sku', 'name')
+    list_select_related = ('customer',)
+    ordering = ('customer', 'sku')
+    actions = [soft_delete_selected]
+
+    def get_queryset(self, request):
+        """Productos de las empresas de las unidades del usuario, con su stock"""
+        queryset = super().get_queryset(request)
+        if request.user.is_superuser:
+            return queryset.annotate(stock=Sum('stock_shards__quantity'))
+
+        return queryset.filter(
+            customer__in=request.user.business_unit_assignments.values(
+                'business_unit__customer'
+            )
+        ).annotate(
+            stock=Sum(
+                'stock_shards__quantity',
+                filter=Q(stock_shards__business_unit__in=request.user_business_units)
+            )
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Solo las empresas de las unidades del usuario"""
+        if db_field.name == 'customer' and not request.user.is_superuser:
+            kwargs['queryset'] = Customer.objects.filter(
+                id__in=request.user.business_unit_assignments.values(
+                    'business_unit__customer'
+                )
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def stock_display(self, obj):
+        return obj.stock or 0
+    stock_display.short_description = 'Stock'
+    stock_display.admin_order_field = 'stock'
+
+
+@admin.register(ProductMonthlySales)
+class ProductMonthlySalesAdmin(admin.ModelAdmin):
+    """
+    Ranking de productos por mes, leído de la tabla de ventas mensuales
+    (la recalcula el proceso refresh_product_sales --interval con los meses
+    que encolan los triggers)
+    """
+    list_display = (
+        'month_display',
+        'business_unit',
+        'product',
+        'quantity',
+        'revenue_display'
+    )
+    list_filter = ('business_unit', 'month')
+    search_fields = ('product__sku', 'product__name')
+    list_select_related = ('business_unit', 'business_unit__customer', 'product')
+    date_hierarchy = 'month'
+    ordering = ('-month', '-revenue')
+
+    class Media:
+        css = {'all': ('css/admin_badges.css',)}
+
+    def month_display(self, obj):
+        return obj.month.strftime('%m/%Y')
+    month_display.short_description = 'Mes'
+    month_display.admin_order_field = 'month'
+
+    def revenue_display(self, obj):
+        return format_html('<span class="amount-ok">{}</span>', obj.revenue)
+    revenue_display.short_description = 'Ventas'
+    revenue_display.admin_order_field = 'revenue'
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.user.is_superuser:
+            return queryset
+        return queryset.filter(request.business_unit_filter)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    """
+    Movimientos de stock. Solo se pueden agregar (compras y ajustes); las
+    ventas las registran los ingresos
+    """
+    list_display = (
+        'created_at',
+        'product',
+        'business_unit',
+        'kind',
+        'quantity',
+        'income_line_id',
+        'note'
+    )
+    list_filter = ('kind', 'business_unit', ('created_at', admin.DateFieldListFilter))
+    search_fields = ('product__sku', 'product__name', 'note')
+    list_select_related = ('product', 'business_unit', 'business_unit__customer')
+    fields = ('product', 'business_unit', 'kind', 'quantity', 'note')
+    autocomplete_fields = ('product',)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.user.is_superuser:
+            return queryset
+        return queryset.filter(request.business_unit_filter)
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        if not request.user.is_superuser and 'business_unit' in form.base_fields:
+            form.base_fields['business_unit'].queryset = form.base_fields[
+                'business_unit'
+            ].queryset.filter(id__in=request.user_business_units)
+        return form
+
+    def save_model(self, request, obj, form, change):
+        # Se registra por products.stock para sumarlo también en ProductStock
+        obj.pk = add_stock(
+            obj.product_id,
+            obj.business_unit_id,
+            obj.quantity,
+            kind=obj.kind,
+            note=obj.note
+        )[0].pk
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,184 @@
+"""
+Vinculación de líneas de ingreso con el catálogo y recálculo de las ventas
+mensuales por producto.
+
+Los triggers encolan en PendingProductSales los meses cuyas ventas cambiaron;
+refresh_pending_sales() los toma en lotes y recalcula solo esos meses
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from incomes.models import IncomeLine
+
+from .models import (
+    PendingProductSales, Product, ProductMonthlySales, normalize_sku
+)
+
+
+def link_lines(line_ids):
+    """
+    Vincula las líneas indicadas con su producto, creando en el catálogo los
+    SKU que todavía no existen. Las que quedaron sin SKU se desvinculan.
+    Retorna la cantidad de líneas vinculadas
+    """
+    lines = IncomeLine.objects.filter(
+        id__in=line_ids,
+        income__business_unit__isnull=False
+    ).exclude(sku__isnull=True).exclude(sku='').values_list(
+        'id', 'sku', 'product_name', 'income__business_unit__customer_id'
+    )
+
+    names = {}
+    line_ids_by_key = {}
+    for line_id, sku, product_name, customer_id in lines:
+        key = (customer_id, normalize_sku(sku))
+        if key[1]:
+            names.setdefault(key, (product_name or '')[:255])
+            line_ids_by_key.setdefault(key, []).append(line_id)
+
+    with_sku = [
+        line_id for ids in line_ids_by_key.values() for line_id in ids
+    ]
+    IncomeLine.objects.filter(
+        id__in=line_ids,
+        product__isnull=False
+    ).exclude(id__in=with_sku).update(product=None)
+    if not with_sku:
+        return 0
+
+    Product.all_objects.bulk_create(
+        [
+            Product(customer_id=customer_id, sku=sku, name=name)
+            for (customer_id, sku), name in names.items()
+        ],
+        ignore_conflicts=True
+    )
+    products = Product.all_objects.filter(
+        customer_id__in={customer_id for customer_id, _ in names},
+        sku__in={sku for _, sku in names}
+    ).values_list('customer_id', 'sku', 'id')
+
+    linked = [
+        IncomeLine(id=line_id, product_id=product_id)
+        for customer_id, sku, product_id in products
+        for line_id in line_ids_by_key.get((customer_id, sku), ())
+    ]
+    IncomeLine.objects.bulk_update(linked, ['product'])
+    return len(linked)
+
+
+def affected_buckets(incomes):
+    """
+    Pares (business_unit_id, mes) de los ingresos del queryset
+    """
+    return set(
+        incomes.filter(business_unit__isnull=False).annotate(
+            month=TruncMonth('date')
+        ).values_list('business_unit_id', 'month').distinct().order_by()
+    )
+
+
+def _next_month(month):
+    return (month.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def refresh_pending_sales(batch_size=500, max_batches=None):
+    """
+    Procesa la cola de meses pendientes. Cada lote se bloquea con SKIP
+    LOCKED, así que varios procesos pueden recalcular en paralelo. Retorna
+    la cantidad de meses recalculados
+    """
+    refreshed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            pending = list(
+                PendingProductSales.objects.select_for_update(
+                    skip_locked=True
+                ).order_by('id').values_list('id', 'business_unit_id', 'month')[:batch_size]
+            )
+            if not pending:
+                break
+
+            buckets = {(business_unit_id, month) for _, business_unit_id, month in pending}
+            refresh_monthly_sales(buckets)
+            PendingProductSales.objects.filter(
+                id__in=[pending_id for pending_id, _, _ in pending]
+            ).delete()
+
+        refreshed += len(buckets)
+        batches += 1
+    return refreshed
+
+
+def refresh_monthly_sales(buckets, chunk_size=100):
+    """
+    Recalcula las ventas mensuales por producto de los pares
+    (business_unit_id, mes) indicados: upsert de los totales actuales y
+    borrado de los productos que ya no tienen ventas en ese mes. Retorna la
+    cantidad de filas escritas
+    """
+    buckets = sorted(buckets)
+    written = 0
+    for start in range(0, len(buckets), chunk_size):
+        written += _refresh_buckets(buckets[start:start + chunk_size])
+    return written
+
+
+def _refresh_buckets(buckets):
+    lines_filter = Q()
+    sales_filter = Q()
+    for business_unit_id, month in buckets:
+        lines_filter |= Q(
+            income__business_unit_id=business_unit_id,
+            income__date__gte=month,
+            income__date__lt=_next_month(month)
+        )
+        sales_filter |= Q(business_unit_id=business_unit_id, month=month)
+
+    totals = IncomeLine.objects.filter(
+        lines_filter,
+        product__isnull=False,
+        income__deleted_at__isnull=True
+    ).annotate(
+        month=TruncMonth('income__date')
+    ).values(
+        'product_id', 'income__business_unit_id', 'month'
+    ).annotate(
+        total_quantity=Sum('quantity'),
+        # En la moneda de reporte de la empresa; las líneas de ingresos sin
+        # cotización no suman
+        total_revenue=Sum(F('subtotal') * F('income__exchange_rate'))
+    ).order_by()
+
+    started_at = timezone.now()
+    rows = [
+        ProductMonthlySales(
+            product_id=row['product_id'],
+            business_unit_id=row['income__business_unit_id'],
+            month=row['month'],
+            quantity=row['total_quantity'],
+            revenue=round(row['total_revenue'] or 0, 2)
+        )
+        for row in totals
+    ]
+
+    with transaction.atomic():
+        ProductMonthlySales.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['product', 'business_unit', 'month'],
+            update_fields=['quantity', 'revenue', 'updated_at']
+        )
+        # Lo que no se tocó en este recálculo ya no tiene ventas
+        ProductMonthlySales.objects.filter(
+            sales_filter,
+            updated_at__lt=started_at
+        ).delete()
+
+    return len(rows)
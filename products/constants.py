@@ -0,0 +1,8 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class StockMovementKind(models.TextChoices):
+    SALE = 'venta', _('Venta')
+    PURCHASE = 'compra', _('Compra')
+    ADJUSTMENT = 'ajuste', _('Ajuste')
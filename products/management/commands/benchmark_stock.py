@@ -0,0 +1,115 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from tenant.models import BusinessUnit
+
+from products.constants import StockMovementKind
+from products.models import Product, ProductStock, StockMovement
+from products.stock import STOCK_SHARDS, add_stock, get_stock, stock_differences
+
+
+class Command(BaseCommand):
+    help = (
+        'Registra ventas concurrentes de un producto de prueba desde varios '
+        'hilos y verifica que no se pierdan actualizaciones. Compara una '
+        'sola fila de stock contra el stock repartido en particiones. '
+        'Escribe en la unidad de negocio indicada: fuera de DEBUG exige --yes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--sales', type=int, default=200, help='Ventas por hilo')
+        parser.add_argument('--business-unit', type=int, required=True)
+        parser.add_argument(
+            '--yes', action='store_true',
+            help='Confirma que se carguen ventas de prueba en la unidad'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['yes']:
+            raise CommandError(
+                'Carga y borra ventas en la unidad de negocio indicada: '
+                'fuera de DEBUG confirme con --yes.'
+            )
+
+        business_unit = BusinessUnit.objects.filter(
+            pk=options['business_unit']
+        ).select_related('customer').first()
+        if business_unit is None:
+            raise CommandError('La unidad de negocio no existe.')
+
+        # Al terminar se borra el producto: no debe ser uno existente
+        if Product.all_objects.filter(
+            customer=business_unit.customer, sku='BENCHMARK-STOCK'
+        ).exists():
+            raise CommandError(
+                'La empresa ya tiene un producto BENCHMARK-STOCK; bórrelo antes.'
+            )
+        product = Product.objects.create(
+            customer=business_unit.customer,
+            sku='BENCHMARK-STOCK',
+            name='Producto de prueba de stock'
+        )
+
+        try:
+            for label, shards in (('Una fila', 1), ('Particionado', STOCK_SHARDS)):
+                self._reset(product)
+                elapsed = self._run(product, business_unit, shards, options)
+                self._report(label, product, business_unit, elapsed, options)
+        finally:
+            self._reset(product)
+            product.delete()
+
+    def _reset(self, product):
+        StockMovement.objects.filter(product=product).delete()
+        ProductStock.objects.filter(product=product).delete()
+
+    def _run(self, product, business_unit, shards, options):
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(options['sales']):
+                    add_stock(
+                        product.pk, business_unit.pk, -1,
+                        kind=StockMovementKind.SALE, shards=shards
+                    )
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker) for _ in range(options['threads'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if errors:
+            raise CommandError(f'{len(errors)} hilos fallaron: {errors[0]}')
+        return elapsed
+
+    def _report(self, label, product, business_unit, elapsed, options):
+        expected = -options['threads'] * options['sales']
+        stock = get_stock(product.pk, business_unit.pk)
+        consistent = not any(
+            product_id == product.pk for product_id, _, _ in stock_differences()
+        )
+
+        self.stdout.write(
+            f'{label}: {-expected} ventas en {elapsed:.2f}s '
+            f'({-expected / elapsed:.0f} ventas/s), stock {stock}'
+        )
+        if stock != expected or not consistent:
+            raise CommandError(
+                f'Se perdieron actualizaciones: stock {stock}, esperado {expected}.'
+            )
+        self.stdout.write(self.style.SUCCESS('  Sin actualizaciones perdidas.'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from incomes.models import IncomeLine
+from thot.bulk import iter_pk_chunks
+
+from products.catalog import link_lines
+
+
+class Command(BaseCommand):
+    help = (
+        'Vincula en lotes las líneas de ingreso sin producto con el catálogo, '
+        'creando los productos por SKU normalizado. Se puede interrumpir y '
+        'volver a ejecutar: solo procesa las líneas que faltan.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        pending = IncomeLine.objects.filter(
+            product__isnull=True,
+            income__business_unit__isnull=False
+        ).exclude(sku__isnull=True).exclude(sku='')
+
+        linked = 0
+        for pks in iter_pk_chunks(pending, options['batch_size']):
+            linked += link_lines(pks)
+            self.stderr.write(f'{linked} líneas vinculadas (hasta ID {pks[-1]})')
+
+        self.stdout.write(self.style.SUCCESS(f'{linked} líneas vinculadas.'))
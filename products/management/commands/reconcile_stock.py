@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from incomes.models import IncomeLine
+from thot.bulk import iter_pk_chunks
+
+from products.stock import (
+    fix_stock_differences, orphan_line_ids, stock_differences, sync_line_stock
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Concilia el stock: devuelve el stock de líneas borradas, con --since '
+        'vuelve a sincronizar las líneas de ingresos modificados desde esa '
+        'fecha (bajas, cancelaciones) y corrige ProductStock donde no coincide '
+        'con los movimientos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Fecha ISO 8601')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informa las diferencias de ProductStock'
+        )
+
+    def handle(self, *args, **options):
+        if options['since'] and not options['dry_run']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError('--since debe ser una fecha ISO 8601.')
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+            lines = IncomeLine.objects.filter(income__updated_at__gte=since)
+            synced = 0
+            for pks in iter_pk_chunks(lines):
+                synced += len(sync_line_stock(pks))
+            self.stdout.write(f'{synced} movimientos por líneas modificadas.')
+
+        if not options['dry_run']:
+            released = sync_line_stock(orphan_line_ids())
+            self.stdout.write(f'{len(released)} movimientos por líneas borradas.')
+
+        differences = stock_differences()
+        for product_id, business_unit_id, difference in differences:
+            self.stdout.write(
+                f'Producto {product_id} / unidad {business_unit_id}: '
+                f'diferencia {difference:+d}'
+            )
+
+        if differences and not options['dry_run']:
+            fix_stock_differences(differences)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(differences)} diferencias'
+            f'{" encontradas" if options["dry_run"] else " corregidas"}.'
+        ))
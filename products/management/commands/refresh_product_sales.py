@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from incomes.models import Income
+
+from products.catalog import (
+    affected_buckets, refresh_monthly_sales, refresh_pending_sales
+)
+from products.models import ProductMonthlySales
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula las ventas mensuales por producto. Con --pending procesa '
+        'la cola de meses modificados y con --interval queda procesándola '
+        'cada esa cantidad de segundos. Con --since solo los meses y '
+        'unidades de los ingresos modificados desde esa fecha (incluye bajas '
+        'lógicas y cambios de líneas); sin opciones, todo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Fecha ISO 8601')
+        parser.add_argument('--pending', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=int)
+
+    def handle(self, *args, **options):
+        if options['pending'] or options['interval']:
+            return self.refresh_pending(options)
+
+        incomes = Income.all_objects.all()
+
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError('--since debe ser una fecha ISO 8601.')
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            buckets = affected_buckets(incomes.filter(updated_at__gte=since))
+        else:
+            # También los meses ya calculados, por si se borraron ingresos
+            buckets = affected_buckets(incomes) | set(
+                ProductMonthlySales.objects.values_list(
+                    'business_unit_id', 'month'
+                ).distinct().order_by()
+            )
+
+        written = refresh_monthly_sales(buckets)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(buckets)} meses recalculados, {written} filas escritas.'
+        ))
+
+    def refresh_pending(self, options):
+        while True:
+            close_old_connections()
+            refreshed = refresh_pending_sales(batch_size=options['batch_size'])
+            if refreshed or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{refreshed} meses recalculados.'
+                ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('tenant', '0004_alter_businessunituser_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('sku', models.CharField(help_text='Se guarda sin espacios y en mayúsculas', max_length=50, verbose_name='SKU')),
+                ('name', models.CharField(blank=True, max_length=255, verbose_name='Nombre')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='products', to='tenant.customer', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Producto',
+                'verbose_name_plural': 'Productos',
+                'ordering': ['customer', 'sku'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductMonthlySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='Primer día del mes', verbose_name='Mes')),
+                ('quantity', models.BigIntegerField(default=0, verbose_name='Unidades vendidas')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ventas')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('business_unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_monthly_sales', to='tenant.businessunit', verbose_name='Unidad de Negocio')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_sales', to='products.product', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Ventas mensuales por producto',
+                'verbose_name_plural': 'Ventas mensuales por producto',
+                'ordering': ['-month', '-revenue'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('customer', 'sku'), name='unique_product_sku_per_customer'),
+        ),
+        migrations.AddIndex(
+            model_name='productmonthlysales',
+            index=models.Index(fields=['business_unit', 'month', '-revenue'], name='productsales_bu_month_rev_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productmonthlysales',
+            index=models.Index(fields=['product', 'month'], name='productsales_product_month_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='productmonthlysales',
+            constraint=models.UniqueConstraint(fields=('product', 'business_unit', 'month'), name='unique_product_sales_per_month'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('tenant', '0004_alter_businessunituser_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Partición')),
+                ('quantity', models.BigIntegerField(default=0, verbose_name='Cantidad')),
+                ('business_unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_stock', to='tenant.businessunit', verbose_name='Unidad de Negocio')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_shards', to='products.product', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Stock de producto',
+                'verbose_name_plural': 'Stock de productos',
+                'constraints': [models.UniqueConstraint(fields=('product', 'business_unit', 'shard'), name='unique_product_stock_shard')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(help_text='Positiva para ingresos de mercadería, negativa para salidas', verbose_name='Cantidad')),
+                ('kind', models.CharField(choices=[('venta', 'Venta'), ('compra', 'Compra'), ('ajuste', 'Ajuste')], default='ajuste', max_length=20, verbose_name='Tipo')),
+                ('income_line_id', models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='Línea de ingreso')),
+                ('note', models.CharField(blank=True, max_length=255, verbose_name='Nota')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('business_unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='tenant.businessunit', verbose_name='Unidad de Negocio')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='products.product', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de stock',
+                'verbose_name_plural': 'Movimientos de stock',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['product', 'business_unit'], name='stockmove_product_bu_idx'), models.Index(condition=models.Q(('income_line_id__isnull', False)), fields=['income_line_id'], name='stockmove_income_line_idx')],
+            },
+        ),
+    ]
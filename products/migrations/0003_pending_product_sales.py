@@ -0,0 +1,144 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:55
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+# Triggers por sentencia con tablas de transición que encolan los meses cuyas
+# ventas por producto cambiaron: líneas con producto que se agregan, borran o
+# cambian de cantidad, precio, producto o ingreso, e ingresos con líneas de
+# producto que cambian de fecha, unidad, cotización o se eliminan
+CREATE_TRIGGER_SQL = """
+CREATE FUNCTION products_enqueue_line_months() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO products_pendingproductsales (business_unit_id, month)
+    SELECT DISTINCT income.business_unit_id, date_trunc('month', income.date)::date
+    FROM changed_rows line
+    JOIN incomes_income income ON income.id = line.income_id
+    WHERE line.product_id IS NOT NULL AND income.business_unit_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION products_enqueue_line_months_update() RETURNS trigger AS $$
+BEGIN
+    WITH changed AS (
+        SELECT
+            old_rows.income_id AS old_income_id,
+            old_rows.product_id AS old_product_id,
+            new_rows.income_id AS new_income_id,
+            new_rows.product_id AS new_product_id
+        FROM old_rows
+        JOIN new_rows USING (id)
+        WHERE (
+            old_rows.income_id, old_rows.product_id,
+            old_rows.quantity, old_rows.subtotal
+        ) IS DISTINCT FROM (
+            new_rows.income_id, new_rows.product_id,
+            new_rows.quantity, new_rows.subtotal
+        )
+    )
+    INSERT INTO products_pendingproductsales (business_unit_id, month)
+    SELECT DISTINCT income.business_unit_id, date_trunc('month', income.date)::date
+    FROM (
+        SELECT old_income_id AS income_id FROM changed
+        WHERE old_product_id IS NOT NULL
+        UNION
+        SELECT new_income_id FROM changed
+        WHERE new_product_id IS NOT NULL
+    ) line
+    JOIN incomes_income income ON income.id = line.income_id
+    WHERE income.business_unit_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION products_enqueue_income_months_update() RETURNS trigger AS $$
+BEGIN
+    WITH changed AS (
+        SELECT
+            old_rows.business_unit_id AS old_business_unit_id,
+            old_rows.date AS old_date,
+            new_rows.business_unit_id AS new_business_unit_id,
+            new_rows.date AS new_date
+        FROM old_rows
+        JOIN new_rows USING (id)
+        WHERE (
+            old_rows.date, old_rows.business_unit_id,
+            old_rows.deleted_at, old_rows.exchange_rate
+        ) IS DISTINCT FROM (
+            new_rows.date, new_rows.business_unit_id,
+            new_rows.deleted_at, new_rows.exchange_rate
+        )
+        AND EXISTS (
+            SELECT 1 FROM incomes_incomeline line
+            WHERE line.income_id = new_rows.id AND line.product_id IS NOT NULL
+        )
+    )
+    INSERT INTO products_pendingproductsales (business_unit_id, month)
+    SELECT old_business_unit_id, date_trunc('month', old_date)::date
+    FROM changed
+    WHERE old_business_unit_id IS NOT NULL
+    UNION
+    SELECT new_business_unit_id, date_trunc('month', new_date)::date
+    FROM changed
+    WHERE new_business_unit_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER incomeline_insert_product_sales
+    AFTER INSERT ON incomes_incomeline
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION products_enqueue_line_months();
+
+CREATE TRIGGER incomeline_delete_product_sales
+    AFTER DELETE ON incomes_incomeline
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION products_enqueue_line_months();
+
+CREATE TRIGGER incomeline_update_product_sales
+    AFTER UPDATE ON incomes_incomeline
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION products_enqueue_line_months_update();
+
+CREATE TRIGGER income_update_product_sales
+    AFTER UPDATE ON incomes_income
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION products_enqueue_income_months_update();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER income_update_product_sales ON incomes_income;
+DROP TRIGGER incomeline_update_product_sales ON incomes_incomeline;
+DROP TRIGGER incomeline_delete_product_sales ON incomes_incomeline;
+DROP TRIGGER incomeline_insert_product_sales ON incomes_incomeline;
+DROP FUNCTION products_enqueue_income_months_update();
+DROP FUNCTION products_enqueue_line_months_update();
+DROP FUNCTION products_enqueue_line_months();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_stock'),
+        ('incomes', '0016_change_feed_global_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_unit_id', models.BigIntegerField(verbose_name='Unidad de Negocio')),
+                ('month', models.DateField(verbose_name='Mes')),
+                ('created_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), verbose_name='Fecha de creación')),
+            ],
+            options={
+                'verbose_name': 'Mes pendiente de recalcular',
+                'verbose_name_plural': 'Meses pendientes de recalcular',
+            },
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, reverse_sql=DROP_TRIGGER_SQL),
+    ]
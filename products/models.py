@@ -1,3 +1,280 @@
+import re
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Now
+from django.utils.translation import gettext_lazy as _
+
+from thot.models import TimestampsMixin
+from tenant.models import BusinessUnit, Customer
+
+from .constants import StockMovementKind
+
+
+def normalize_sku(sku):
+    """
+    SKU normalizado para el catálogo: sin espacios y en mayúsculas. Retorna
+    None si queda vacío
+    """
+    if not sku:
+        return None
+    return re.sub(r'\s+', '', sku).upper() or None
+
+
+class Product(TimestampsMixin):
+    """
+    Producto del catálogo de una empresa, identificado por su SKU normalizado.
+    Las líneas de ingreso se vinculan por SKU (ver products.catalog)
+    """
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.CASCADE,
+        verbose_name=_('Empresa'),
+        related_name='products'
+    )
+
+    sku = models.CharField(
+        max_length=50,
+        verbose_name=_('SKU'),
+        help_text=_('Se guarda sin espacios y en mayúsculas')
+    )
+
+    name = models.CharField(
+        max_length=255,
+        verbose_name=_('Nombre'),
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = _('Producto')
+        verbose_name_plural = _('Productos')
+        ordering = ['customer', 'sku']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['customer', 'sku'],
+                name='unique_product_sku_per_customer'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} - {self.name}" if self.name else self.sku
+
+    def validate_constraints(self, exclude=None):
+        """
+        La restricción de SKU incluye a los productos eliminados (el catálogo
+        los sigue vinculando), que el manager por defecto no ve al validar
+        """
+        super().validate_constraints(exclude=exclude)
+        if exclude and {'customer', 'sku'} & set(exclude):
+            return
+
+        if Product.all_objects.deleted().filter(
+            customer_id=self.customer_id, sku=normalize_sku(self.sku) or ''
+        ).exclude(pk=self.pk).exists():
+            raise ValidationError({
+                'sku': _('Ya existe un producto eliminado con este SKU.')
+            })
+
+    def save(self, *args, **kwargs):
+        self.sku = normalize_sku(self.sku) or ''
+        super().save(*args, **kwargs)
+
+
+class ProductMonthlySales(models.Model):
+    """
+    Ventas acumuladas por producto, unidad de negocio y mes. Se recalcula por
+    unidad y mes con products.catalog.refresh_monthly_sales, a partir de la
+    cola PendingProductSales
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        verbose_name=_('Producto'),
+        related_name='monthly_sales'
+    )
+
+    business_unit = models.ForeignKey(
+        BusinessUnit,
+        on_delete=models.CASCADE,
+        verbose_name=_('Unidad de Negocio'),
+        related_name='product_monthly_sales'
+    )
+
+    month = models.DateField(
+        verbose_name=_('Mes'),
+        help_text=_('Primer día del mes')
+    )
+
+    quantity = models.BigIntegerField(
+        verbose_name=_('Unidades vendidas'),
+        default=0
+    )
+
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        verbose_name=_('Ventas'),
+        default=0
+    )
+
+    updated_at = models.DateTimeField(
+        _('Fecha de actualización'),
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = _('Ventas mensuales por producto')
+        verbose_name_plural = _('Ventas mensuales por producto')
+        ordering = ['-month', '-revenue']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'business_unit', 'month'],
+                name='unique_product_sales_per_month'
+            ),
+        ]
+        indexes = [
+            # Ranking de productos de una unidad en un mes
+            models.Index(
+                fields=['business_unit', 'month', '-revenue'],
+                name='productsales_bu_month_rev_idx'
+            ),
+            models.Index(
+                fields=['product', 'month'],
+                name='productsales_product_month_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product} - {self.month:%m/%Y}"
+
+
+class PendingProductSales(models.Model):
+    """
+    Cola de meses de una unidad con ventas de productos modificadas desde el
+    último recálculo de ProductMonthlySales. La cargan triggers de la base
+    (migración 0003) sobre las líneas y los ingresos; como en
+    reports.PendingRollup, solo se agregan filas
+    """
+    business_unit_id = models.BigIntegerField(_('Unidad de Negocio'))
+    month = models.DateField(_('Mes'))
+    created_at = models.DateTimeField(_('Fecha de creación'), db_default=Now())
+
+    class Meta:
+        verbose_name = _('Mes pendiente de recalcular')
+        verbose_name_plural = _('Meses pendientes de recalcular')
+
+
+class ProductStock(models.Model):
+    """
+    Existencias de un producto en una unidad de negocio. Cada par se reparte
+    en varias filas (shard) para que las ventas simultáneas no compitan por
+    la misma fila; el stock es la suma de todas. Se modifica solo con
+    products.stock, que además registra cada cambio en StockMovement
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        verbose_name=_('Producto'),
+        related_name='stock_shards'
+    )
+
+    business_unit = models.ForeignKey(
+        BusinessUnit,
+        on_delete=models.CASCADE,
+        verbose_name=_('Unidad de Negocio'),
+        related_name='product_stock'
+    )
+
+    shard = models.PositiveSmallIntegerField(
+        verbose_name=_('Partición')
+    )
+
+    quantity = models.BigIntegerField(
+        verbose_name=_('Cantidad'),
+        default=0
+    )
+
+    class Meta:
+        verbose_name = _('Stock de producto')
+        verbose_name_plural = _('Stock de productos')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'business_unit', 'shard'],
+                name='unique_product_stock_shard'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product} - {self.business_unit_id} #{self.shard}"
+
+
+class StockMovement(models.Model):
+    """
+    Registro inmutable de los cambios de stock. La suma de los movimientos de
+    un producto y unidad debe coincidir con la de sus filas de ProductStock
+    (ver el comando reconcile_stock)
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        verbose_name=_('Producto'),
+        related_name='stock_movements'
+    )
+
+    business_unit = models.ForeignKey(
+        BusinessUnit,
+        on_delete=models.CASCADE,
+        verbose_name=_('Unidad de Negocio'),
+        related_name='stock_movements'
+    )
+
+    quantity = models.BigIntegerField(
+        verbose_name=_('Cantidad'),
+        help_text=_('Positiva para ingresos de mercadería, negativa para salidas')
+    )
+
+    kind = models.CharField(
+        max_length=20,
+        choices=StockMovementKind.choices,
+        default=StockMovementKind.ADJUSTMENT,
+        verbose_name=_('Tipo')
+    )
+
+    # Sin clave foránea: el movimiento se conserva aunque se borre la línea,
+    # para poder revertirlo
+    income_line_id = models.BigIntegerField(
+        verbose_name=_('Línea de ingreso'),
+        null=True,
+        blank=True,
+        editable=False
+    )
+
+    note = models.CharField(
+        max_length=255,
+        verbose_name=_('Nota'),
+        blank=True
+    )
+
+    created_at = models.DateTimeField(
+        _('Fecha de creación'),
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = _('Movimiento de stock')
+        verbose_name_plural = _('Movimientos de stock')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['product', 'business_unit'],
+                name='stockmove_product_bu_idx'
+            ),
+            models.Index(
+                fields=['income_line_id'],
+                name='stockmove_income_line_idx',
+                condition=models.Q(income_line_id__isnull=False)
+            ),
+        ]
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.product} {self.quantity:+d}"
@@ -0,0 +1,188 @@
+"""
+Stock por producto y unidad de negocio. Cada cambio se guarda como
+StockMovement y se suma con un upsert en una partición al azar de
+ProductStock, todo en una transacción corta
+"""
+import random
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from incomes.constants import VOID_ORDER_STATUSES
+from incomes.models import IncomeLine
+from thot.counters import upsert_increment
+
+from .constants import StockMovementKind
+from .models import ProductStock, StockMovement
+
+STOCK_SHARDS = 16
+
+
+def record_movements(movements, shards=STOCK_SHARDS):
+    """
+    Guarda los movimientos y suma cada uno en una partición al azar
+    """
+    movements = [movement for movement in movements if movement.quantity]
+    if not movements:
+        return []
+
+    with transaction.atomic():
+        StockMovement.objects.bulk_create(movements)
+        upsert_increment(
+            ProductStock,
+            [
+                {
+                    'product': movement.product_id,
+                    'business_unit': movement.business_unit_id,
+                    'shard': random.randrange(shards),
+                    'quantity': movement.quantity,
+                }
+                for movement in movements
+            ],
+            conflict_fields=('product', 'business_unit', 'shard'),
+            increment_fields=('quantity',)
+        )
+    return movements
+
+
+def add_stock(product_id, business_unit_id, quantity,
+              kind=StockMovementKind.ADJUSTMENT, note='', shards=STOCK_SHARDS):
+    return record_movements([
+        StockMovement(
+            product_id=product_id,
+            business_unit_id=business_unit_id,
+            quantity=quantity,
+            kind=kind,
+            note=note
+        )
+    ], shards=shards)
+
+
+def get_stock(product_id, business_unit_id):
+    return ProductStock.objects.filter(
+        product_id=product_id,
+        business_unit_id=business_unit_id
+    ).aggregate(total=Sum('quantity'))['total'] or 0
+
+
+def sync_line_stock(line_ids):
+    """
+    Ajusta el stock para que los movimientos de venta de cada línea sumen
+    -cantidad, o 0 si la línea ya no existe, no tiene producto o su ingreso
+    fue eliminado o cancelado. Se puede repetir sin duplicar movimientos
+    """
+    line_ids = list(line_ids)
+    if not line_ids:
+        return []
+
+    with transaction.atomic():
+        # Bloquea las líneas y sus movimientos para que dos sincronizaciones
+        # de la misma línea no calculen la misma diferencia. Las líneas
+        # borradas solo tienen movimientos: la segunda espera y, al releer
+        # la suma en una nueva sentencia, ve lo que registró la primera
+        list(StockMovement.objects.select_for_update().filter(
+            income_line_id__in=line_ids
+        ).order_by('id').values_list('id', flat=True))
+        lines = IncomeLine.objects.select_for_update(of=('self',)).filter(
+            id__in=line_ids,
+            product__isnull=False,
+            income__business_unit__isnull=False,
+            income__deleted_at__isnull=True
+        ).exclude(
+            income__order_status__in=VOID_ORDER_STATUSES
+        ).order_by('id').values_list(
+            'id', 'product_id', 'income__business_unit_id', 'quantity'
+        )
+
+        deltas = defaultdict(int)
+        for line_id, product_id, business_unit_id, quantity in lines:
+            deltas[(line_id, product_id, business_unit_id)] -= quantity
+
+        recorded = StockMovement.objects.filter(
+            income_line_id__in=line_ids
+        ).values(
+            'income_line_id', 'product_id', 'business_unit_id'
+        ).annotate(total=Sum('quantity')).order_by()
+        for row in recorded:
+            deltas[(
+                row['income_line_id'], row['product_id'], row['business_unit_id']
+            )] -= row['total']
+
+        return record_movements(
+            StockMovement(
+                product_id=product_id,
+                business_unit_id=business_unit_id,
+                income_line_id=line_id,
+                quantity=delta,
+                kind=StockMovementKind.SALE
+            )
+            for (line_id, product_id, business_unit_id), delta in deltas.items()
+        )
+
+
+def orphan_line_ids():
+    """
+    Líneas borradas cuyo stock no se devolvió
+    """
+    return list(
+        StockMovement.objects.filter(
+            income_line_id__isnull=False
+        ).values('income_line_id').annotate(
+            total=Sum('quantity')
+        ).exclude(total=0).exclude(
+            income_line_id__in=IncomeLine.objects.values('id')
+        ).values_list('income_line_id', flat=True).order_by()
+    )
+
+
+# Ambas sumas en la misma consulta para comparar la misma instantánea: un
+# movimiento y su suma en ProductStock se confirman en la misma transacción
+STOCK_DIFFERENCES_SQL = """
+SELECT
+    COALESCE(moves.product_id, shards.product_id),
+    COALESCE(moves.business_unit_id, shards.business_unit_id),
+    (COALESCE(moves.total, 0) - COALESCE(shards.total, 0))::bigint
+FROM (
+    SELECT product_id, business_unit_id, SUM(quantity) AS total
+    FROM products_stockmovement
+    GROUP BY product_id, business_unit_id
+) moves
+FULL OUTER JOIN (
+    SELECT product_id, business_unit_id, SUM(quantity) AS total
+    FROM products_productstock
+    GROUP BY product_id, business_unit_id
+) shards USING (product_id, business_unit_id)
+WHERE COALESCE(moves.total, 0) <> COALESCE(shards.total, 0)
+"""
+
+
+def stock_differences():
+    """
+    (product_id, business_unit_id, diferencia) donde ProductStock no coincide
+    con la suma de los movimientos
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(STOCK_DIFFERENCES_SQL)
+        return cursor.fetchall()
+
+
+def fix_stock_differences(differences):
+    """
+    Corrige ProductStock tomando los movimientos como fuente de verdad. Es
+    una suma, así que no interfiere con las ventas que se estén registrando
+    """
+    upsert_increment(
+        ProductStock,
+        [
+            {
+                'product': product_id,
+                'business_unit': business_unit_id,
+                'shard': 0,
+                'quantity': difference,
+            }
+            for product_id, business_unit_id, difference in differences
+        ],
+        conflict_fields=('product', 'business_unit', 'shard'),
+        increment_fields=('quantity',)
+    )
@@ -1,3 +1,231 @@
+from datetime import date
+from io import StringIO
+from decimal import Decimal
+
+from django.contrib.admin import helpers
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+from django.urls import reverse
+
+from incomes.constants import OrderStatus
+from incomes.models import Income, IncomeLine
+from incomes.tests import IncomeTestData
+from tenant.models import Customer
+
+from .catalog import link_lines, refresh_pending_sales
+from .models import (
+    PendingProductSales, Product, ProductMonthlySales, ProductStock, StockMovement
+)
+from .stock import add_stock, get_stock, stock_differences, sync_line_stock
+
+
+class CatalogTests(IncomeTestData, TestCase):
+    """
+    Vinculación de líneas por SKU y ventas mensuales por producto
+    """
+
+    def sales(self):
+        return {
+            (row.product.sku, row.month): (row.quantity, row.revenue)
+            for row in ProductMonthlySales.objects.filter(
+                business_unit=self.own_unit
+            ).select_related('product')
+        }
+
+    def test_link_lines_creates_missing_products(self):
+        income = self.create_income(self.own_unit, 'C-1')
+        income.replace_lines([
+            {'sku': ' ab-1 ', 'product_name': 'Remera', 'price': 10, 'quantity': 1},
+            {'sku': '', 'product_name': 'Sin SKU', 'price': 5, 'quantity': 1},
+        ])
+
+        product = Product.objects.get(customer=self.customer)
+        self.assertEqual((product.sku, product.name), ('AB-1', 'Remera'))
+        self.assertEqual(
+            list(income.lines.order_by('id').values_list('product_id', flat=True)),
+            [product.pk, None]
+        )
+
+        IncomeLine.objects.filter(income=income).update(sku=None)
+        link_lines(income.lines.values_list('id', flat=True))
+        self.assertFalse(income.lines.filter(product__isnull=False).exists())
+
+    def test_writes_enqueue_months(self):
+        PendingProductSales.objects.all().delete()
+        income = self.create_income(self.own_unit, 'C-2', date=date(2025, 3, 10))
+        income.replace_lines([{'sku': 'c-2', 'price': 10, 'quantity': 3}])
+        self.assertTrue(PendingProductSales.objects.exists())
+
+        refresh_pending_sales()
+        self.assertFalse(PendingProductSales.objects.exists())
+        self.assertEqual(
+            self.sales(), {('C-2', date(2025, 3, 1)): (3, Decimal('30.00'))}
+        )
+
+        # Un cambio que no afecta las ventas no encola
+        Income.objects.filter(pk=income.pk).update(discount=Decimal('1'))
+        self.assertFalse(PendingProductSales.objects.exists())
+
+        Income.objects.filter(pk=income.pk).update(date=date(2025, 4, 2))
+        self.assertEqual(
+            set(PendingProductSales.objects.values_list('month', flat=True)),
+            {date(2025, 3, 1), date(2025, 4, 1)}
+        )
+        refresh_pending_sales()
+        self.assertEqual(
+            self.sales(), {('C-2', date(2025, 4, 1)): (3, Decimal('30.00'))}
+        )
+
+        income.soft_delete()
+        refresh_pending_sales()
+        self.assertEqual(self.sales(), {})
+
+
+class ProductAdminTests(IncomeTestData, TestCase):
+    """
+    Formulario de productos para un usuario con unidades asignadas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.foreign_customer = Customer.objects.create(
+            name='Otra empresa', email='otra@example.com'
+        )
+        cls.operator.user_permissions.add(
+            *Permission.objects.filter(content_type__app_label='products')
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.operator)
+
+    def test_customer_choices_scoped(self):
+        response = self.client.get(reverse('admin:products_product_add'))
+        self.assertEqual(response.status_code, 200)
+        choices = response.context['adminform'].form.fields['customer'].queryset
+        self.assertEqual(list(choices), [self.customer])
+
+    def test_sku_of_deleted_product_rejected(self):
+        Product.objects.create(customer=self.customer, sku='ADM-1').soft_delete()
+        response = self.client.post(reverse('admin:products_product_add'), {
+            'customer': self.customer.pk, 'sku': 'adm-1 ', 'name': 'Taza',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('sku', response.context['adminform'].form.errors)
+
+
+class StockTests(IncomeTestData, TestCase):
+    """
+    Las ventas descuentan stock y lo devuelven al anularse o eliminarse,
+    por cualquier camino
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = Product.objects.create(customer=cls.customer, sku='ST-1', name='Taza')
+
+    def setUp(self):
+        cache.clear()
+        add_stock(self.product.pk, self.own_unit.pk, 10)
+
+    def sell(self, order_number, quantity=3):
+        income = self.create_income(self.own_unit, order_number)
+        income.replace_lines([{'sku': 'st-1', 'price': 10, 'quantity': quantity}])
+        return income
+
+    def stock(self):
+        return get_stock(self.product.pk, self.own_unit.pk)
+
+    def run_action(self, action, incomes, **data):
+        self.client.force_login(self.operator)
+        return self.client.post(
+            reverse('admin:incomes_income_changelist'),
+            {
+                'action': action,
+                helpers.ACTION_CHECKBOX_NAME: [income.pk for income in incomes],
+                **data,
+            }
+        )
+
+    def test_sale_and_idempotent_sync(self):
+        income = self.sell('ST-A')
+        self.assertEqual(self.stock(), 7)
+
+        line_ids = list(income.lines.values_list('id', flat=True))
+        self.assertEqual(sync_line_stock(line_ids), [])
+        income.lines.update(quantity=5)
+        sync_line_stock(line_ids)
+        self.assertEqual(self.stock(), 5)
+
+    def test_bulk_cancel_returns_stock(self):
+        income = self.sell('ST-B')
+        self.run_action(
+            'change_order_status', [income],
+            status=OrderStatus.CANCELLED, apply='1'
+        )
+        self.assertEqual(self.stock(), 10)
+
+    def test_soft_delete_action_returns_stock(self):
+        income = self.sell('ST-C')
+        self.run_action('soft_delete_selected', [income])
+        self.assertEqual(self.stock(), 10)
+
+    def test_fast_delete_action_returns_stock(self):
+        income = self.sell('ST-D')
+        self.run_action('fast_delete_selected', [income], post='yes')
+        self.assertFalse(Income.all_objects.filter(pk=income.pk).exists())
+        self.assertEqual(self.stock(), 10)
+
+    def test_api_status_change_and_delete(self):
+        client = APIClient()
+        client.force_authenticate(self.operator)
+        income = self.sell('ST-E')
+
+        response = client.patch(
+            f'/api/incomes/{income.pk}/', {'order_status': OrderStatus.CANCELLED},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.stock(), 10)
+
+        income = self.sell('ST-F')
+        self.assertEqual(client.delete(f'/api/incomes/{income.pk}/').status_code, 204)
+        self.assertEqual(self.stock(), 10)
+
+        Income.all_objects.get(pk=income.pk).restore()
+        self.assertEqual(self.stock(), 7)
+
+    def test_reconcile_stock(self):
+        income = self.sell('ST-G')
+        # Líneas borradas sin devolver el stock y una partición desfasada
+        IncomeLine.objects.filter(income=income).delete()
+        ProductStock.objects.filter(product=self.product).update(quantity=0)
+        self.assertTrue(stock_differences())
+
+        call_command('reconcile_stock', stdout=StringIO())
+        self.assertEqual(self.stock(), 10)
+        self.assertEqual(
+            StockMovement.objects.filter(product=self.product).count(), 3
+        )
+        self.assertEqual(stock_differences(), [])
+
+    def test_benchmark_guards(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_stock', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command(
+                'benchmark_stock', business_unit=self.own_unit.pk, stdout=StringIO()
+            )
 
-# Create your tests here.
+        # No reutiliza (ni borra al terminar) un producto existente
+        product = Product.objects.create(customer=self.customer, sku='BENCHMARK-STOCK')
+        with self.assertRaises(CommandError), self.settings(DEBUG=True):
+            call_command(
+                'benchmark_stock', business_unit=self.own_unit.pk, stdout=StringIO()
+            )
+        self.assertTrue(Product.objects.filter(pk=product.pk).exists())
@@ -0,0 +1,182 @@
+from datetime import date
+
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import F, Sum
+from django.template.response import TemplateResponse
+
+from tenant.models import BusinessUnit, Customer
+
+from .models import MonthlyExpenseBreakdown, MonthlyResult, PendingRollup
+
+GROUPINGS = {
+    'mes': (None, None, None),
+    'empresa': ('business_unit__customer_id', 'business_unit__customer__name', None),
+    'unidad': ('business_unit_id', 'business_unit__name', 'business_unit__customer__name'),
+}
+
+AMOUNT_FIELDS = (
+    'revenue', 'fixed_expenses', 'variable_expenses', 'unclassified_expenses'
+)
+
+# Los montos de cada unidad están en la moneda de reporte de su empresa, así
+# que toda suma se agrupa además por esa moneda
+CURRENCY = F('business_unit__customer__reporting_currency')
+
+
+def format_amount(amount, currency):
+    """Formatea el monto con separadores de miles, dos decimales y su moneda"""
+    formatted = f"{amount:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return f"{currency} {formatted}"
+
+
+def _parse_month(value, default):
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        return date(year, month, 1)
+    except (AttributeError, ValueError):
+        return default
+
+
+def _int_or_none(value):
+    return int(value) if value and value.isdigit() else None
+
+
+def _result_row(values):
+    """
+    Agrega gastos totales, resultado y margen a una fila de sumas de una
+    misma moneda
+    """
+    currency = values['moneda']
+    revenue = values['revenue'] or 0
+    expenses = sum(
+        values[field] or 0 for field in AMOUNT_FIELDS if field != 'revenue'
+    )
+    result = revenue - expenses
+    return {
+        'currency': currency,
+        'revenue': format_amount(revenue, currency),
+        'fixed_expenses': format_amount(values['fixed_expenses'] or 0, currency),
+        'variable_expenses': format_amount(values['variable_expenses'] or 0, currency),
+        'unclassified_expenses': format_amount(
+            values['unclassified_expenses'] or 0, currency
+        ),
+        'expenses': format_amount(expenses, currency),
+        'result': format_amount(result, currency),
+        'is_loss': result < 0,
+        'margin': f'{result / revenue * 100:.1f}%' if revenue else '-',
+    }
+
+
+@admin.register(MonthlyResult)
+class MonthlyResultAdmin(admin.ModelAdmin):
+    """
+    Estado de resultados por unidad de negocio o empresa y mes. Se lee de
+    los resultados mensuales precalculados (reports.rollups), así que no
+    recorre ingresos ni gastos al mostrarse
+    """
+    change_list_template = 'admin/reports/monthlyresult/profit_and_loss.html'
+    list_per_page = 240
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.user.is_superuser:
+            return queryset
+        return queryset.filter(request.business_unit_filter)
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+
+        today = date.today()
+        month_from = _parse_month(request.GET.get('desde'), date(today.year, 1, 1))
+        month_to = _parse_month(request.GET.get('hasta'), today.replace(day=1))
+        grouping = request.GET.get('agrupar')
+        if grouping not in GROUPINGS:
+            grouping = 'mes'
+        customer_id = _int_or_none(request.GET.get('empresa'))
+        business_unit_id = _int_or_none(request.GET.get('unidad'))
+
+        business_units = BusinessUnit.objects.select_related('customer')
+        if not request.user.is_superuser:
+            business_units = business_units.filter(id__in=request.user_business_units)
+
+        filters = {'month__gte': month_from, 'month__lte': month_to}
+        if customer_id:
+            filters['business_unit__customer_id'] = customer_id
+        if business_unit_id:
+            filters['business_unit_id'] = business_unit_id
+
+        results = self.get_queryset(request).filter(**filters).annotate(moneda=CURRENCY)
+        breakdown = MonthlyExpenseBreakdown.objects.filter(**filters).annotate(
+            moneda=CURRENCY
+        )
+        pending = PendingRollup.objects.all()
+        if not request.user.is_superuser:
+            breakdown = breakdown.filter(request.business_unit_filter)
+            pending = pending.filter(business_unit_id__in=request.user_business_units)
+
+        group_id, group_name, group_parent = GROUPINGS[grouping]
+        group_fields = [field for field in (group_id, group_name, group_parent) if field]
+        sums = {field: Sum(field) for field in AMOUNT_FIELDS}
+
+        page = Paginator(
+            results.values('month', 'moneda', *group_fields).annotate(
+                **sums
+            ).order_by('-month', 'moneda', *group_fields[1:]),
+            self.list_per_page
+        ).get_page(request.GET.get('p'))
+        rows = [
+            {
+                'month': row['month'],
+                'name': (
+                    f"{row[group_parent]} - {row[group_name]}" if group_parent
+                    else row[group_name] if group_name else 'Todas'
+                ),
+                **_result_row(row),
+            }
+            for row in page
+        ]
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Estado de resultados',
+            'rows': rows,
+            'page': page,
+            'totals': [
+                _result_row(row)
+                for row in results.values('moneda').annotate(**sums).order_by('moneda')
+            ],
+            'breakdown': [
+                {
+                    'name': row['expense_type__name'] or 'Sin tipo',
+                    'amount': format_amount(row['amount'], row['moneda']),
+                }
+                for row in breakdown.values('moneda', 'expense_type__name').annotate(
+                    amount=Sum('amount')
+                ).order_by('moneda', '-amount')
+            ],
+            'has_pending': pending.exists(),
+            'month_from': month_from,
+            'month_to': month_to,
+            'grouping': grouping,
+            'customer_id': customer_id,
+            'business_unit_id': business_unit_id,
+            'customers': Customer.objects.filter(
+                id__in=business_units.values('customer_id')
+            ),
+            'business_units': business_units,
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, self.change_list_template, context)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from reports.rollups import enqueue_all, refresh_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula los resultados mensuales de los meses con ingresos o '
+        'gastos modificados desde la última ejecución. Con --full encola y '
+        'recalcula todos los meses. Con --interval queda procesando la cola '
+        'cada esa cantidad de segundos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=int)
+
+    def handle(self, *args, **options):
+        if options['full']:
+            enqueued = enqueue_all()
+            self.stdout.write(f'{enqueued} meses encolados.')
+
+        while True:
+            close_old_connections()
+            refreshed = refresh_pending(batch_size=options['batch_size'])
+            if refreshed or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{refreshed} meses recalculados.'
+                ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:17
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('expenses', '0010_expenses_live_partial_indexes'),
+        ('tenant', '0005_customer_reporting_currency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_unit_id', models.BigIntegerField(verbose_name='Unidad de Negocio')),
+                ('month', models.DateField(verbose_name='Mes')),
+                ('created_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), verbose_name='Fecha de creación')),
+            ],
+            options={
+                'verbose_name': 'Mes pendiente de recalcular',
+                'verbose_name_plural': 'Meses pendientes de recalcular',
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyExpenseBreakdown',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Mes')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Monto')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('business_unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_expense_breakdown', to='tenant.businessunit', verbose_name='Unidad de Negocio')),
+                ('expense_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_breakdown', to='expenses.expensetype', verbose_name='Tipo de gasto')),
+            ],
+            options={
+                'verbose_name': 'Gasto mensual por tipo',
+                'verbose_name_plural': 'Gastos mensuales por tipo',
+                'ordering': ['-month', 'business_unit', 'expense_type'],
+                'indexes': [models.Index(fields=['month', 'expense_type'], name='expensebreakdown_month_idx')],
+                'constraints': [models.UniqueConstraint(fields=('business_unit', 'month', 'expense_type'), name='unique_monthly_expense_breakdown', nulls_distinct=False)],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Mes')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='En la moneda de reporte, sin órdenes canceladas ni reembolsadas', max_digits=14, verbose_name='Ventas')),
+                ('income_count', models.PositiveIntegerField(default=0, verbose_name='Ventas registradas')),
+                ('fixed_expenses', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Gastos fijos')),
+                ('variable_expenses', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Gastos variables')),
+                ('unclassified_expenses', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Gastos sin clasificar')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('business_unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_results', to='tenant.businessunit', verbose_name='Unidad de Negocio')),
+            ],
+            options={
+                'verbose_name': 'Estado de resultados',
+                'verbose_name_plural': 'Estado de resultados',
+                'ordering': ['-month', 'business_unit'],
+                'indexes': [models.Index(fields=['month'], name='monthlyresult_month_idx')],
+                'constraints': [models.UniqueConstraint(fields=('business_unit', 'month'), name='unique_monthly_result')],
+            },
+        ),
+    ]
@@ -0,0 +1,100 @@
+from django.db import migrations
+
+
+# Triggers por sentencia con tablas de transición: cada INSERT, UPDATE o
+# DELETE de ingresos o gastos encola una vez los meses que tocó. Ambas
+# tablas tienen business_unit_id y date, así que comparten las funciones
+CREATE_TRIGGER_SQL = """
+CREATE FUNCTION reports_enqueue_months() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO reports_pendingrollup (business_unit_id, month)
+    SELECT DISTINCT business_unit_id, date_trunc('month', date)::date
+    FROM changed_rows
+    WHERE business_unit_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION reports_enqueue_months_update() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO reports_pendingrollup (business_unit_id, month)
+    SELECT business_unit_id, date_trunc('month', date)::date
+    FROM new_rows
+    WHERE business_unit_id IS NOT NULL
+    UNION
+    SELECT business_unit_id, date_trunc('month', date)::date
+    FROM old_rows
+    WHERE business_unit_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER income_insert_rollup
+    AFTER INSERT ON incomes_income
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reports_enqueue_months();
+
+CREATE TRIGGER income_delete_rollup
+    AFTER DELETE ON incomes_income
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reports_enqueue_months();
+
+CREATE TRIGGER income_update_rollup
+    AFTER UPDATE ON incomes_income
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reports_enqueue_months_update();
+
+CREATE TRIGGER expenses_insert_rollup
+    AFTER INSERT ON expenses_expenses
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reports_enqueue_months();
+
+CREATE TRIGGER expenses_delete_rollup
+    AFTER DELETE ON expenses_expenses
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reports_enqueue_months();
+
+CREATE TRIGGER expenses_update_rollup
+    AFTER UPDATE ON expenses_expenses
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reports_enqueue_months_update();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER expenses_update_rollup ON expenses_expenses;
+DROP TRIGGER expenses_delete_rollup ON expenses_expenses;
+DROP TRIGGER expenses_insert_rollup ON expenses_expenses;
+DROP TRIGGER income_update_rollup ON incomes_income;
+DROP TRIGGER income_delete_rollup ON incomes_income;
+DROP TRIGGER income_insert_rollup ON incomes_income;
+DROP FUNCTION reports_enqueue_months_update();
+DROP FUNCTION reports_enqueue_months();
+"""
+
+# Los meses que ya tienen datos quedan en la cola para el primer recálculo
+ENQUEUE_EXISTING_SQL = """
+INSERT INTO reports_pendingrollup (business_unit_id, month)
+SELECT business_unit_id, date_trunc('month', date)::date
+FROM incomes_income
+WHERE business_unit_id IS NOT NULL
+UNION
+SELECT business_unit_id, date_trunc('month', date)::date
+FROM expenses_expenses
+WHERE business_unit_id IS NOT NULL
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('incomes', '0015_exchange_rates'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGER_SQL, reverse_sql=DROP_TRIGGER_SQL),
+        migrations.RunSQL(
+            ENQUEUE_EXISTING_SQL,
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
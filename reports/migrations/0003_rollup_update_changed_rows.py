@@ -0,0 +1,126 @@
+from django.db import migrations
+
+
+# Un UPDATE solo encola los meses de las filas que cambiaron algo que suma en
+# el estado de resultados: marcar como leído, cambiar el estado de pago o
+# editar observaciones no recalcula nada. Ingresos y gastos comparan
+# columnas distintas, así que cada tabla tiene su propia función
+CREATE_FUNCTIONS_SQL = """
+CREATE FUNCTION reports_enqueue_income_months_update() RETURNS trigger AS $$
+BEGIN
+    WITH changed AS (
+        SELECT
+            old_rows.business_unit_id AS old_business_unit_id,
+            old_rows.date AS old_date,
+            new_rows.business_unit_id AS new_business_unit_id,
+            new_rows.date AS new_date
+        FROM old_rows
+        JOIN new_rows USING (id)
+        WHERE (
+            old_rows.date, old_rows.business_unit_id, old_rows.total_base,
+            old_rows.order_status, old_rows.deleted_at
+        ) IS DISTINCT FROM (
+            new_rows.date, new_rows.business_unit_id, new_rows.total_base,
+            new_rows.order_status, new_rows.deleted_at
+        )
+    )
+    INSERT INTO reports_pendingrollup (business_unit_id, month)
+    SELECT old_business_unit_id, date_trunc('month', old_date)::date
+    FROM changed
+    WHERE old_business_unit_id IS NOT NULL
+    UNION
+    SELECT new_business_unit_id, date_trunc('month', new_date)::date
+    FROM changed
+    WHERE new_business_unit_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION reports_enqueue_expense_months_update() RETURNS trigger AS $$
+BEGIN
+    WITH changed AS (
+        SELECT
+            old_rows.business_unit_id AS old_business_unit_id,
+            old_rows.date AS old_date,
+            new_rows.business_unit_id AS new_business_unit_id,
+            new_rows.date AS new_date
+        FROM old_rows
+        JOIN new_rows USING (id)
+        WHERE (
+            old_rows.date, old_rows.business_unit_id, old_rows.amount,
+            old_rows.expense_type_id, old_rows.is_fixed, old_rows.deleted_at
+        ) IS DISTINCT FROM (
+            new_rows.date, new_rows.business_unit_id, new_rows.amount,
+            new_rows.expense_type_id, new_rows.is_fixed, new_rows.deleted_at
+        )
+    )
+    INSERT INTO reports_pendingrollup (business_unit_id, month)
+    SELECT old_business_unit_id, date_trunc('month', old_date)::date
+    FROM changed
+    WHERE old_business_unit_id IS NOT NULL
+    UNION
+    SELECT new_business_unit_id, date_trunc('month', new_date)::date
+    FROM changed
+    WHERE new_business_unit_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER income_update_rollup ON incomes_income;
+DROP TRIGGER expenses_update_rollup ON expenses_expenses;
+DROP FUNCTION reports_enqueue_months_update();
+
+CREATE TRIGGER income_update_rollup
+    AFTER UPDATE ON incomes_income
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reports_enqueue_income_months_update();
+
+CREATE TRIGGER expenses_update_rollup
+    AFTER UPDATE ON expenses_expenses
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reports_enqueue_expense_months_update();
+"""
+
+DROP_FUNCTIONS_SQL = """
+DROP TRIGGER expenses_update_rollup ON expenses_expenses;
+DROP TRIGGER income_update_rollup ON incomes_income;
+DROP FUNCTION reports_enqueue_expense_months_update();
+DROP FUNCTION reports_enqueue_income_months_update();
+
+CREATE FUNCTION reports_enqueue_months_update() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO reports_pendingrollup (business_unit_id, month)
+    SELECT business_unit_id, date_trunc('month', date)::date
+    FROM new_rows
+    WHERE business_unit_id IS NOT NULL
+    UNION
+    SELECT business_unit_id, date_trunc('month', date)::date
+    FROM old_rows
+    WHERE business_unit_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER income_update_rollup
+    AFTER UPDATE ON incomes_income
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reports_enqueue_months_update();
+
+CREATE TRIGGER expenses_update_rollup
+    AFTER UPDATE ON expenses_expenses
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reports_enqueue_months_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_rollup_triggers'),
+        ('incomes', '0016_change_feed_global_index'),
+        ('expenses', '0014_change_feed_global_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_FUNCTIONS_SQL, reverse_sql=DROP_FUNCTIONS_SQL),
+    ]
@@ -0,0 +1,128 @@
+from django.db import models
+from django.db.models.functions import Now
+from django.utils.translation import gettext_lazy as _
+
+from expenses.models import ExpenseType
+from tenant.models import BusinessUnit
+
+
+class MonthlyResult(models.Model):
+    """
+    Resultado de una unidad de negocio en un mes: ventas y gastos ya
+    sumados. Se recalcula por mes desde reports.rollups
+    """
+    business_unit = models.ForeignKey(
+        BusinessUnit,
+        on_delete=models.CASCADE,
+        verbose_name=_('Unidad de Negocio'),
+        related_name='monthly_results'
+    )
+    month = models.DateField(_('Mes'))
+    revenue = models.DecimalField(
+        _('Ventas'),
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text=_('En la moneda de reporte, sin órdenes canceladas ni reembolsadas')
+    )
+    income_count = models.PositiveIntegerField(_('Ventas registradas'), default=0)
+    fixed_expenses = models.DecimalField(
+        _('Gastos fijos'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    variable_expenses = models.DecimalField(
+        _('Gastos variables'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    unclassified_expenses = models.DecimalField(
+        _('Gastos sin clasificar'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    updated_at = models.DateTimeField(_('Fecha de actualización'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Estado de resultados')
+        verbose_name_plural = _('Estado de resultados')
+        ordering = ['-month', 'business_unit']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['business_unit', 'month'],
+                name='unique_monthly_result'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['month'], name='monthlyresult_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.business_unit} - {self.month:%m/%Y}"
+
+
+class MonthlyExpenseBreakdown(models.Model):
+    """
+    Gastos de una unidad de negocio en un mes por tipo de gasto
+    """
+    business_unit = models.ForeignKey(
+        BusinessUnit,
+        on_delete=models.CASCADE,
+        verbose_name=_('Unidad de Negocio'),
+        related_name='monthly_expense_breakdown'
+    )
+    month = models.DateField(_('Mes'))
+    expense_type = models.ForeignKey(
+        ExpenseType,
+        on_delete=models.CASCADE,
+        verbose_name=_('Tipo de gasto'),
+        related_name='monthly_breakdown',
+        null=True,
+        blank=True
+    )
+    amount = models.DecimalField(
+        _('Monto'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    updated_at = models.DateTimeField(_('Fecha de actualización'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Gasto mensual por tipo')
+        verbose_name_plural = _('Gastos mensuales por tipo')
+        ordering = ['-month', 'business_unit', 'expense_type']
+        constraints = [
+            # Los gastos sin tipo también forman un solo grupo por mes
+            models.UniqueConstraint(
+                fields=['business_unit', 'month', 'expense_type'],
+                name='unique_monthly_expense_breakdown',
+                nulls_distinct=False
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['month', 'expense_type'],
+                name='expensebreakdown_month_idx'
+            ),
+        ]
+
+
+class PendingRollup(models.Model):
+    """
+    Cola de meses de una unidad con ingresos o gastos modificados desde el
+    último recálculo. La cargan triggers de la base (migraciones 0002 y 0003), así que
+    incluye cualquier escritura: admin, API, importaciones y acciones
+    masivas. Solo se agregan filas (puede haber repetidas) para que las
+    escrituras concurrentes del mismo mes no se bloqueen entre sí
+    """
+    business_unit_id = models.BigIntegerField(_('Unidad de Negocio'))
+    month = models.DateField(_('Mes'))
+    created_at = models.DateTimeField(_('Fecha de creación'), db_default=Now())
+
+    class Meta:
+        verbose_name = _('Mes pendiente de recalcular')
+        verbose_name_plural = _('Meses pendientes de recalcular')
@@ -0,0 +1,183 @@
+"""
+Recálculo incremental de los resultados mensuales por unidad de negocio.
+
+Los triggers encolan en PendingRollup los meses tocados por cada escritura;
+refresh_pending() los toma en lotes y recalcula solo esos meses
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from expenses.models import Expenses
+from incomes.constants import VOID_ORDER_STATUSES
+from incomes.models import Income
+
+from .models import MonthlyExpenseBreakdown, MonthlyResult, PendingRollup
+
+ZERO = Decimal('0')
+
+
+def _next_month(month):
+    return (month.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def refresh_pending(batch_size=500, max_batches=None):
+    """
+    Procesa la cola de meses pendientes. Cada lote se bloquea con SKIP
+    LOCKED, así que varios procesos pueden recalcular en paralelo. Retorna
+    la cantidad de meses recalculados
+    """
+    refreshed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            pending = list(
+                PendingRollup.objects.select_for_update(
+                    skip_locked=True
+                ).order_by('id').values_list('id', 'business_unit_id', 'month')[:batch_size]
+            )
+            if not pending:
+                break
+
+            buckets = {(business_unit_id, month) for _, business_unit_id, month in pending}
+            refresh_months(buckets)
+            PendingRollup.objects.filter(
+                id__in=[pending_id for pending_id, _, _ in pending]
+            ).delete()
+
+        refreshed += len(buckets)
+        batches += 1
+    return refreshed
+
+
+def enqueue_all():
+    """
+    Encola todos los meses con ingresos, gastos o resultados ya calculados,
+    para reconstruir los reportes desde cero
+    """
+    buckets = set()
+    for queryset in (Income.all_objects.all(), Expenses.all_objects.all()):
+        buckets |= set(
+            queryset.filter(business_unit__isnull=False).annotate(
+                month=TruncMonth('date')
+            ).values_list('business_unit_id', 'month').distinct().order_by()
+        )
+    buckets |= set(
+        MonthlyResult.objects.values_list('business_unit_id', 'month')
+    )
+    PendingRollup.objects.bulk_create(
+        [
+            PendingRollup(business_unit_id=business_unit_id, month=month)
+            for business_unit_id, month in sorted(buckets)
+        ],
+        batch_size=1000
+    )
+    return len(buckets)
+
+
+def refresh_months(buckets, chunk_size=100):
+    """
+    Recalcula los resultados de los pares (business_unit_id, mes) indicados
+    """
+    buckets = sorted(buckets)
+    for start in range(0, len(buckets), chunk_size):
+        _refresh_buckets(buckets[start:start + chunk_size])
+
+
+def _refresh_buckets(buckets):
+    income_filter = Q()
+    expense_filter = Q()
+    result_filter = Q()
+    for business_unit_id, month in buckets:
+        period = Q(
+            business_unit_id=business_unit_id,
+            date__gte=month,
+            date__lt=_next_month(month)
+        )
+        income_filter |= period
+        expense_filter |= period
+        result_filter |= Q(business_unit_id=business_unit_id, month=month)
+
+    revenue = Income.objects.filter(income_filter).exclude(
+        order_status__in=VOID_ORDER_STATUSES
+    ).annotate(
+        month=TruncMonth('date')
+    ).values('business_unit_id', 'month').annotate(
+        revenue=Sum('total_base'),
+        income_count=Count('id')
+    ).order_by()
+
+    expenses = Expenses.objects.filter(expense_filter).annotate(
+        month=TruncMonth('date')
+    ).values('business_unit_id', 'month', 'expense_type_id', 'is_fixed').annotate(
+        amount=Sum('amount')
+    ).order_by()
+
+    results = {}
+
+    def result(business_unit_id, month):
+        key = (business_unit_id, month)
+        if key not in results:
+            results[key] = MonthlyResult(business_unit_id=business_unit_id, month=month)
+        return results[key]
+
+    for row in revenue:
+        row_result = result(row['business_unit_id'], row['month'])
+        row_result.revenue = row['revenue'] or ZERO
+        row_result.income_count = row['income_count']
+
+    breakdown = defaultdict(lambda: ZERO)
+    for row in expenses:
+        row_result = result(row['business_unit_id'], row['month'])
+        if row['is_fixed'] is None:
+            row_result.unclassified_expenses += row['amount']
+        elif row['is_fixed']:
+            row_result.fixed_expenses += row['amount']
+        else:
+            row_result.variable_expenses += row['amount']
+        breakdown[
+            (row['business_unit_id'], row['month'], row['expense_type_id'])
+        ] += row['amount']
+
+    started_at = timezone.now()
+    with transaction.atomic():
+        MonthlyResult.objects.bulk_create(
+            results.values(),
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['business_unit', 'month'],
+            update_fields=[
+                'revenue', 'income_count', 'fixed_expenses',
+                'variable_expenses', 'unclassified_expenses', 'updated_at'
+            ]
+        )
+        MonthlyExpenseBreakdown.objects.bulk_create(
+            [
+                MonthlyExpenseBreakdown(
+                    business_unit_id=business_unit_id,
+                    month=month,
+                    expense_type_id=expense_type_id,
+                    amount=amount
+                )
+                for (business_unit_id, month, expense_type_id), amount
+                in breakdown.items()
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['business_unit', 'month', 'expense_type'],
+            update_fields=['amount', 'updated_at']
+        )
+        # Lo que no se tocó en este recálculo ya no tiene movimientos
+        MonthlyResult.objects.filter(
+            result_filter,
+            updated_at__lt=started_at
+        ).delete()
+        MonthlyExpenseBreakdown.objects.filter(
+            result_filter,
+            updated_at__lt=started_at
+        ).delete()
@@ -0,0 +1,158 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from expenses.models import Expenses, ExpenseType
+from incomes.constants import Currency, OrderStatus, PaymentStatus
+from incomes.models import Income
+from incomes.tests import IncomeTestData
+from tenant.models import BusinessUnit, Customer
+
+from .models import MonthlyExpenseBreakdown, MonthlyResult, PendingRollup
+from .rollups import enqueue_all, refresh_pending
+
+
+class RollupTests(IncomeTestData, TestCase):
+    """
+    Los triggers encolan los meses tocados y refresh_pending recalcula sus
+    resultados
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.expense_type = ExpenseType.objects.create(code='RPT', name='Publicidad')
+
+    def pending(self):
+        return set(
+            PendingRollup.objects.filter(
+                business_unit_id=self.own_unit.pk
+            ).values_list('month', flat=True)
+        )
+
+    def result(self, month):
+        return MonthlyResult.objects.get(business_unit=self.own_unit, month=month)
+
+    def test_refresh_pending(self):
+        self.create_income(self.own_unit, 'R-1', date=date(2025, 3, 5))
+        self.create_income(
+            self.own_unit, 'R-2', date=date(2025, 3, 6),
+            order_status=OrderStatus.CANCELLED
+        )
+        Expenses.objects.create(
+            business_unit=self.own_unit, date=date(2025, 3, 7),
+            amount=Decimal('4'), expense_type=self.expense_type, is_fixed=True
+        )
+        Expenses.objects.create(
+            business_unit=self.own_unit, date=date(2025, 3, 8), amount=Decimal('1')
+        )
+        self.assertEqual(self.pending(), {date(2025, 3, 1)})
+
+        refresh_pending()
+        self.assertEqual(self.pending(), set())
+        result = self.result(date(2025, 3, 1))
+        self.assertEqual(result.revenue, Decimal('10.00'))
+        self.assertEqual(result.income_count, 1)
+        self.assertEqual(result.fixed_expenses, Decimal('4.00'))
+        self.assertEqual(result.unclassified_expenses, Decimal('1.00'))
+        self.assertEqual(
+            MonthlyExpenseBreakdown.objects.filter(business_unit=self.own_unit).count(), 2
+        )
+
+    def test_update_enqueues_only_relevant_changes(self):
+        income = self.create_income(self.own_unit, 'R-3', date=date(2025, 3, 5))
+        expense = Expenses.objects.create(
+            business_unit=self.own_unit, date=date(2025, 3, 7), amount=Decimal('4')
+        )
+        refresh_pending()
+
+        Income.objects.filter(pk=income.pk).update(payment_status=PaymentStatus.PAID)
+        Expenses.objects.filter(pk=expense.pk).update(observations='Revisado')
+        self.assertEqual(self.pending(), set())
+
+        Income.objects.filter(pk=income.pk).update(date=date(2025, 4, 2))
+        self.assertEqual(self.pending(), {date(2025, 3, 1), date(2025, 4, 1)})
+        refresh_pending()
+
+        Expenses.objects.filter(pk=expense.pk).update(is_fixed=False)
+        self.assertEqual(self.pending(), {date(2025, 3, 1)})
+        refresh_pending()
+        self.assertEqual(self.result(date(2025, 3, 1)).variable_expenses, Decimal('4.00'))
+        self.assertEqual(self.result(date(2025, 4, 1)).revenue, Decimal('10.00'))
+
+        income.soft_delete()
+        expense.soft_delete()
+        refresh_pending()
+        self.assertFalse(
+            MonthlyResult.objects.filter(business_unit=self.own_unit).exists()
+        )
+
+    def test_enqueue_all(self):
+        self.create_income(self.own_unit, 'R-4', date=date(2025, 5, 5))
+        PendingRollup.objects.all().delete()
+        self.assertGreaterEqual(enqueue_all(), 1)
+        self.assertEqual(self.pending(), {date(2025, 5, 1)})
+
+
+class ProfitAndLossAdminTests(IncomeTestData, TestCase):
+    """
+    Estado de resultados del admin con empresas de distinta moneda de reporte
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_superuser(
+            f'{cls.__name__}-admin', 'admin@example.com', 'x'
+        )
+        cls.dollar_customer = Customer.objects.create(
+            name=f'Dólares {cls.__name__}', email='usd@example.com',
+            reporting_currency=Currency.USD
+        )
+        cls.dollar_unit = BusinessUnit.objects.create(
+            customer=cls.dollar_customer, name='Exterior'
+        )
+        MonthlyResult.objects.create(
+            business_unit=cls.own_unit, month=date(2020, 1, 1), revenue=Decimal('100')
+        )
+        MonthlyResult.objects.create(
+            business_unit=cls.dollar_unit, month=date(2020, 1, 1), revenue=Decimal('5')
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def get(self, **params):
+        response = self.client.get(
+            reverse('admin:reports_monthlyresult_changelist'),
+            {'desde': '2020-01', 'hasta': '2020-01', **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_totals_per_currency(self):
+        response = self.get(agrupar='unidad')
+        totals = {
+            row['currency']: row['revenue'] for row in response.context['totals']
+        }
+        self.assertEqual(totals['ARS'], 'ARS 100,00')
+        self.assertEqual(totals['USD'], 'USD 5,00')
+
+    def test_month_rows_do_not_mix_currencies(self):
+        response = self.get(agrupar='mes')
+        revenues = {
+            (row['currency'], row['revenue']) for row in response.context['rows']
+        }
+        self.assertIn(('USD', 'USD 5,00'), revenues)
+        self.assertNotIn(('ARS', 'ARS 105,00'), revenues)
+
+    def test_customer_filter_single_currency(self):
+        response = self.get(empresa=str(self.dollar_customer.pk))
+        self.assertEqual(
+            [row['revenue'] for row in response.context['totals']], ['USD 5,00']
+        )
@@ -1,26 +1,37 @@
 #!/bin/bash
 set -e
 
-# echo "Waiting for postgres..."
-# while ! nc -z db 5432; do
-#   sleep 0.1
-# done
-# echo "PostgreSQL started"
-
 mkdir -p /var/log/supervisor
 mkdir -p /var/log/django
-mkdir -p /var/log/gunicorn
 
-echo "Collect static files..."
-python manage.py collectstatic --noinput
+# La imagen ya trae los estáticos recolectados. Con el código montado como
+# volumen (docker-compose) se recolectan la primera vez
+if [ ! -f /app/staticfiles/staticfiles.json ]; then
+    echo "Collect static files..."
+    python manage.py collectstatic --noinput
+fi
 
+# Solo migra si hay migraciones pendientes, una réplica a la vez. Crea el
+# superusuario de DJANGO_SUPERUSER_USERNAME/EMAIL/PASSWORD si no existe
 echo "Applying migrations..."
-python manage.py makemigrations
-python manage.py migrate
+python manage.py migrate_locked
+
+# SERVER_MODE=wsgi (uwsgi, por defecto), asgi (uvicorn) o dev (runserver)
+SERVER_MODE=${SERVER_MODE:-wsgi}
+if [ "$SERVER_MODE" = "dev" ]; then
+    exec python manage.py runserver 0.0.0.0:9009
+fi
+
+# Detrás de nginx, nginx sirve los archivos de medios que autoriza Django
+# (thot.media). Con runserver no hay nginx y los envía Django
+export MEDIA_ACCEL_REDIRECT=${MEDIA_ACCEL_REDIRECT:-/protected-media/}
 
-echo "Creating default admin user..."
-python manage.py shell -c "from django.contrib.auth.models import User; User.objects.create_superuser('admin', 'admin@example.com', 'admin') if not User.objects.filter(username='admin').exists() else None"
+if [ "$SERVER_MODE" = "asgi" ]; then
+    SUPERVISOR_CONF=/etc/supervisor/supervisord-asgi.conf
+else
+    SUPERVISOR_CONF=/etc/supervisor/conf.d/supervisord.conf
+fi
+ln -sf /etc/nginx/thot/app-${SERVER_MODE}.conf /etc/nginx/thot/app.conf
 
-python manage.py runserver 0.0.0.0:9009
-# echo "Starting supervisord..."
-# exec /usr/bin/supervisord -n -c /etc/supervisor/conf.d/supervisord.conf
+echo "Starting supervisord ($SERVER_MODE)..."
+exec /usr/bin/supervisord -n -c $SUPERVISOR_CONF
@@ -1,17 +1,33 @@
 document.addEventListener('DOMContentLoaded', function() {
     // Función para calcular el total
+    // Suma precio x cantidad de las líneas de producto no marcadas para borrar
+    function linesSubtotal() {
+        let subtotal = 0;
+        document.querySelectorAll('input[name^="lines-"][name$="-price"]').forEach(function(priceField) {
+            const prefix = priceField.name.slice(0, -'price'.length);
+            const quantityField = document.querySelector('input[name="' + prefix + 'quantity"]');
+            const deleteField = document.querySelector('input[name="' + prefix + 'DELETE"]');
+            if (deleteField && deleteField.checked) {
+                return;
+            }
+            const price = parseFloat(priceField.value) || 0;
+            const quantity = quantityField ? (parseFloat(quantityField.value) || 0) : 0;
+            subtotal += price * quantity;
+        });
+        return subtotal;
+    }
+
     function calculateTotal() {
-        const subtotalField = document.getElementById('id_product_subtotal');
         const discountField = document.getElementById('id_discount');
         const shippingField = document.getElementById('id_shipping_cost');
-        const totalField = document.getElementById('id_total');
+        const totalField = document.getElementById('id_calculated_total');
         
-        if (subtotalField && discountField && shippingField && totalField) {
-            const subtotal = parseFloat(subtotalField.value) || 0;
+        if (discountField && shippingField && totalField) {
+            const subtotal = linesSubtotal();
             const discount = parseFloat(discountField.value) || 0;
             const shipping = parseFloat(shippingField.value) || 0;
             
-            const total = subtotal - discount + shipping;
+            const total = subtotal - Math.min(discount, subtotal) + shipping;
             
             // Actualizar el campo total
             totalField.value = total.toFixed(2);
@@ -28,16 +44,20 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     // Agregar event listeners a los campos que afectan el total
-    const fieldsToWatch = ['id_product_subtotal', 'id_discount', 'id_shipping_cost'];
-    
-    fieldsToWatch.forEach(function(fieldId) {
-        const field = document.getElementById(fieldId);
-        if (field) {
-            field.addEventListener('input', calculateTotal);
-            field.addEventListener('change', calculateTotal);
-            field.addEventListener('blur', calculateTotal);
-        }
+    // Las líneas se agregan dinámicamente, así que se escucha en el documento
+    function isWatched(field) {
+        return field.id === 'id_discount' || field.id === 'id_shipping_cost' ||
+            /^lines-\d+-(price|quantity|DELETE)$/.test(field.name || '');
+    }
+
+    ['input', 'change'].forEach(function(eventName) {
+        document.addEventListener(eventName, function(e) {
+            if (isWatched(e.target)) {
+                calculateTotal();
+            }
+        });
     });
+    document.addEventListener('formset:removed', calculateTotal);
     
     // Calcular total inicial
     calculateTotal();
@@ -46,12 +66,12 @@ document.addEventListener('DOMContentLoaded', function() {
     const form = document.querySelector('form');
     if (form) {
         form.addEventListener('submit', function(e) {
-            const totalField = document.getElementById('id_total');
+            const totalField = document.getElementById('id_calculated_total');
             if (totalField) {
                 const total = parseFloat(totalField.value) || 0;
                 if (total <= 0) {
                     e.preventDefault();
-                    alert('Error: El total debe ser mayor que 0. Verifique el subtotal, descuento y costo de envío.');
+                    alert('Error: El total debe ser mayor que 0. Verifique los productos, descuento y costo de envío.');
                     return false;
                 }
             }
@@ -1,155 +1,196 @@
-# admin.py
-# from django.contrib import admin
-# from django.utils.html import format_html
-
-# from .models import Supplier
-
-
-# @admin.register(Supplier)
-# class SupplierAdmin(admin.ModelAdmin):
-#     list_display = [
-#         'business_unit_display',
-#         'business_name',
-#         'tax_id',
-#         'contact_info_display',
-#         'location_display',
-#         'status_display',
-#         'created_at'
-#     ]
-
-#     fieldsets = (
-#         ('Información Principal', {
-#             'fields': (
-#                 'business_unit',
-#                 'business_name',
-#                 'commercial_name',
-#                 'tax_id',
-#                 'is_active'
-#             )
-#         }),
-#         ('Información de Contacto', {
-#             'fields': (
-#                 'contact_person',
-#                 'email',
-#                 'phone'
-#             )
-#         }),
-#         ('Ubicación', {
-#             'fields': (
-#                 'address',
-#                 'city',
-#                 'country'
-#             )
-#         }),
-#         ('Información Bancaria', {
-#             'fields': (
-#                 'bank_name',
-#                 'bank_cbu_alias'
-#             ),
-#             'classes': ('collapse',),
-#             'description': 'Información confidencial para pagos'
-#         }),
-#         ('Información Adicional', {
-#             'fields': (
-#                 'notes',
-#             ),
-#             'classes': ('collapse',)
-#         })
-#     )
-
-#     search_fields = [
-#         'business_name',
-#         'commercial_name',
-#         'tax_id',
-#         'contact_person',
-#         'email',
-#         'business_unit__name',
-#         'business_unit__customer__name'
-#     ]
-
-#     list_filter = [
-#         'business_unit__customer',
-#         'business_unit',
-#         'is_active',
-#         'country',
-#         'city',
-#         'created_at'
-#     ]
-
-#     readonly_fields = ['created_at', 'updated_at']
-#     list_per_page = 20
-
-#     def business_unit_display(self, obj):
-#         """
-#         Muestra la unidad de negocio con formato especial
-#         """
-#         return format_html(
-#             '<div style="line-height: 1.5;">'
-#             '<span style="color: #666;">{}</span><br>'
-#             '<strong style="color: #2c3e50;">{}</strong>'
-#             '</div>',
-#             obj.business_unit.customer.name,
-#             obj.business_unit.name
-#         )
-#     business_unit_display.short_description = 'Unidad de Negocio'
-
-#     def contact_info_display(self, obj):
-#         """
-#         Muestra la información de contacto de manera organizada y visual
-#         """
-#         return format_html(
-#             '<div style="line-height: 1.5;">'
-#             '<strong>{}</strong><br>'
-#             '<a href="mailto:{}">{}</a><br>'
-#             '<span>{}</span>'
-#             '</div>',
-#             obj.contact_person,
-#             obj.email,
-#             obj.email,
-#             obj.phone
-#         )
-#     contact_info_display.short_description = 'Información de Contacto'
-
-#     def location_display(self, obj):
-#         """
-#         Muestra la ubicación de manera concisa
-#         """
-#         return format_html(
-#             '{}, <strong>{}</strong>',
-#             obj.city,
-#             obj.country
-#         )
-#     location_display.short_description = 'Ubicación'
-
-#     def status_display(self, obj):
-#         """
-#         Muestra el estado del proveedor con un indicador visual
-#         """
-#         return format_html(
-#             '<span style="background-color: {}; padding: 3px 10px; '
-#             'border-radius: 3px; color: white;">{}</span>',
-#             '#28a745' if obj.is_active else '#dc3545',
-#             'Activo' if obj.is_active else 'Inactivo'
-#         )
-#     status_display.short_description = 'Estado'
-
-#     def save_model(self, request, obj, form, change):
-#         """
-#         Sobrescribimos el método save_model para realizar acciones adicionales
-#         al guardar un proveedor
-#         """
-#         # Convertimos el nombre de la empresa a mayúsculas para mantener consistencia
-#         obj.business_name = obj.business_name.upper()
-#         if obj.commercial_name:
-#             obj.commercial_name = obj.commercial_name.upper()
-
-#         super().save_model(request, obj, form, change)
-
-#     class Media:
-#         """
-#         Agregamos archivos CSS y JavaScript personalizados para mejorar la interfaz
-#         """
-#         css = {
-#             'all': ('admin/css/supplier_admin.css',)
-#         }
-#         js = ('admin/js/supplier_admin.js',)
\ No newline at end of file
+from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
+
+from thot.admin_actions import soft_delete_selected
+
+from .models import Supplier
+
+
+@admin.register(Supplier)
+class SupplierAdmin(admin.ModelAdmin):
+    list_display = [
+        'business_unit_display',
+        'business_name',
+        'tax_id',
+        'contact_info_display',
+        'location_display',
+        'spend_display',
+        'status_display',
+        'created_at'
+    ]
+
+    fieldsets = (
+        ('Información Principal', {
+            'fields': (
+                'business_unit',
+                'business_name',
+                'commercial_name',
+                'tax_id',
+                'is_active'
+            )
+        }),
+        ('Información de Contacto', {
+            'fields': (
+                'contact_person',
+                'email',
+                'phone'
+            )
+        }),
+        ('Ubicación', {
+            'fields': (
+                'address',
+                'city',
+                'country'
+            )
+        }),
+        ('Información Bancaria', {
+            'fields': (
+                'bank_name',
+                'bank_cbu_alias'
+            ),
+            'classes': ('collapse',),
+            'description': 'Información confidencial para pagos'
+        }),
+        ('Gastos', {
+            'fields': (
+                'spend_total',
+                'expense_count'
+            )
+        }),
+        ('Información Adicional', {
+            'fields': (
+                'notes',
+            ),
+            'classes': ('collapse',)
+        })
+    )
+
+    # Los tres primeros tienen índice de trigramas (ver Supplier.Meta), así
+    # que icontains no recorre la tabla
+    search_fields = [
+        'business_name',
+        'commercial_name',
+        'tax_id'
+    ]
+
+    list_filter = [
+        'business_unit__customer',
+        'business_unit',
+        'is_active',
+        'country',
+        'created_at'
+    ]
+
+    list_select_related = ('business_unit', 'business_unit__customer')
+    readonly_fields = ['spend_total', 'expense_count', 'created_at', 'updated_at']
+    actions = [soft_delete_selected]
+    ordering = ['business_name']
+    list_per_page = 20
+
+    class Media:
+        css = {'all': ('css/admin_badges.css',)}
+
+    def get_queryset(self, request):
+        """
+        Filtra los proveedores por las unidades de negocio del usuario
+        """
+        queryset = super().get_queryset(request)
+        if request.user.is_superuser:
+            return queryset
+        return queryset.filter(request.business_unit_filter)
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+
+        # Si el usuario no es superusuario, filtrar las unidades de negocio disponibles
+        if not request.user.is_superuser:
+            field = form.base_fields['business_unit']
+            field.queryset = field.queryset.filter(id__in=request.user_business_units)
+            field.required = True
+            if len(request.user_business_units) == 1:
+                field.initial = request.user_business_units[0]
+
+        return form
+
+    def business_unit_display(self, obj):
+        """
+        Muestra la unidad de negocio con formato especial
+        """
+        if not obj.business_unit:
+            return format_html('<div class="unit-cell"><span>{}</span></div>', 'Sin unidad')
+        return format_html(
+            '<div class="unit-cell"><span>{}</span><strong>{}</strong></div>',
+            obj.business_unit.customer.name,
+            obj.business_unit.name
+        )
+    business_unit_display.short_description = 'Unidad de Negocio'
+    business_unit_display.admin_order_field = 'business_unit__name'
+
+    def contact_info_display(self, obj):
+        """
+        Muestra la información de contacto de manera organizada y visual
+        """
+        return format_html(
+            '<div class="stacked">'
+            '<strong>{}</strong><br>'
+            '<a href="mailto:{}">{}</a><br>'
+            '<span>{}</span>'
+            '</div>',
+            obj.contact_person,
+            obj.email,
+            obj.email,
+            obj.phone
+        )
+    contact_info_display.short_description = 'Información de Contacto'
+
+    def location_display(self, obj):
+        """
+        Muestra la ubicación de manera concisa
+        """
+        return format_html(
+            '{}, <strong>{}</strong>',
+            obj.city,
+            obj.country
+        )
+    location_display.short_description = 'Ubicación'
+
+    def spend_display(self, obj):
+        """
+        Gasto acumulado del proveedor, con enlace a sus gastos. Se lee de
+        los campos que mantiene el trigger de gastos, sin consultas por fila
+        """
+        if not obj.expense_count:
+            return '-'
+        return format_html(
+            '<a href="{}?supplier__id__exact={}">${}</a><br><small>{} gastos</small>',
+            reverse('admin:expenses_expenses_changelist'),
+            obj.pk,
+            '{:,.2f}'.format(float(obj.spend_total)),
+            obj.expense_count
+        )
+    spend_display.short_description = 'Gasto acumulado'
+    spend_display.admin_order_field = 'spend_total'
+
+    def status_display(self, obj):
+        """
+        Muestra el estado del proveedor con un indicador visual
+        """
+        return format_html(
+            '<span class="badge badge-small {}">{}</span>',
+            'badge-active' if obj.is_active else 'badge-inactive',
+            'Activo' if obj.is_active else 'Inactivo'
+        )
+    status_display.short_description = 'Estado'
+
+    def save_model(self, request, obj, form, change):
+        """
+        Sobrescribimos el método save_model para realizar acciones adicionales
+        al guardar un proveedor
+        """
+        # Convertimos el nombre de la empresa a mayúsculas para mantener consistencia
+        obj.business_name = obj.business_name.upper()
+        if obj.commercial_name:
+            obj.commercial_name = obj.commercial_name.upper()
+
+        super().save_model(request, obj, form, change)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0002_supplier_business_unit_alter_supplier_address_and_more'),
+        ('tenant', '0004_alter_businessunituser_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['business_unit', 'updated_at', 'id'], name='supplier_bu_updated_id_idx'),
+        ),
+    ]
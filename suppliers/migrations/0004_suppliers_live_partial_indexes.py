@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0003_supplier_change_feed_index'),
+        ('tenant', '0004_alter_businessunituser_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['business_unit', 'business_name'], name='supplier_live_bu_name_idx'),
+        ),
+    ]
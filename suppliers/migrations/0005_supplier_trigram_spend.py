@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:23
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0004_suppliers_live_partial_indexes'),
+        ('tenant', '0005_customer_reporting_currency'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='supplier',
+            name='expense_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Cantidad de gastos'),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='spend_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='Gasto acumulado'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('business_name'), name='gin_trgm_ops'), name='supplier_name_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('commercial_name'), name='gin_trgm_ops'), name='supplier_commercial_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('tax_id'), name='gin_trgm_ops'), name='supplier_tax_id_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-19 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0006_change_feed_global_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='supplier',
+            name='tax_id',
+            field=models.CharField(help_text='Número de identificación fiscal (DNI, CUIT, CUIL, etc.)', max_length=20, verbose_name='Identificación Fiscal'),
+        ),
+        migrations.AddConstraint(
+            model_name='supplier',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('tax_id',), name='unique_live_supplier_tax_id'),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
 from thot.models import TimestampsMixin
@@ -32,7 +34,6 @@ class Supplier(TimestampsMixin):
 
     tax_id = models.CharField(
         max_length=20,
-        unique=True,
         verbose_name=_('Identificación Fiscal'),
         help_text=_('Número de identificación fiscal (DNI, CUIT, CUIL, etc.)')
     )
@@ -110,6 +111,22 @@ class Supplier(TimestampsMixin):
         null=True,
     )
 
+    # Gasto acumulado en los gastos vinculados. Lo mantiene un trigger de
+    # expenses_expenses (migración expenses 0012) para listar sin sumar
+    spend_total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name=_('Gasto acumulado')
+    )
+
+    expense_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Cantidad de gastos')
+    )
+
     class Meta:
         verbose_name = _('Proveedor')
         verbose_name_plural = _('Proveedores')
@@ -118,10 +135,50 @@ class Supplier(TimestampsMixin):
             models.Index(fields=['business_name']),
             models.Index(fields=['tax_id']),
             models.Index(fields=['business_unit']),
+            models.Index(
+                fields=['business_unit', 'updated_at', 'id'],
+                name='supplier_bu_updated_id_idx'
+            ),
+            # Feed de cambios de superusuarios y de varias unidades
+            models.Index(
+                fields=['updated_at', 'id'],
+                name='supplier_updated_id_idx'
+            ),
+            models.Index(
+                fields=['business_unit', 'business_name'],
+                name='supplier_live_bu_name_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            # Búsqueda por trigramas sobre UPPER(...): es la expresión que
+            # arma icontains, así que la búsqueda del admin usa el índice
+            GinIndex(
+                OpClass(Upper('business_name'), name='gin_trgm_ops'),
+                name='supplier_name_trgm_idx'
+            ),
+            GinIndex(
+                OpClass(Upper('commercial_name'), name='gin_trgm_ops'),
+                name='supplier_commercial_trgm_idx'
+            ),
+            GinIndex(
+                OpClass(Upper('tax_id'), name='gin_trgm_ops'),
+                name='supplier_tax_id_trgm_idx'
+            ),
+        ]
+        # Solo entre los vigentes: la validación de Django usa el manager por
+        # defecto, que no ve los eliminados, y un proveedor eliminado no
+        # debe impedir volver a cargar su CUIT
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tax_id'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='unique_live_supplier_tax_id'
+            ),
         ]
 
     def __str__(self):
-        return f"{self.business_unit.name} - {self.business_name} ({self.tax_id})"
+        # Sin la unidad de negocio: se usa en listas y selectores y no debe
+        # consultar otras tablas
+        return f"{self.business_name} ({self.tax_id})"
 
     def get_full_address(self):
         """
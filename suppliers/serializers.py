@@ -0,0 +1,22 @@
+from rest_framework import serializers
+
+from thot.api import BusinessUnitScopedSerializer
+from .models import Supplier
+
+
+class SupplierSerializer(BusinessUnitScopedSerializer):
+    business_unit_name = serializers.CharField(
+        source='business_unit.name',
+        read_only=True,
+        default=None
+    )
+
+    class Meta:
+        model = Supplier
+        fields = (
+            'id', 'business_unit', 'business_unit_name', 'business_name',
+            'commercial_name', 'tax_id', 'contact_person', 'email', 'phone',
+            'address', 'city', 'country', 'bank_name', 'bank_cbu_alias',
+            'is_active', 'notes', 'created_at', 'updated_at'
+        )
+        read_only_fields = ('created_at', 'updated_at')
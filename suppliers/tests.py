@@ -1,3 +1,132 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.urls import reverse
+
+from expenses.models import Expenses
+from tenant.models import BusinessUnit, BusinessUnitUser, Customer
+
+from .models import Supplier
+
+
+class SupplierSpendTests(TestCase):
+    """
+    El trigger de gastos (expenses, migración 0012) mantiene el gasto
+    acumulado y la cantidad de gastos de cada proveedor
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(
+            name=f'Empresa {cls.__name__}', email='empresa@example.com'
+        )
+        cls.own_unit = BusinessUnit.objects.create(customer=customer, name='Propia')
+        cls.other_unit = BusinessUnit.objects.create(customer=customer, name='Ajena')
+        cls.supplier = Supplier.objects.create(
+            business_unit=cls.own_unit, business_name='PAPELERA SUR', tax_id='30-1-SPT'
+        )
+        cls.other_supplier = Supplier.objects.create(
+            business_unit=cls.other_unit, business_name='IMPRENTA NORTE', tax_id='30-2-SPT'
+        )
+
+    def create_expense(self, amount, supplier=None, **fields):
+        return Expenses.objects.create(
+            business_unit=self.own_unit, date=date(2025, 3, 1),
+            supplier=supplier or self.supplier, amount=Decimal(amount), **fields
+        )
+
+    def spend(self, supplier=None):
+        supplier = Supplier.objects.get(pk=(supplier or self.supplier).pk)
+        return supplier.spend_total, supplier.expense_count
+
+    def test_insert_update_and_delete(self):
+        expense = self.create_expense('30')
+        self.create_expense('20')
+        self.assertEqual(self.spend(), (Decimal('50.00'), 2))
+
+        Expenses.objects.filter(pk=expense.pk).update(amount=Decimal('10'))
+        self.assertEqual(self.spend(), (Decimal('30.00'), 2))
+
+        Expenses.objects.filter(pk=expense.pk).update(supplier=self.other_supplier)
+        self.assertEqual(self.spend(), (Decimal('20.00'), 1))
+        self.assertEqual(self.spend(self.other_supplier), (Decimal('10.00'), 1))
+
+        expense.soft_delete()
+        self.assertEqual(self.spend(self.other_supplier), (Decimal('0.00'), 0))
+        expense.restore()
+        self.assertEqual(self.spend(self.other_supplier), (Decimal('10.00'), 1))
+
+        Expenses.all_objects.filter(business_unit=self.own_unit).delete()
+        self.assertEqual(self.spend(), (Decimal('0.00'), 0))
+        self.assertEqual(self.spend(self.other_supplier), (Decimal('0.00'), 0))
+
+    def test_supplier_of_other_unit_rejected(self):
+        expense = Expenses(
+            business_unit=self.own_unit, date=date(2025, 3, 1),
+            supplier=self.other_supplier, amount=Decimal('5')
+        )
+        with self.assertRaises(ValidationError):
+            expense.full_clean()
+
+    def test_tax_id_of_deleted_supplier_reused(self):
+        self.supplier.soft_delete()
+        supplier = Supplier(
+            business_unit=self.own_unit, business_name='PAPELERA SUR SA',
+            tax_id=self.supplier.tax_id
+        )
+        supplier.full_clean()
+        supplier.save()
+
+        duplicate = Supplier(
+            business_unit=self.own_unit, business_name='OTRA', tax_id=supplier.tax_id
+        )
+        with self.assertRaises(ValidationError):
+            duplicate.full_clean()
+
+
+class SupplierAdminTests(TestCase):
+    """
+    Listado de proveedores para un operador con una unidad asignada
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(
+            name=f'Empresa {cls.__name__}', email='empresa@example.com'
+        )
+        own_unit = BusinessUnit.objects.create(customer=customer, name='Propia')
+        other_unit = BusinessUnit.objects.create(customer=customer, name='Ajena')
+        cls.operator = User.objects.create_user(
+            f'{cls.__name__}-operator', 'operator@example.com', 'x', is_staff=True
+        )
+        cls.operator.user_permissions.set(Permission.objects.filter(
+            content_type__app_label__in=('suppliers', 'expenses')
+        ))
+        BusinessUnitUser.objects.create(user=cls.operator, business_unit=own_unit)
+        cls.supplier = Supplier.objects.create(
+            business_unit=own_unit, business_name='PAPELERA SUR', tax_id='30-1-SPA'
+        )
+        Supplier.objects.create(
+            business_unit=other_unit, business_name='PAPELERA NORTE', tax_id='30-2-SPA'
+        )
+        Expenses.objects.create(
+            business_unit=own_unit, date=date(2025, 3, 1),
+            supplier=cls.supplier, amount=Decimal('1234.5')
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.operator)
 
-# Create your tests here.
+    def test_changelist_scoped_with_spend(self):
+        response = self.client.get(
+            reverse('admin:suppliers_supplier_changelist'), {'q': 'papelera'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['cl'].result_list), [self.supplier])
+        self.assertContains(response, '$1,234.50')
+        self.assertContains(response, f'supplier__id__exact={self.supplier.pk}')
@@ -1,3 +1,10 @@
-from django.shortcuts import render
+from thot.api import BusinessUnitScopedViewSet
 
-# Create your views here.
+from .models import Supplier
+from .serializers import SupplierSerializer
+
+
+class SupplierViewSet(BusinessUnitScopedViewSet):
+    queryset = Supplier.all_objects.all()
+    serializer_class = SupplierSerializer
+    select_related_fields = ('business_unit',)
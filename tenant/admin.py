@@ -4,17 +4,32 @@ from .models import Customer, BusinessUnit, BusinessUnitUser
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'phone', 'created_at')
+    list_display = ('name', 'email', 'phone', 'reporting_currency', 'created_at')
     search_fields = ('name', 'email', 'phone')
-    list_filter = ('created_at',)
+    list_filter = ('reporting_currency', 'created_at')
     ordering = ('name',)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+
+        # Los totales en moneda de reporte se recalculan si cambió la moneda
+        if change and 'reporting_currency' in form.changed_data:
+            from incomes.exchange import recompute_exchange_rates
+            from incomes.models import Income
+
+            recompute_exchange_rates(
+                Income.all_objects.filter(business_unit__customer=obj)
+            )
+
 
 @admin.register(BusinessUnit)
 class BusinessUnitAdmin(admin.ModelAdmin):
     list_display = ('name', 'customer', 'is_active', 'created_at')
     list_filter = ('is_active', 'customer', 'created_at')
-    search_fields = ('name', 'customer__name', 'description')
+    # Por prefijo, con los índices sobre UPPER(name): lo usa el
+    # autocompletado de los formularios de ingresos y gastos
+    search_fields = ('^name', '^customer__name')
+    list_select_related = ('customer',)
     ordering = ('customer', 'name')
 
 
@@ -23,4 +38,5 @@ class BusinessUnitUserAdmin(admin.ModelAdmin):
     list_display = ('user', 'business_unit', 'is_primary', 'created_at')
     list_filter = ('business_unit', 'is_primary', 'created_at')
     search_fields = ('user__username', 'user__email', 'business_unit__name')
+    list_select_related = ('user', 'business_unit__customer')
     ordering = ('user', 'business_unit')
@@ -0,0 +1,77 @@
+import gzip
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+DEFAULT_PAGES = (
+    'admin:incomes_income_changelist',
+    'admin:expenses_expenses_changelist',
+    'admin:suppliers_supplier_changelist',
+    'admin:products_product_changelist',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide los bytes de las listas del admin: el HTML generado y lo que '
+        'viaja comprimido con gzip, más el tiempo de respuesta. Las páginas '
+        'se piden con el usuario indicado (por defecto, el primer '
+        'superusuario).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Nombre del usuario')
+        parser.add_argument(
+            '--url', action='append', dest='urls',
+            help='URL a medir; se puede repetir. Por defecto las listas principales'
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(is_active=True)
+        if options['user']:
+            users = users.filter(username=options['user'])
+        else:
+            users = users.filter(is_superuser=True)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No se encontró el usuario.')
+
+        client = Client(HTTP_ACCEPT_ENCODING='gzip')
+        client.force_login(user)
+        urls = options['urls'] or [reverse(name) for name in DEFAULT_PAGES]
+
+        total_raw = total_sent = 0
+        try:
+            for url in urls:
+                elapsed = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    elapsed.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} respondió {response.status_code}.')
+
+                sent = len(response.content)
+                raw = (
+                    len(gzip.decompress(response.content))
+                    if response.get('Content-Encoding') == 'gzip' else sent
+                )
+                total_raw += raw
+                total_sent += sent
+                self.stdout.write(
+                    f'{url}: {raw / 1024:.1f} KiB de HTML, '
+                    f'{sent / 1024:.1f} KiB enviados ({raw / sent:.1f}x), '
+                    f'{min(elapsed) * 1000:.0f} ms'
+                )
+        finally:
+            client.logout()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Total: {total_raw / 1024:.1f} KiB de HTML, '
+            f'{total_sent / 1024:.1f} KiB enviados.'
+        ))
@@ -0,0 +1,95 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Se ejecuta en un proceso nuevo: mide la carga de thot.wsgi (lo que hace
+# el master de uwsgi) y el primer request de cada página, como un worker
+# recién creado
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+from thot.wsgi import application
+loaded = time.perf_counter() - started
+
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+
+setup_test_environment()
+username, names = sys.argv[1], sys.argv[2:]
+users = get_user_model().objects.filter(is_active=True)
+users = users.filter(username=username) if username else users.filter(is_superuser=True)
+client = Client()
+client.force_login(users.order_by('pk').first())
+
+first = {}
+for name in names:
+    url = reverse(name)
+    started = time.perf_counter()
+    response = client.get(url)
+    first[url] = (time.perf_counter() - started, response.status_code)
+print(json.dumps({'load': loaded, 'first': first}))
+'''
+
+DEFAULT_PAGES = (
+    'admin:index',
+    'admin:incomes_income_changelist',
+    'admin:incomes_income_add',
+    'admin:expenses_expenses_changelist',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el arranque de un worker con y sin la precarga de thot.warmup: '
+        'el tiempo de importar thot.wsgi y el del primer request de cada '
+        'página, en procesos nuevos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='', help='Nombre del usuario')
+        parser.add_argument(
+            '--url', action='append', dest='names',
+            help='Nombre de URL a pedir; se puede repetir'
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(DEFAULT_PAGES)
+        for label, warmup in (('Sin precarga', '0'), ('Con precarga', '1')):
+            runs = [
+                self.run_child(warmup, options['user'], names)
+                for _ in range(options['repeat'])
+            ]
+            load = statistics.median(run['load'] for run in runs)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{label}: thot.wsgi en {load * 1000:.0f} ms'
+            ))
+            for url in runs[0]['first']:
+                elapsed = statistics.median(run['first'][url][0] for run in runs)
+                self.stdout.write(
+                    f'  {url}: primer request en {elapsed * 1000:.0f} ms '
+                    f'({runs[0]["first"][url][1]})'
+                )
+
+    def run_child(self, warmup, username, names):
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD, username, *names],
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': 'thot.settings',
+                'THOT_WARMUP': warmup,
+            },
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        return json.loads(result.stdout.strip().splitlines()[-1])
@@ -0,0 +1,86 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from thot.changes import (
+    changes_since, deleted_since, merge_changes, position, serialize_changes,
+    watermark
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta en NDJSON las filas modificadas desde una marca de agua. '
+        'La marca de agua final se escribe en stderr para el próximo pedido.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'resource',
+            help='Recurso de la API: incomes, expenses o suppliers'
+        )
+        parser.add_argument('--since', help='Fecha ISO 8601')
+        parser.add_argument('--after-id', type=int)
+        parser.add_argument('--business-unit', type=int)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        from thot.urls import router
+
+        viewsets = {
+            prefix: viewset for prefix, viewset, _ in router.registry
+            if hasattr(viewset, 'changes')
+        }
+        viewset = viewsets.get(options['resource'])
+        if viewset is None:
+            raise CommandError(
+                f"Recurso inválido. Opciones: {', '.join(sorted(viewsets))}"
+            )
+
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError('--since debe ser una fecha ISO 8601.')
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        after_id = options['after_id']
+
+        queryset = viewset.queryset.select_related(
+            *viewset.select_related_fields
+        ).prefetch_related(*viewset.prefetch_related_fields)
+        if options['business_unit']:
+            queryset = queryset.filter(business_unit_id=options['business_unit'])
+
+        exported = 0
+        last = None
+        batch_size = options['batch_size']
+        while True:
+            deleted = deleted_since(queryset.model, since, after_id)
+            if options['business_unit']:
+                deleted = deleted.filter(business_unit_id=options['business_unit'])
+            rows = merge_changes(
+                changes_since(queryset, since, after_id)[:batch_size],
+                deleted[:batch_size],
+                batch_size
+            )
+            if not rows:
+                break
+
+            for data in serialize_changes(rows, viewset.serializer_class, {}):
+                self.stdout.write(json.dumps(data, cls=DjangoJSONEncoder))
+
+            exported += len(rows)
+            last = rows[-1]
+            since, after_id = position(last)
+
+        self.stderr.write(json.dumps({
+            'exported': exported,
+            'next': watermark(last) if last else {
+                'since': options['since'],
+                'after_id': options['after_id'],
+            },
+        }))
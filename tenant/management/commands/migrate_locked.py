@@ -0,0 +1,67 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+# Clave del pg_advisory_lock que comparten todas las réplicas al arrancar
+MIGRATION_LOCK_ID = 74_686_874
+
+
+class Command(BaseCommand):
+    help = (
+        'Aplica las migraciones pendientes, si las hay, con un advisory lock '
+        'de PostgreSQL para que varias réplicas que arrancan juntas no '
+        'migren a la vez. Luego crea el superusuario indicado en '
+        'DJANGO_SUPERUSER_USERNAME, DJANGO_SUPERUSER_EMAIL y '
+        'DJANGO_SUPERUSER_PASSWORD si todavía no existe.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        locked = connection.vendor == 'postgresql'
+
+        if locked:
+            # La réplica que llega segunda espera aquí y encuentra el plan vacío
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_lock(%s)', [MIGRATION_LOCK_ID])
+        try:
+            executor = MigrationExecutor(connection)
+            plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+            if plan:
+                self.stdout.write(f'Aplicando {len(plan)} migración(es)...')
+                call_command(
+                    'migrate',
+                    database=options['database'],
+                    interactive=False,
+                    verbosity=options['verbosity']
+                )
+            else:
+                self.stdout.write('Sin migraciones pendientes.')
+
+            self.ensure_superuser(options['database'])
+        finally:
+            if locked:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [MIGRATION_LOCK_ID])
+
+    def ensure_superuser(self, database):
+        username = os.environ.get('DJANGO_SUPERUSER_USERNAME')
+        password = os.environ.get('DJANGO_SUPERUSER_PASSWORD')
+        if not username or not password:
+            return
+
+        User = get_user_model()
+        users = User._default_manager.db_manager(database)
+        if users.filter(username=username).exists():
+            return
+
+        users.create_superuser(
+            username, os.environ.get('DJANGO_SUPERUSER_EMAIL', ''), password
+        )
+        self.stdout.write(self.style.SUCCESS(f'Superusuario {username} creado.'))
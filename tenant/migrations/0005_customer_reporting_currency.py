@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenant', '0004_alter_businessunituser_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='reporting_currency',
+            field=models.CharField(choices=[('ARS', 'Peso Argentino'), ('USD', 'Dólar Estadounidense'), ('EUR', 'Euro'), ('BRL', 'Real Brasileño'), ('CLP', 'Peso Chileno'), ('UYU', 'Peso Uruguayo'), ('PEN', 'Sol Peruano'), ('COP', 'Peso Colombiano'), ('MXN', 'Peso Mexicano')], default='ARS', help_text='Moneda a la que se convierten los ingresos para los totales', max_length=3, verbose_name='Moneda de reporte'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:27
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenant', '0005_customer_reporting_currency'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='businessunit',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='businessunit_upper_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='customer_upper_name_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.3 on 2026-10-19 17:16
+
+from django.db import migrations, models
+
+
+# Tablas con feed de cambios: un DELETE físico deja un registro por fila para
+# que /changes/ y export_changes informen la baja. clock_timestamp() y no
+# now(), para que la fecha quede lo más cerca posible del commit, igual que
+# updated_at
+FEED_TABLES = {
+    'incomes_income': 'incomes.income',
+    'expenses_expenses': 'expenses.expenses',
+    'suppliers_supplier': 'suppliers.supplier',
+}
+
+CREATE_TRIGGERS_SQL = """
+CREATE FUNCTION tenant_record_deleted_rows() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO tenant_deletedrecord (model, object_id, business_unit_id, deleted_at)
+    SELECT TG_ARGV[0], id, business_unit_id, clock_timestamp()
+    FROM old_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""" + "".join(
+    f"""
+CREATE TRIGGER {table}_record_deleted
+    AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tenant_record_deleted_rows('{model}');
+"""
+    for table, model in FEED_TABLES.items()
+)
+
+DROP_TRIGGERS_SQL = "".join(
+    f"DROP TRIGGER {table}_record_deleted ON {table};\n"
+    for table in FEED_TABLES
+) + "DROP FUNCTION tenant_record_deleted_rows();"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenant', '0006_upper_name_prefix_indexes'),
+        ('incomes', '0016_change_feed_global_index'),
+        ('expenses', '0014_change_feed_global_index'),
+        ('suppliers', '0006_change_feed_global_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('object_id', models.BigIntegerField(verbose_name='ID del registro')),
+                ('business_unit_id', models.BigIntegerField(null=True, verbose_name='Unidad de Negocio')),
+                ('deleted_at', models.DateTimeField(verbose_name='Fecha de eliminación')),
+            ],
+            options={
+                'verbose_name': 'Registro eliminado',
+                'verbose_name_plural': 'Registros eliminados',
+                'indexes': [models.Index(fields=['model', 'deleted_at', 'object_id'], name='deletedrecord_feed_idx')],
+            },
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, reverse_sql=DROP_TRIGGERS_SQL),
+    ]
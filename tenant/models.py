@@ -1,8 +1,12 @@
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
 from django.contrib.auth import get_user_model
 
+from incomes.constants import Currency, DEFAULT_REPORTING_CURRENCY
+
 User = get_user_model()
 
 
@@ -11,6 +15,15 @@ class Customer(models.Model):
     email = models.EmailField(_('Email'), unique=True)
     phone = models.CharField(_('Teléfono'), max_length=20, blank=True)
     address = models.TextField(_('Dirección'), blank=True)
+    reporting_currency = models.CharField(
+        _('Moneda de reporte'),
+        max_length=3,
+        choices=Currency.choices,
+        default=DEFAULT_REPORTING_CURRENCY,
+        help_text=_(
+            'Moneda a la que se convierten los ingresos para los totales'
+        )
+    )
     created_at = models.DateTimeField(
         _('Fecha de creación'),
         auto_now_add=True
@@ -24,11 +37,29 @@ class Customer(models.Model):
         verbose_name = _('Empresa')
         verbose_name_plural = _('Empresas')
         ordering = ['name']
+        indexes = [
+            # Búsqueda por prefijo del autocompletado: istartswith compara
+            # UPPER(name) LIKE 'TEXTO%'
+            models.Index(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='customer_upper_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class BusinessUnitManager(models.Manager):
+    """
+    Trae siempre la empresa: __str__ la usa, y los selectores, filtros y
+    listas del admin arman el nombre de cada unidad
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('customer')
+
+
 class BusinessUnit(models.Model):
     customer = models.ForeignKey(
         Customer,
@@ -48,11 +79,19 @@ class BusinessUnit(models.Model):
         auto_now=True
     )
 
+    objects = BusinessUnitManager()
+
     class Meta:
         verbose_name = _('Unidad de Negocio')
         verbose_name_plural = _('Unidades de Negocio')
         ordering = ['customer', 'name']
         unique_together = ['customer', 'name']
+        indexes = [
+            models.Index(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='businessunit_upper_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.customer.name} - {self.name}"
@@ -112,3 +151,31 @@ class BusinessUnitUser(models.Model):
                 id=self.id
             ).update(is_primary=False)
         super().save(*args, **kwargs)
+
+
+class DeletedRecord(models.Model):
+    """
+    Filas borradas físicamente (acciones de borrado del admin, cascadas) de
+    los modelos con feed de cambios, para que el feed informe también esas
+    bajas. Lo completan los triggers AFTER DELETE de la migración 0007
+    """
+    model = models.CharField(_('Modelo'), max_length=100)
+    object_id = models.BigIntegerField(_('ID del registro'))
+    business_unit_id = models.BigIntegerField(
+        _('Unidad de Negocio'),
+        null=True
+    )
+    deleted_at = models.DateTimeField(_('Fecha de eliminación'))
+
+    class Meta:
+        verbose_name = _('Registro eliminado')
+        verbose_name_plural = _('Registros eliminados')
+        indexes = [
+            models.Index(
+                fields=['model', 'deleted_at', 'object_id'],
+                name='deletedrecord_feed_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}"
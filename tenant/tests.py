@@ -1,3 +1,252 @@
-from django.test import TestCase
+import tempfile
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from expenses.models import Expenses, ExpenseType
+from incomes.models import Income
+from suppliers.models import Supplier
+
+from .models import BusinessUnit, BusinessUnitUser, Customer
+
+User = get_user_model()
+
+
+class AdminQueryCountTests(TestCase):
+    """
+    Las listas y formularios del admin hacen la misma cantidad de consultas
+    sin importar cuántas filas, unidades de negocio u opciones haya
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(
+            'queries-admin', 'queries-admin@example.com', 'x'
+        )
+        cls.operator = User.objects.create_user(
+            'queries-operator', 'queries-operator@example.com', 'x',
+            is_staff=True
+        )
+        cls.operator.user_permissions.set(Permission.objects.filter(
+            content_type__app_label__in=('incomes', 'expenses', 'suppliers')
+        ))
+        cls.expense_type = ExpenseType.objects.create(code='QRY', name='Consultas')
+        cls.rows = 0
+        cls.customer = cls.add_rows(2)
+
+    @classmethod
+    def add_rows(cls, count):
+        """
+        Crea una empresa con count unidades de negocio, cada una con un
+        ingreso, un gasto y un proveedor, asignadas a ambos usuarios
+        """
+        cls.rows += 1
+        customer = Customer.objects.create(
+            name=f'Empresa {cls.rows}', email=f'empresa{cls.rows}@example.com'
+        )
+        for number in range(count):
+            business_unit = BusinessUnit.objects.create(
+                customer=customer, name=f'Unidad {number}'
+            )
+            for user in (cls.superuser, cls.operator):
+                BusinessUnitUser.objects.create(user=user, business_unit=business_unit)
+            supplier = Supplier.objects.create(
+                business_unit=business_unit,
+                business_name=f'Proveedor {cls.rows}-{number}',
+                tax_id=f'{cls.rows}-{number}'
+            )
+            Income.objects.create(
+                business_unit=business_unit,
+                order_number=f'{cls.rows}-{number}',
+                date=date(2025, 1, 10),
+                shipping_cost=Decimal('10')
+            )
+            Expenses.objects.create(
+                business_unit=business_unit,
+                expense_type=cls.expense_type,
+                supplier=supplier,
+                date=date(2025, 1, 10),
+                amount=Decimal('5')
+            )
+        return customer
+
+    def count_queries(self, url):
+        # Sin caché: se mide el costo de armar la página completa
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def assertConstantQueries(self, user, url):
+        """
+        Mide la página, agrega filas y verifica que la cantidad de consultas
+        no cambie. La primera visita calienta los cachés de la sesión
+        """
+        self.client.force_login(user)
+        self.count_queries(url)
+        expected = self.count_queries(url)
+        self.add_rows(3)
+        cache.clear()
+        with self.assertNumQueries(expected):
+            self.client.get(url)
+
+    def admin_urls(self, model, obj):
+        opts = model._meta
+        return (
+            reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'),
+            reverse(f'admin:{opts.app_label}_{opts.model_name}_add'),
+            reverse(f'admin:{opts.app_label}_{opts.model_name}_change', args=[obj.pk]),
+        )
+
+    def test_tenant_admin(self):
+        assignment = BusinessUnitUser.objects.filter(
+            business_unit__customer=self.customer
+        ).first()
+        for model, obj in (
+            (Customer, assignment.business_unit.customer),
+            (BusinessUnit, assignment.business_unit),
+            (BusinessUnitUser, assignment),
+        ):
+            for url in self.admin_urls(model, obj):
+                with self.subTest(url=url):
+                    self.assertConstantQueries(self.superuser, url)
+
+    def test_business_unit_admin(self):
+        for model in (Income, Expenses, Supplier):
+            obj = model.objects.filter(business_unit__customer=self.customer).first()
+            for user in (self.superuser, self.operator):
+                for url in self.admin_urls(model, obj):
+                    with self.subTest(url=url, user=user.username):
+                        self.assertConstantQueries(user, url)
+
+    def test_business_unit_choices(self):
+        """
+        Las opciones de unidad de negocio se arman con una sola consulta
+        """
+        customer = self.add_rows(5)
+        with self.assertNumQueries(1):
+            labels = [str(business_unit) for business_unit in BusinessUnit.objects.all()]
+        self.assertIn(f'{customer.name} - Unidad 4', labels)
+
+
+class AdminFilterCacheTests(TestCase):
+    """
+    Los filtros por unidad de negocio y la jerarquía de fechas se calculan
+    una vez por conjunto de unidades y se invalidan al cambiar los datos
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = User.objects.create_user(
+            'filters-operator', 'filters-operator@example.com', 'x',
+            is_staff=True
+        )
+        cls.operator.user_permissions.set(Permission.objects.filter(
+            content_type__app_label='incomes'
+        ))
+        customer = Customer.objects.create(name='Filtros', email='filtros@example.com')
+        cls.own_unit = BusinessUnit.objects.create(customer=customer, name='Propia')
+        cls.other_unit = BusinessUnit.objects.create(customer=customer, name='Ajena')
+        BusinessUnitUser.objects.create(user=cls.operator, business_unit=cls.own_unit)
+        Income.objects.create(
+            business_unit=cls.own_unit,
+            order_number='F-1',
+            date=date(2025, 3, 1),
+            shipping_cost=Decimal('10')
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.operator)
+        self.url = reverse('admin:incomes_income_changelist')
+
+    def business_unit_choices(self, response):
+        spec = next(
+            spec for spec in response.context['cl'].filter_specs
+            if spec.field_path == 'business_unit'
+        )
+        return [pk for pk, label in spec.lookup_choices]
+
+    def test_only_own_units(self):
+        response = self.client.get(self.url)
+        self.assertEqual(self.business_unit_choices(response), [self.own_unit.pk])
+
+    def test_cached_until_data_changes(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as warm:
+            self.client.get(self.url)
+        self.assertLess(len(warm), len(cold))
+
+        unit = BusinessUnit.objects.create(customer=self.own_unit.customer, name='Nueva')
+        BusinessUnitUser.objects.create(user=self.operator, business_unit=unit)
+        response = self.client.get(self.url)
+        self.assertIn(unit.pk, self.business_unit_choices(response))
+
+
+class AuthCacheTests(TestCase):
+    """
+    Los permisos en caché se invalidan al cambiar asignaciones o grupos.
+    Solo se guardan con una caché compartida entre workers; aquí una en
+    archivos
+    """
+
+    def setUp(self):
+        self.enterContext(override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': self.enterContext(tempfile.TemporaryDirectory()),
+            }
+        }))
+        self.user = User.objects.create_user('cached-perms', 'cached-perms@example.com', 'x')
+        self.permission = Permission.objects.get(codename='view_income')
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_user_permission_changes(self):
+        self.assertFalse(self.fresh_user().has_perm('incomes.view_income'))
+        self.user.user_permissions.add(self.permission)
+        self.assertTrue(self.fresh_user().has_perm('incomes.view_income'))
+
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('incomes.view_income'))
+
+        self.user.user_permissions.remove(self.permission)
+        self.assertFalse(self.fresh_user().has_perm('incomes.view_income'))
+
+    def test_disabled_with_local_cache(self):
+        self.user.user_permissions.add(self.permission)
+        with override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        }):
+            self.assertTrue(self.fresh_user().has_perm('incomes.view_income'))
+            user = self.fresh_user()
+            # Permisos del usuario y de sus grupos, sin pasar por la caché
+            with self.assertNumQueries(2):
+                self.assertTrue(user.has_perm('incomes.view_income'))
+
+    def test_group_permission_changes(self):
+        group = Group.objects.create(name='Consultas')
+        self.user.groups.add(group)
+        self.assertFalse(self.fresh_user().has_perm('incomes.view_income'))
+        group.permissions.add(self.permission)
+        self.assertTrue(self.fresh_user().has_perm('incomes.view_income'))
+
+    def test_demoted_superuser(self):
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertIn('incomes.view_income', self.fresh_user().get_all_permissions())
+
+        self.user.is_superuser = False
+        self.user.save()
+        self.assertNotIn('incomes.view_income', self.fresh_user().get_all_permissions())
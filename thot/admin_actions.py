@@ -0,0 +1,204 @@
+"""
+Acciones de admin compartidas entre aplicaciones
+"""
+from django.contrib import messages
+from django.contrib.admin import helpers
+from django.contrib.admin.models import DELETION, LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.template.response import TemplateResponse
+
+from .bulk import iter_pk_chunks
+from .cache import bump_tenant_version
+
+
+def log_bulk_action(request, model, action_flag, count, message):
+    """
+    Registra una operación masiva como una única entrada del historial del
+    admin por lote, en lugar de una por registro. Como los UPDATE y DELETE
+    por lote no emiten señales, invalida además los ETag de todas las
+    unidades de negocio
+    """
+    bump_tenant_version(model)
+    opts = model._meta
+    LogEntry.objects.create(
+        user_id=request.user.pk,
+        content_type_id=ContentType.objects.get_for_model(model).pk,
+        object_id=None,
+        object_repr=f'{count} {opts.verbose_name_plural}'[:200],
+        action_flag=action_flag,
+        change_message=message,
+    )
+
+
+def soft_delete_selected(modeladmin, request, queryset):
+    """
+    Elimina lógicamente los registros seleccionados con un UPDATE por lote.
+    El ModelAdmin puede definir soft_delete_chunk(pks) para hacer más
+    trabajo en la misma transacción del lote
+    """
+    model = queryset.model
+    soft_delete_chunk = getattr(
+        modeladmin, 'soft_delete_chunk',
+        lambda pks: model.all_objects.filter(pk__in=pks).soft_delete()
+    )
+    count = 0
+    for pks in iter_pk_chunks(queryset.alive()):
+        with transaction.atomic():
+            deleted = soft_delete_chunk(pks)
+            log_bulk_action(
+                request, model, DELETION, deleted,
+                f'Eliminación lógica de {deleted} registro(s): '
+                f'IDs {pks[0]}-{pks[-1]}'
+            )
+        count += deleted
+
+    modeladmin.message_user(
+        request,
+        f'{count} registro(s) eliminados.',
+        messages.SUCCESS
+    )
+
+
+soft_delete_selected.short_description = 'Eliminar seleccionados (conservando historial)'
+soft_delete_selected.allowed_permissions = ('delete',)
+
+
+def _delete_chunk(model, pks):
+    """
+    Borra un lote de IDs con DELETE ... WHERE id = ANY(%s), resolviendo antes
+    en la misma transacción las relaciones que resolvería el Collector de
+    Django: las filas con on_delete=CASCADE se borran (con sus propias
+    dependientes) y las SET_NULL o SET_DEFAULT se actualizan. PROTECT,
+    RESTRICT y DO_NOTHING los valida la restricción de la base
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for related in get_candidate_relations_to_delete(model._meta):
+            child = related.related_model
+            table = quote(child._meta.db_table)
+            column = quote(related.field.column)
+            if related.on_delete is models.CASCADE:
+                cursor.execute(
+                    f'SELECT {quote(child._meta.pk.column)} FROM {table} '
+                    f'WHERE {column} = ANY(%s)',
+                    [pks]
+                )
+                child_pks = [row[0] for row in cursor.fetchall()]
+                if child_pks:
+                    _delete_chunk(child, child_pks)
+            elif related.on_delete in (models.SET_NULL, models.SET_DEFAULT):
+                value = (
+                    None if related.on_delete is models.SET_NULL
+                    else related.field.get_db_prep_save(
+                        related.field.get_default(), connection
+                    )
+                )
+                cursor.execute(
+                    f'UPDATE {table} SET {column} = %s WHERE {column} = ANY(%s)',
+                    [value, pks]
+                )
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} '
+            f'WHERE {quote(model._meta.pk.column)} = ANY(%s)',
+            [pks]
+        )
+        return cursor.rowcount
+
+
+def _cascaded_models(model):
+    """
+    Modelos cuyas filas se borran junto con las de model
+    """
+    for related in get_candidate_relations_to_delete(model._meta):
+        if related.on_delete is models.CASCADE:
+            yield related.related_model
+            yield from _cascaded_models(related.related_model)
+
+
+def fast_delete_selected(modeladmin, request, queryset):
+    """
+    Reemplazo de delete_selected para selecciones grandes: la confirmación
+    muestra solo cantidades y el borrado se hace en lotes cortos, sin
+    recorrer las relaciones fila por fila. Cada lote lo borra
+    modeladmin.fast_delete_chunk(pks) (ver FastDeleteMixin)
+    """
+    model = queryset.model
+    opts = model._meta
+    fast_delete_chunk = getattr(
+        modeladmin, 'fast_delete_chunk', lambda pks: _delete_chunk(model, pks)
+    )
+
+    if not request.POST.get('post'):
+        by_business_unit = (
+            queryset.order_by()
+            .values('business_unit__name')
+            .annotate(count=Count('pk'))
+            .order_by('business_unit__name')
+        )
+        return TemplateResponse(request, 'admin/fast_delete_confirmation.html', {
+            **modeladmin.admin_site.each_context(request),
+            'title': 'Eliminar definitivamente',
+            'opts': opts,
+            'queryset_count': queryset.count(),
+            'by_business_unit': by_business_unit,
+            'related_models': list(dict.fromkeys(
+                related_model._meta.verbose_name_plural
+                for related_model in _cascaded_models(model)
+            )),
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action': request.POST.get('action'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
+    count = 0
+    try:
+        for pks in iter_pk_chunks(queryset):
+            with transaction.atomic():
+                deleted = fast_delete_chunk(pks)
+                log_bulk_action(
+                    request, model, DELETION, deleted,
+                    f'Eliminación definitiva de {deleted} registro(s): '
+                    f'IDs {pks[0]}-{pks[-1]}'
+                )
+            count += deleted
+    except IntegrityError:
+        modeladmin.message_user(
+            request,
+            f'Se eliminaron {count} registro(s). El resto tiene registros '
+            f'relacionados que impiden eliminarlos.',
+            messages.ERROR
+        )
+        return None
+
+    modeladmin.message_user(
+        request,
+        f'{count} registro(s) eliminados definitivamente.',
+        messages.SUCCESS
+    )
+    return None
+
+
+fast_delete_selected.short_description = 'Eliminar definitivamente seleccionados'
+fast_delete_selected.allowed_permissions = ('delete',)
+
+
+class FastDeleteMixin:
+    """
+    Reemplaza delete_selected por fast_delete_selected en el ModelAdmin
+    """
+
+    def fast_delete_chunk(self, pks):
+        """
+        Borra un lote de IDs dentro de la transacción del lote. Retorna la
+        cantidad de filas borradas
+        """
+        return _delete_chunk(self.model, pks)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
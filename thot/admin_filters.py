@@ -0,0 +1,89 @@
+"""
+Metadatos de las listas del admin guardados en caché: las opciones de los
+filtros por relación y la jerarquía de fechas se calculan una vez por
+conjunto de unidades de negocio y se invalidan con las versiones de datos
+de thot.cache
+"""
+import hashlib
+
+from django.contrib import admin
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.utils import translation
+
+from tenant.models import BusinessUnit, Customer
+
+from .cache import business_unit_scope, get_data_version
+
+# Los cambios que no emiten señales (UPDATE por lote, triggers) tardan a
+# lo sumo esto en verse en los filtros
+FILTER_CACHE_TIMEOUT = 300
+
+
+class CachedRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """
+    Filtro por relación con las opciones en caché. Los usuarios que no son
+    superusuarios ven solo sus unidades de negocio y las empresas de esas
+    unidades
+    """
+
+    def field_choices(self, field, request, model_admin):
+        related_model = field.remote_field.model
+        key = 'list-filter:{}:{}:{}:{}:{}'.format(
+            related_model._meta.label_lower,
+            get_data_version(related_model),
+            get_data_version(BusinessUnit),
+            field.model._meta.label_lower,
+            business_unit_scope(request)
+        )
+        choices = cache.get(key)
+        if choices is None:
+            choices = field.get_choices(
+                include_blank=False,
+                limit_choices_to=self.scope_choices(related_model, request),
+                ordering=self.field_admin_ordering(field, request, model_admin)
+            )
+            cache.set(key, choices, FILTER_CACHE_TIMEOUT)
+        return choices
+
+    def scope_choices(self, related_model, request):
+        if request.user.is_superuser:
+            return None
+        if related_model is BusinessUnit:
+            return {'id__in': request.user_business_units}
+        if related_model is Customer:
+            return {'id__in': BusinessUnit.objects.filter(
+                id__in=request.user_business_units
+            ).values('customer_id')}
+        return None
+
+
+def cached_date_hierarchy(cl):
+    """
+    Contexto de date_hierarchy (MIN/MAX y meses o días con filas) en
+    caché. La clave incluye la consulta de la lista, que ya tiene los
+    filtros y las unidades del usuario, y la versión de datos del modelo
+    """
+    if not cl.date_hierarchy:
+        return date_hierarchy(cl)
+    try:
+        sql, params = cl.queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return date_hierarchy(cl)
+
+    raw = '|'.join((
+        sql % tuple(repr(param) for param in params),
+        cl.get_query_string(),
+        translation.get_language() or '',
+    ))
+    key = 'date-hierarchy:{}:{}:{}'.format(
+        cl.model._meta.label_lower,
+        get_data_version(cl.model),
+        hashlib.sha1(raw.encode()).hexdigest()
+    )
+    context = cache.get(key)
+    if context is None:
+        context = date_hierarchy(cl)
+        cache.set(key, context, FILTER_CACHE_TIMEOUT)
+    return context
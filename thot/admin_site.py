@@ -0,0 +1,134 @@
+"""
+Sitio de administración del proyecto: el autocompletado de los campos
+autocomplete_fields filtra por las unidades de negocio del usuario y
+guarda los resultados en caché
+"""
+import hashlib
+
+from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+
+from tenant.models import BusinessUnit
+
+from .admin_filters import CachedRelatedFieldListFilter
+from .cache import business_unit_scope, get_data_version
+from .conditional import ConditionalChangelistMixin
+
+# Los cambios que no emiten señales (UPDATE por lote) tardan a lo sumo
+# esto en verse en el autocompletado
+AUTOCOMPLETE_CACHE_TIMEOUT = 60
+
+
+class TenantAutocompleteJsonView(AutocompleteJsonView):
+    """
+    Autocompletado limitado a las unidades de negocio del usuario. Alcanza
+    con poder cargar o editar el modelo del formulario: quien carga un
+    gasto elige entre sus unidades sin necesitar permisos sobre la tabla
+    de unidades de negocio
+    """
+
+    def get(self, request, *args, **kwargs):
+        (
+            self.term, self.model_admin, self.source_field, to_field_name
+        ) = self.process_request(request)
+
+        if not self.has_perm(request):
+            raise PermissionDenied
+
+        key = self.get_cache_key(request, to_field_name)
+        data = cache.get(key)
+        if data is None:
+            self.object_list = self.get_queryset()
+            context = self.get_context_data()
+            data = {
+                'results': [
+                    self.serialize_result(obj, to_field_name)
+                    for obj in context['object_list']
+                ],
+                'pagination': {'more': context['page_obj'].has_next()},
+            }
+            cache.set(key, data, AUTOCOMPLETE_CACHE_TIMEOUT)
+        return JsonResponse(data)
+
+    def get_cache_key(self, request, to_field_name):
+        source = self.source_field.model._meta
+        raw = '|'.join((
+            source.label_lower,
+            self.source_field.name,
+            to_field_name,
+            business_unit_scope(request),
+            request.GET.get(self.page_kwarg, '1'),
+            self.term,
+        ))
+        return 'autocomplete:{}:{}:{}'.format(
+            self.model_admin.opts.label_lower,
+            get_data_version(self.model_admin.model),
+            hashlib.sha1(raw.encode()).hexdigest()
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.user.is_superuser:
+            return queryset
+
+        units = self.request.user_business_units
+        if self.model_admin.model is BusinessUnit:
+            return queryset.filter(id__in=units)
+        field_names = {field.name for field in self.model_admin.opts.get_fields()}
+        if 'business_unit' in field_names:
+            return queryset.filter(business_unit_id__in=units)
+        return queryset
+
+    def has_perm(self, request, obj=None):
+        if super().has_perm(request, obj):
+            return True
+        source_admin = self.admin_site._registry.get(self.source_field.model)
+        return source_admin is not None and (
+            source_admin.has_add_permission(request) or
+            source_admin.has_change_permission(request)
+        )
+
+
+class ThotAdminSite(admin.AdminSite):
+
+    def autocomplete_view(self, request):
+        return TenantAutocompleteJsonView.as_view(admin_site=self)(request)
+
+    def cached_models(self):
+        """
+        Modelos con datos en caché en el admin: los que se eligen por
+        autocompletado, los de filtros CachedRelatedFieldListFilter y los
+        que tienen jerarquía de fechas, más los que se muestran en las listas
+        con GET condicional
+        """
+        models = set()
+        for model, model_admin in self._registry.items():
+            opts = model._meta
+            models.update(
+                opts.get_field(name).remote_field.model
+                for name in model_admin.autocomplete_fields
+            )
+            models.update(
+                get_fields_from_path(model, list_filter[0])[-1].remote_field.model
+                for list_filter in model_admin.list_filter
+                if isinstance(list_filter, (list, tuple)) and
+                issubclass(list_filter[1], CachedRelatedFieldListFilter)
+            )
+            if model_admin.date_hierarchy:
+                models.add(model)
+            models.update(getattr(model_admin, 'conditional_related_models', ()))
+        return models
+
+    def conditional_models(self):
+        """
+        Modelos cuyo changelist responde GET condicionales: su versión por
+        unidad de negocio arma el ETag
+        """
+        return {
+            model for model, model_admin in self._registry.items()
+            if isinstance(model_admin, ConditionalChangelistMixin)
+        }
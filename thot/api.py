@@ -0,0 +1,351 @@
+"""
+Utilidades compartidas por la API REST: selección de campos y filtrado por
+unidad de negocio
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import serializers, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from tenant.models import BusinessUnit, BusinessUnitUser
+
+from .changes import (
+    changes_since, deleted_since, merge_changes, serialize_changes, watermark
+)
+from .cache import tracks_tenant_version
+from .conditional import (
+    conditional_get_enabled, not_modified, set_validators, tenant_validators
+)
+
+
+def get_user_business_unit_ids(user):
+    """
+    Retorna los IDs de las unidades de negocio asignadas al usuario
+    """
+    return list(
+        BusinessUnitUser.objects.filter(
+            user=user
+        ).values_list('business_unit_id', flat=True)
+    )
+
+
+async def aget_user_business_unit_ids(user):
+    return [
+        business_unit_id async for business_unit_id in
+        BusinessUnitUser.objects.filter(
+            user=user
+        ).values_list('business_unit_id', flat=True)
+    ]
+
+
+def get_api_user(request):
+    """
+    Usuario de una vista fuera de DRF: sesión del admin o token JWT
+    """
+    if request.user.is_authenticated:
+        return request.user
+
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+async def aget_api_user(request):
+    """
+    Usuario de una vista async: sesión del admin o token JWT
+    """
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def async_api_view(permission):
+    """
+    Decorador para vistas async de la API: autentica, verifica el permiso
+    y deja el usuario en request.api_user
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            user = await aget_api_user(request)
+            if user is None:
+                return JsonResponse(
+                    {'detail': 'Credenciales no provistas o inválidas.'},
+                    status=401
+                )
+            if not await user.ahas_perm(permission):
+                return JsonResponse(
+                    {'detail': 'No tiene permiso para realizar esta acción.'},
+                    status=403
+                )
+
+            request.api_user = user
+            try:
+                return await view(request, *args, **kwargs)
+            except DjangoValidationError as exc:
+                return JsonResponse({'detail': exc.messages}, status=400)
+        return wrapper
+    return decorator
+
+
+def conditional_api_view(model, related_models=()):
+    """
+    Decorador para vistas async de la API (debajo de async_api_view):
+    responde 304 si no cambió nada de model en las unidades del usuario
+    desde el ETag o Last-Modified que envía el cliente
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not conditional_get_enabled():
+                return await view(request, *args, **kwargs)
+            user = request.api_user
+            business_unit_ids = (
+                None if user.is_superuser
+                else await aget_user_business_unit_ids(user)
+            )
+            etag, last_modified = await sync_to_async(tenant_validators)(
+                request, user, business_unit_ids, model, related_models
+            )
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+            return set_validators(
+                await view(request, *args, **kwargs), etag, last_modified
+            )
+        return wrapper
+    return decorator
+
+
+async def ascope_queryset(queryset, user):
+    """
+    Limita el queryset a las unidades de negocio del usuario
+    """
+    if user.is_superuser:
+        return queryset
+    return queryset.filter(
+        business_unit_id__in=await aget_user_business_unit_ids(user)
+    )
+
+
+def filter_stats_queryset(queryset, request):
+    """
+    Aplica los filtros ?business_unit=, ?date_from= y ?date_to=
+    """
+    business_unit = request.GET.get('business_unit')
+    if business_unit:
+        if not business_unit.isdigit():
+            raise DjangoValidationError('business_unit debe ser un número.')
+        queryset = queryset.filter(business_unit_id=int(business_unit))
+
+    for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+        value = request.GET.get(param)
+        if not value:
+            continue
+        try:
+            date = parse_date(value)
+        except ValueError:
+            date = None
+        if date is None:
+            raise DjangoValidationError(f'{param} debe tener formato AAAA-MM-DD.')
+        queryset = queryset.filter(**{lookup: date})
+
+    return queryset
+
+
+def _int_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: 'Debe ser un número entero.'})
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    Serializer que permite limitar los campos devueltos con ?fields=a,b,c
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+
+        fields = request.query_params.get('fields')
+        if not fields:
+            return
+
+        allowed = {name.strip() for name in fields.split(',') if name.strip()}
+        for name in set(self.fields) - allowed:
+            self.fields.pop(name)
+
+
+class BusinessUnitScopedSerializer(DynamicFieldsModelSerializer):
+    """
+    Serializer que restringe el campo business_unit a las unidades del usuario
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get('request')
+        field = self.fields.get('business_unit')
+        if (
+            request is None or
+            not isinstance(field, serializers.RelatedField) or
+            request.user.is_superuser
+        ):
+            return
+
+        field.queryset = BusinessUnit.objects.filter(
+            id__in=get_user_business_unit_ids(request.user)
+        )
+
+    def validate_business_unit(self, value):
+        request = self.context.get('request')
+        if value is None and request and not request.user.is_superuser:
+            raise serializers.ValidationError(
+                'Debe indicar una unidad de negocio.'
+            )
+        return value
+
+
+class BusinessUnitScopedViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet que limita los registros a las unidades de negocio del usuario.
+    El queryset debe usar all_objects para que el feed incluya las bajas.
+    Las relaciones a precargar se indican en select_related_fields y
+    prefetch_related_fields.
+
+    Expone además /changes/ con las filas modificadas desde una marca de
+    agua, y elimina lógicamente (deleted_at) para que el feed informe las
+    bajas.
+
+    Si el modelo lleva versión por unidad de negocio (track_tenant_version),
+    el listado responde GET condicionales: si nada cambió en las unidades
+    del usuario ni en conditional_related_models, devuelve 304.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    conditional_related_models = ()
+    changes_max_limit = 1000
+
+    def get_business_unit_ids(self):
+        """
+        Unidades del usuario, o None si es superusuario
+        """
+        if self.request.user.is_superuser:
+            return None
+        if not hasattr(self, '_business_unit_ids'):
+            self._business_unit_ids = get_user_business_unit_ids(self.request.user)
+        return self._business_unit_ids
+
+    def get_scoped_queryset(self):
+        queryset = super().get_queryset().select_related(
+            *self.select_related_fields
+        ).prefetch_related(*self.prefetch_related_fields)
+
+        business_unit_ids = self.get_business_unit_ids()
+        if business_unit_ids is None:
+            return queryset
+
+        return queryset.filter(business_unit_id__in=business_unit_ids)
+
+    def get_queryset(self):
+        return self.get_scoped_queryset().alive()
+
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+
+    def list(self, request, *args, **kwargs):
+        if (
+            not conditional_get_enabled() or
+            not tracks_tenant_version(self.queryset.model)
+        ):
+            return super().list(request, *args, **kwargs)
+
+        etag, last_modified = tenant_validators(
+            request,
+            request.user,
+            self.get_business_unit_ids(),
+            self.queryset.model,
+            self.conditional_related_models
+        )
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(
+            super().list(request, *args, **kwargs), etag, last_modified
+        )
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Filas modificadas desde ?since=<ISO 8601>&after_id=<id>, en orden
+        (updated_at, id), incluidos los borrados físicos. Se puede acotar a
+        una unidad con ?business_unit=
+        """
+        since = request.query_params.get('since') or None
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                raise ValidationError({'since': 'Fecha ISO 8601 inválida.'})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        after_id = _int_param(request, 'after_id')
+        business_unit = _int_param(request, 'business_unit')
+        limit = _int_param(request, 'limit')
+        if limit is not None and limit < 1:
+            raise ValidationError({'limit': 'Debe ser mayor a cero.'})
+        limit = min(limit or self.changes_max_limit, self.changes_max_limit)
+
+        queryset = self.get_scoped_queryset()
+        deleted = deleted_since(self.queryset.model, since, after_id)
+        business_unit_ids = self.get_business_unit_ids()
+        if business_unit_ids is not None:
+            deleted = deleted.filter(business_unit_id__in=business_unit_ids)
+        if business_unit is not None:
+            queryset = queryset.filter(business_unit_id=business_unit)
+            deleted = deleted.filter(business_unit_id=business_unit)
+
+        rows = merge_changes(
+            changes_since(queryset, since, after_id)[:limit + 1],
+            deleted[:limit + 1],
+            limit + 1
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return Response({
+            'results': serialize_changes(
+                rows,
+                self.get_serializer_class(),
+                self.get_serializer_context()
+            ),
+            'has_more': has_more,
+            'next': watermark(rows[-1]) if rows else {
+                'since': since.isoformat() if since else None,
+                'after_id': after_id,
+            },
+        })
@@ -0,0 +1,21 @@
+from django.contrib.admin.apps import AdminConfig
+
+
+class ThotAdminConfig(AdminConfig):
+    default_site = 'thot.admin_site.ThotAdminSite'
+
+    def ready(self):
+        super().ready()
+
+        from django.contrib import admin
+
+        from .auth import track_auth_changes
+        from .cache import track_data_version, track_tenant_version
+
+        # El autocompletado, los filtros y la jerarquía de fechas se
+        # invalidan cuando cambian los modelos que muestran
+        track_data_version(*admin.site.cached_models())
+        # ETag de las listas con GET condicional, por unidad de negocio
+        track_tenant_version(*admin.site.conditional_models())
+        # Usuarios y permisos en caché (thot.auth.CachedModelBackend)
+        track_auth_changes()
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'thot.settings')
 
 application = get_asgi_application()
+
+# Precarga antes del fork de los workers (THOT_WARMUP=0 la desactiva)
+from thot.warmup import warm_up  # noqa: E402
+
+warm_up()
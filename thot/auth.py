@@ -0,0 +1,91 @@
+"""
+Backend de autenticación con caché entre requests: el usuario de la sesión
+y sus permisos se leen de la caché en lugar de consultarse en cada página
+del admin. Solo con una caché compartida entre workers (la misma condición
+que el GET condicional): con una local por proceso, un worker seguiría
+viendo un usuario desactivado o sus permisos quitados en otro
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .cache import bump_data_version, get_data_version, track_data_version
+from .conditional import conditional_get_enabled
+
+# Resguardo por si un cambio no sube la versión (p. ej. un UPDATE en bloque)
+AUTH_CACHE_TIMEOUT = 60
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend que guarda en caché el usuario por id y sus permisos por
+    usuario, versión de permisos y versión de usuarios. Cualquier cambio en
+    grupos, permisos, asignaciones o usuarios sube una de las versiones e
+    invalida los permisos de todos
+    """
+
+    def get_user(self, user_id):
+        if not conditional_get_enabled():
+            return super().get_user(user_id)
+
+        UserModel = get_user_model()
+        key = f'auth-user:{user_id}:{get_data_version(UserModel)}'
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, AUTH_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not conditional_get_enabled():
+            return super().get_all_permissions(user_obj)
+        if not hasattr(user_obj, '_perm_cache'):
+            # La versión de usuarios cubre los cambios del propio usuario,
+            # como quitarle is_superuser
+            key = (
+                f'auth-permissions:{user_obj.pk}:{get_data_version(Permission)}:'
+                f'{get_data_version(get_user_model())}'
+            )
+            permissions = cache.get(key)
+            if permissions is None:
+                permissions = super().get_all_permissions(user_obj)
+                cache.set(key, permissions, AUTH_CACHE_TIMEOUT)
+            user_obj._perm_cache = permissions
+        return user_obj._perm_cache
+
+
+def _bump_permissions(**kwargs):
+    bump_data_version(Permission)
+
+
+def track_auth_changes():
+    """
+    Invalida la caché de usuarios al guardarlos y la de permisos al
+    cambiar grupos, permisos o las asignaciones de unos y otros
+    """
+    User = get_user_model()
+    track_data_version(User)
+    for sender in (
+        User.groups.through,
+        User.user_permissions.through,
+        Group.permissions.through,
+    ):
+        m2m_changed.connect(
+            _bump_permissions, sender=sender,
+            dispatch_uid=f'auth-permissions:{sender._meta.label_lower}'
+        )
+    for model in (Group, Permission):
+        post_save.connect(
+            _bump_permissions, sender=model,
+            dispatch_uid=f'auth-permissions:{model._meta.label_lower}:save'
+        )
+        post_delete.connect(
+            _bump_permissions, sender=model,
+            dispatch_uid=f'auth-permissions:{model._meta.label_lower}:delete'
+        )
@@ -0,0 +1,23 @@
+"""
+Utilidades para operaciones masivas en lotes cortos
+"""
+
+BULK_CHUNK_SIZE = 2000
+
+
+def iter_pk_chunks(queryset, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Recorre los IDs del queryset en lotes ordenados por pk. Avanza por
+    pk > último visto, así que funciona aunque el lote anterior haya
+    modificado las filas que usa el filtro
+    """
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(chunk[:chunk_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
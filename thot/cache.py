@@ -0,0 +1,169 @@
+"""
+Versiones de datos para invalidar cachés: cada modelo seguido tiene un
+número que sube al guardar o borrar una fila, y las claves de caché lo
+incluyen. Los UPDATE por lote no emiten señales, así que las entradas
+también deben vencer solas
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+
+
+def _version_key(model):
+    return f'data-version:{model._meta.label_lower}'
+
+
+def get_data_version(model):
+    """
+    Versión actual de los datos de model
+    """
+    return cache.get_or_set(_version_key(model), 1, None)
+
+
+def bump_data_version(model):
+    """
+    Invalida las entradas armadas con la versión anterior de model
+    """
+    try:
+        cache.incr(_version_key(model))
+    except ValueError:
+        cache.set(_version_key(model), 2, None)
+
+
+def business_unit_scope(request):
+    """
+    Parte de la clave de caché que identifica las unidades de negocio que
+    ve el usuario: 'all' para superusuarios
+    """
+    return business_unit_ids_scope(
+        None if request.user.is_superuser else request.user_business_units
+    )
+
+
+def business_unit_ids_scope(business_unit_ids):
+    """
+    Como business_unit_scope, a partir de las unidades ya resueltas (None
+    para todas), para las vistas que no usan request.user
+    """
+    if business_unit_ids is None:
+        return 'all'
+    return ','.join(str(pk) for pk in sorted(business_unit_ids))
+
+
+def _bump_on_change(sender, **kwargs):
+    bump_data_version(sender)
+
+
+def track_data_version(*models):
+    """
+    Sube la versión de cada modelo cuando se guarda o borra una fila
+    """
+    for model in models:
+        post_save.connect(
+            _bump_on_change, sender=model, dispatch_uid=f'{_version_key(model)}:save'
+        )
+        post_delete.connect(
+            _bump_on_change, sender=model, dispatch_uid=f'{_version_key(model)}:delete'
+        )
+
+
+# Versiones por unidad de negocio para los validadores HTTP (ETag y
+# Last-Modified). Guardan el instante del último cambio en nanosegundos: si
+# una entrada se pierde vuelve a crearse con la hora actual, así que nunca
+# se repite un valor ya entregado a un cliente.
+# tenant-version:<modelo>:bu:<id>  cambios en una unidad
+# tenant-version:<modelo>:all      cambios en cualquier unidad
+# tenant-version:<modelo>:epoch    cambios masivos, invalida todas
+
+_tenant_models = set()
+
+
+def _tenant_key(model, suffix):
+    return f'tenant-version:{model._meta.label_lower}:{suffix}'
+
+
+def get_tenant_version(model, business_unit_ids=None):
+    """
+    Instante (ns desde epoch) del último cambio de model en las unidades
+    indicadas, o en cualquiera si business_unit_ids es None
+    """
+    if business_unit_ids is None:
+        suffixes = ['epoch', 'all']
+    else:
+        suffixes = ['epoch', *(f'bu:{pk}' for pk in business_unit_ids)]
+
+    keys = [_tenant_key(model, suffix) for suffix in suffixes]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, settings.TENANT_VERSION_TIMEOUT)
+        versions.update(missing)
+    return max(versions.values())
+
+
+def bump_tenant_version(model, business_unit_ids=None):
+    """
+    Marca como modificadas las unidades indicadas, o todas si
+    business_unit_ids es None. Se aplica al confirmar la transacción para
+    que nadie lea la versión nueva junto con los datos viejos
+    """
+    if business_unit_ids is None:
+        suffixes = ['epoch']
+    else:
+        suffixes = ['all', *(f'bu:{pk}' for pk in business_unit_ids)]
+
+    def bump():
+        now = time.time_ns()
+        cache.set_many(
+            {_tenant_key(model, suffix): now for suffix in suffixes},
+            settings.TENANT_VERSION_TIMEOUT
+        )
+
+    transaction.on_commit(bump)
+
+
+def _remember_business_unit(sender, instance, **kwargs):
+    # Sin cargar el campo si vino diferido
+    instance._tenant_business_unit_id = instance.__dict__.get('business_unit_id')
+
+
+def _bump_tenant_on_change(sender, instance, **kwargs):
+    # Si la fila cambió de unidad, también cambió la lista de la anterior
+    business_unit_ids = {
+        instance.business_unit_id,
+        getattr(instance, '_tenant_business_unit_id', None),
+    }
+    bump_tenant_version(sender, business_unit_ids - {None})
+    instance._tenant_business_unit_id = instance.business_unit_id
+
+
+def track_tenant_version(*models):
+    """
+    Sube la versión de la unidad de negocio de cada fila guardada o borrada,
+    y la de la unidad que tenía al cargarse si se movió. Quien actualice en
+    bloque debe llamar a bump_tenant_version
+    """
+    for model in models:
+        _tenant_models.add(model)
+        post_init.connect(
+            _remember_business_unit, sender=model,
+            dispatch_uid=_tenant_key(model, 'init')
+        )
+        post_save.connect(
+            _bump_tenant_on_change, sender=model,
+            dispatch_uid=_tenant_key(model, 'save')
+        )
+        post_delete.connect(
+            _bump_tenant_on_change, sender=model,
+            dispatch_uid=_tenant_key(model, 'delete')
+        )
+
+
+def tracks_tenant_version(model):
+    """
+    Indica si las escrituras de model suben su versión por unidad de negocio
+    """
+    return model in _tenant_models
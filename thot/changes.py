@@ -0,0 +1,113 @@
+"""
+Feed de cambios basado en updated_at para sincronización incremental.
+
+Los registros se recorren en orden (updated_at, id) a partir de una marca de
+agua; los eliminados lógicamente (deleted_at) y los borrados físicamente
+(DeletedRecord) se informan como tombstones.
+"""
+import heapq
+from datetime import timedelta
+from itertools import islice
+
+from django.db.models import Q
+from django.utils import timezone
+
+from tenant.models import DeletedRecord
+
+# Margen para no entregar filas de transacciones que todavía pueden estar
+# en curso con un updated_at anterior al de filas ya confirmadas
+CHANGE_FEED_LAG = timedelta(seconds=10)
+
+
+def changes_since(queryset, since=None, after_id=None):
+    """
+    Filtra y ordena el queryset para retornar las filas modificadas después
+    de la marca de agua (since, after_id)
+    """
+    queryset = queryset.filter(
+        updated_at__lte=timezone.now() - CHANGE_FEED_LAG
+    )
+
+    if since is not None:
+        condition = Q(updated_at__gt=since)
+        if after_id is not None:
+            condition |= Q(updated_at=since, id__gt=after_id)
+        queryset = queryset.filter(condition)
+
+    return queryset.order_by('updated_at', 'id')
+
+
+def deleted_since(model, since=None, after_id=None):
+    """
+    Borrados físicos del modelo después de la marca de agua, en orden
+    (deleted_at, object_id)
+    """
+    queryset = DeletedRecord.objects.filter(
+        model=model._meta.label_lower,
+        deleted_at__lte=timezone.now() - CHANGE_FEED_LAG
+    )
+
+    if since is not None:
+        condition = Q(deleted_at__gt=since)
+        if after_id is not None:
+            condition |= Q(deleted_at=since, object_id__gt=after_id)
+        queryset = queryset.filter(condition)
+
+    return queryset.order_by('deleted_at', 'object_id')
+
+
+def position(row):
+    """
+    Posición de la fila en el feed: (updated_at, id), o (deleted_at,
+    object_id) para los borrados físicos
+    """
+    if isinstance(row, DeletedRecord):
+        return row.deleted_at, row.object_id
+    return row.updated_at, row.pk
+
+
+def merge_changes(rows, deleted, limit):
+    """
+    Intercala, sin reordenar en memoria, las filas de changes_since y los
+    borrados de deleted_since, y retorna las primeras limit
+    """
+    return list(islice(heapq.merge(rows, deleted, key=position), limit))
+
+
+def serialize_changes(rows, serializer_class, context):
+    """
+    Serializa las filas del feed: tombstone para las eliminadas y la
+    representación completa del serializer para el resto
+    """
+    live = iter(serializer_class(
+        [row for row in rows if _is_live(row)],
+        many=True,
+        context=context
+    ).data)
+
+    return [
+        next(live) if _is_live(row) else _tombstone(row)
+        for row in rows
+    ]
+
+
+def _is_live(row):
+    return not isinstance(row, DeletedRecord) and row.deleted_at is None
+
+
+def _tombstone(row):
+    updated_at, pk = position(row)
+    return {
+        'id': pk,
+        'deleted': True,
+        'deleted_at': row.deleted_at.isoformat(),
+        'updated_at': updated_at.isoformat(),
+    }
+
+
+def watermark(obj):
+    """
+    Marca de agua a usar como punto de partida del siguiente pedido
+    """
+    updated_at, pk = position(obj)
+    return {'since': updated_at.isoformat(), 'after_id': pk}
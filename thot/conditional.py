@@ -0,0 +1,130 @@
+"""
+GET condicional para listas y totales: ETag y Last-Modified a partir de la
+versión por unidad de negocio de thot.cache. Si el cliente ya tiene la
+versión vigente se responde 304 sin ejecutar las consultas de la lista.
+
+Las versiones viven en la caché, así que solo sirven si todos los workers
+ven la misma: con una caché local por proceso (o sin caché) un worker que
+no vio el cambio respondería 304 con datos viejos, y no se usa
+"""
+import hashlib
+
+from django.contrib import messages
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.urls import path
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.cache import never_cache
+
+from .cache import business_unit_ids_scope, get_data_version, get_tenant_version
+
+
+def conditional_get_enabled():
+    """
+    Si la caché por defecto es compartida entre procesos y se pueden usar
+    sus versiones para responder 304
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def tenant_validators(request, user, business_unit_ids, model, related_models=()):
+    """
+    (etag, last_modified) de la página de model que pide user sobre sus
+    unidades de negocio (None para superusuarios). El ETag cambia también
+    con la URL, el usuario y su token CSRF, las unidades que ve (al sumar
+    una unidad con cambios más viejos la versión no sube), el idioma, el
+    formato pedido y la versión de los modelos relacionados que se muestran
+    en la página
+    """
+    if user.is_superuser:
+        business_unit_ids = None
+    version = get_tenant_version(model, business_unit_ids)
+    parts = [
+        model._meta.label_lower,
+        str(version),
+        business_unit_ids_scope(business_unit_ids),
+        *(str(get_data_version(related)) for related in related_models),
+        str(user.pk),
+        request.META.get('CSRF_COOKIE', ''),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        translation.get_language() or '',
+    ]
+    etag = hashlib.sha1('\0'.join(parts).encode()).hexdigest()
+    return quote_etag(etag), version // 1_000_000_000
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Respuesta 304 si los validadores del cliente siguen vigentes, o None
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Agrega ETag y Last-Modified a una respuesta 200. El navegador la guarda
+    pero la revalida en cada pedido (no-cache) y solo para este usuario
+    """
+    if response.status_code not in (200, 304):
+        return response
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ConditionalChangelistMixin:
+    """
+    Changelist con GET condicional para modelos con business_unit. Si nada
+    cambió en las unidades del usuario, la lista y los totales del pie se
+    responden con 304. Los modelos de conditional_related_models se muestran
+    en la lista (nombres de unidades, tipos de gasto) y también invalidan
+    """
+    conditional_related_models = ()
+
+    def get_urls(self):
+        name = '%s_%s_changelist' % (self.opts.app_label, self.opts.model_name)
+        # El admin envuelve sus vistas con never_cache (no-store) y el
+        # navegador no guardaría la página para revalidarla
+        view = self.admin_site.admin_view(
+            self.conditional_changelist_view, cacheable=True
+        )
+        view.model_admin = self
+        return [
+            path('', view, name=name) if getattr(url, 'name', None) == name else url
+            for url in super().get_urls()
+        ]
+
+    def conditional_changelist_view(self, request, extra_context=None):
+        # Las acciones (POST) y las páginas con mensajes pendientes no se
+        # pueden reutilizar, ni nada sin una caché compartida
+        if (
+            not conditional_get_enabled() or
+            request.method not in ('GET', 'HEAD') or
+            len(messages.get_messages(request)) or
+            not self.has_view_or_change_permission(request)
+        ):
+            return never_cache(self.changelist_view)(request, extra_context)
+
+        etag, last_modified = tenant_validators(
+            request,
+            request.user,
+            request.user_business_units,
+            self.model,
+            self.conditional_related_models
+        )
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(
+            self.changelist_view(request, extra_context), etag, last_modified
+        )
@@ -0,0 +1,102 @@
+"""
+Descarga de archivos de MEDIA_ROOT con control de acceso. Django verifica
+el usuario y la unidad de negocio dueña del archivo y nginx hace la
+transferencia (X-Accel-Redirect a una location internal), sin ocupar un
+worker mientras viajan los bytes.
+
+El dueño se deduce de la ruta:
+    units/<id>/...   usuarios asignados a la unidad de negocio
+    users/<id>/...   el propio usuario (exportaciones, por ejemplo)
+    cualquier otra   solo superusuarios
+"""
+import mimetypes
+import posixpath
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from django.utils.encoding import iri_to_uri
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import require_safe
+
+from .api import get_api_user, get_user_business_unit_ids
+
+
+def business_unit_media_path(business_unit_id, *parts):
+    """
+    Ruta relativa a MEDIA_ROOT para archivos de una unidad de negocio
+    """
+    return posixpath.join('units', str(business_unit_id), *parts)
+
+
+def user_media_path(user_id, *parts):
+    """
+    Ruta relativa a MEDIA_ROOT para archivos de un usuario
+    """
+    return posixpath.join('users', str(user_id), *parts)
+
+
+def can_access_media(user, path):
+    """
+    Indica si user puede descargar path (relativa a MEDIA_ROOT)
+    """
+    if user.is_superuser:
+        return True
+
+    owner, _, rest = path.partition('/')
+    owner_id, _, filename = rest.partition('/')
+    if not owner_id.isdigit() or not filename:
+        return False
+    if owner == 'units':
+        return int(owner_id) in get_user_business_unit_ids(user)
+    if owner == 'users':
+        return int(owner_id) == user.pk
+    return False
+
+
+def send_media_file(path, as_attachment=True):
+    """
+    Respuesta que entrega el archivo path (relativa a MEDIA_ROOT, ya
+    autorizada). Detrás de nginx solo lleva X-Accel-Redirect; sin
+    MEDIA_ACCEL_REDIRECT (runserver) lo envía Django
+    """
+    full_path = Path(settings.MEDIA_ROOT, path)
+    if not full_path.is_file():
+        raise Http404('El archivo no existe.')
+
+    if not settings.MEDIA_ACCEL_REDIRECT:
+        return FileResponse(full_path.open('rb'), as_attachment=as_attachment)
+
+    content_type, encoding = mimetypes.guess_type(full_path.name)
+    # Un .gz se entrega tal cual, sin que el navegador lo descomprima
+    if encoding or not content_type:
+        content_type = 'application/octet-stream'
+    response = HttpResponse(content_type=content_type)
+    response.headers['Content-Disposition'] = content_disposition_header(
+        as_attachment, full_path.name
+    )
+    response.headers['X-Accel-Redirect'] = iri_to_uri(
+        settings.MEDIA_ACCEL_REDIRECT + path
+    )
+    return response
+
+
+@require_safe
+def protected_media(request, path):
+    """
+    Descarga de MEDIA_ROOT para usuarios del admin (sesión) o de la API
+    (JWT). Un archivo ajeno responde 404, igual que uno inexistente
+    """
+    user = get_api_user(request)
+    if user is None:
+        return redirect_to_login(request.get_full_path(), reverse('admin:login'))
+
+    path = posixpath.normpath(path).lstrip('/')
+    if path.startswith('..') or not can_access_media(user, path):
+        raise Http404('El archivo no existe.')
+
+    response = send_media_file(path)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -1,25 +1,64 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
 from django.db.models import Q
+from django.middleware.gzip import GZipMiddleware
 from tenant.models import BusinessUnitUser
 
 
 class BusinessUnitMiddleware:
+    # Funciona tanto bajo WSGI como ASGI sin cambiar de contexto
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        if request.user.is_authenticated:
-            # Obtener las unidades de negocio del usuario
-            user_business_units = BusinessUnitUser.objects.filter(
-                user=request.user
-            ).values_list('business_unit_id', flat=True)
-
-            # Agregar el queryset base a la request para uso posterior
-            request.user_business_units = user_business_units
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
 
-            # Crear un filtro base para usar en los modelos
-            request.business_unit_filter = Q(
-                business_unit_id__in=user_business_units
-            )
+        if request.user.is_authenticated:
+            self.set_business_unit_filter(request, request.user)
 
         response = self.get_response(request)
         return response
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        if user.is_authenticated:
+            self.set_business_unit_filter(request, user)
+
+        return await self.get_response(request)
+
+    def set_business_unit_filter(self, request, user):
+        # Obtener las unidades de negocio del usuario
+        user_business_units = BusinessUnitUser.objects.filter(
+            user=user
+        ).values_list('business_unit_id', flat=True)
+
+        # Agregar el queryset base a la request para uso posterior
+        request.user_business_units = user_business_units
+
+        # Crear un filtro base para usar en los modelos
+        request.business_unit_filter = Q(
+            business_unit_id__in=user_business_units
+        )
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware limitado a HTML y JSON desde GZIP_MIN_LENGTH bytes: los
+    estáticos ya llegan comprimidos (whitenoise o nginx) y en respuestas
+    chicas no se gana nada. Hereda la mitigación de BREACH de Django
+    """
+    compressible_types = ('text/html', 'application/json')
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in self.compressible_types:
+            return response
+        if not response.streaming and len(response.content) < settings.GZIP_MIN_LENGTH:
+            return response
+        return super().process_response(request, response)
@@ -1,18 +1,57 @@
 from django.db import models
+from django.utils import timezone
 
 
-class TimestampsMixin(models.Model):
+class SoftDeleteQuerySet(models.QuerySet):
     """
-    Abstract model for TimestampsMixin
+    QuerySet with soft delete operations based on deleted_at
     """
 
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+    def alive(self):
+        return self.filter(deleted_at__isnull=True)
+
+    def deleted(self):
+        return self.filter(deleted_at__isnull=False)
+
+    def soft_delete(self):
+        """
+        Method that marks the rows as deleted with a single UPDATE.
+        """
+        now = timezone.now()
+        return self.filter(
+            deleted_at__isnull=True
+        ).update(deleted_at=now, updated_at=now)
+
+    def restore(self):
+        return self.filter(
+            deleted_at__isnull=False
+        ).update(deleted_at=None, updated_at=timezone.now())
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """
+    Default manager that excludes soft deleted rows
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class SoftDeleteModel(models.Model):
+    """
+    Abstract model for soft delete. The concrete model must define
+    deleted_at and updated_at.
+
+    `objects` only returns live rows; `all_objects` also returns the
+    deleted ones.
+    """
+
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
 
     class Meta:
         """
-        Meta class for TimestampsMixin
+        Meta class for SoftDeleteModel
         """
 
         abstract = True
@@ -23,3 +62,34 @@ class TimestampsMixin(models.Model):
         Method that checks if deleted_at is not None.
         """
         return self.deleted_at is not None
+
+    def soft_delete(self):
+        """
+        Method that marks the instance as deleted.
+        """
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at', 'updated_at'])
+
+    def restore(self):
+        """
+        Method that clears deleted_at.
+        """
+        self.deleted_at = None
+        self.save(update_fields=['deleted_at', 'updated_at'])
+
+
+class TimestampsMixin(SoftDeleteModel):
+    """
+    Abstract model for TimestampsMixin
+    """
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        """
+        Meta class for TimestampsMixin
+        """
+
+        abstract = True
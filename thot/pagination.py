@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class BusinessUnitCursorPagination(CursorPagination):
+    """
+    Paginación por cursor: el costo de cada página no depende de la
+    posición, a diferencia de LIMIT/OFFSET
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = '-id'
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
 
+from datetime import timedelta
 from os import getenv as env
 from pathlib import Path
 
@@ -41,12 +42,13 @@ ALLOWED_HOSTS = ['*']
 INSTALLED_APPS = [
     'admin_interface',
     'colorfield',
-    'django.contrib.admin',
+    'thot.apps.ThotAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # Third-party apps
     'rest_framework',
     'rangefilter',
@@ -55,12 +57,15 @@ INSTALLED_APPS = [
     'expenses',
     'incomes',
     'products',
+    'reports',
     'suppliers',
     'tenant',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Antes que todo lo que lee o escribe el cuerpo de la respuesta
+    'thot.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,12 +76,15 @@ MIDDLEWARE = [
     'thot.middleware.BusinessUnitMiddleware',
 ]
 
+# Tamaño mínimo de HTML o JSON para comprimir la respuesta
+GZIP_MIN_LENGTH = int(env('GZIP_MIN_LENGTH', 1024))
+
 ROOT_URLCONF = 'thot.urls'
 
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -85,11 +93,15 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'libraries': {
+                'thot_admin': 'thot.templatetags.thot_admin',
+            },
         },
     },
 ]
 
 WSGI_APPLICATION = 'thot.wsgi.application'
+ASGI_APPLICATION = 'thot.asgi.application'
 
 
 # Database
@@ -125,6 +137,32 @@ else:
     }
 
 
+# Caché. Con varios workers conviene una compartida, por ejemplo
+# CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache y
+# CACHE_LOCATION=django_cache (crear con manage.py createcachetable).
+# Por defecto, memoria local de cada proceso
+CACHES = {
+    'default': {
+        'BACKEND': str(env(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        )),
+        'LOCATION': str(env('CACHE_LOCATION', '')),
+        'TIMEOUT': int(env('CACHE_TIMEOUT', 300)),
+    }
+}
+
+# Vigencia de las versiones por unidad de negocio que arman los ETag de las
+# listas. Los GET condicionales (thot.conditional) solo se usan con una caché
+# compartida entre workers (CACHE_BACKEND redis, memcached, base de datos o
+# archivos); con ella se puede usar 0 (sin vencimiento)
+TENANT_VERSION_TIMEOUT = int(env('TENANT_VERSION_TIMEOUT', 60)) or None
+
+# Usuario y permisos en caché entre requests, solo con una caché compartida
+AUTHENTICATION_BACKENDS = [
+    'thot.auth.CachedModelBackend',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -167,6 +205,9 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Configuración para archivos de medios
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Location internal de nginx que sirve MEDIA_ROOT (ver thot.media). Vacío,
+# Django envía los archivos él mismo
+MEDIA_ACCEL_REDIRECT = str(env('MEDIA_ACCEL_REDIRECT', ''))
 
 X_FRAME_OPTIONS = 'SAMEORIGIN'
 
@@ -179,3 +220,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 SESSION_COOKIE_AGE = int(env("SESSION_COOKIE_AGE", 1800))
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_SAVE_EVERY_REQUEST = True
+
+# API REST
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+    ),
+    'DEFAULT_PERMISSION_CLASSES': (
+        'rest_framework.permissions.DjangoModelPermissions',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'thot.pagination.BusinessUnitCursorPagination',
+}
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(
+        minutes=int(env("JWT_ACCESS_TOKEN_MINUTES") or 30)
+    ),
+    'REFRESH_TOKEN_LIFETIME': timedelta(
+        days=int(env("JWT_REFRESH_TOKEN_DAYS") or 1)
+    ),
+}
@@ -0,0 +1,17 @@
+from django import template
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+
+from thot.admin_filters import cached_date_hierarchy
+
+register = template.Library()
+
+
+@register.tag(name='cached_date_hierarchy')
+def cached_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=cached_date_hierarchy,
+        template_name='date_hierarchy.html',
+        takes_context=False,
+    )
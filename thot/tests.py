@@ -0,0 +1,150 @@
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tenant.models import BusinessUnit, BusinessUnitUser, Customer
+
+from .media import business_unit_media_path, user_media_path
+
+User = get_user_model()
+
+
+class ProtectedMediaTests(TestCase):
+    """
+    Los archivos de medios se descargan solo con acceso a la unidad de
+    negocio o al usuario dueño, y los envía nginx
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = User.objects.create_user(
+            'media-operator', 'media-operator@example.com', 'x', is_staff=True
+        )
+        customer = Customer.objects.create(name='Medios', email='medios@example.com')
+        cls.own_unit = BusinessUnit.objects.create(customer=customer, name='Propia')
+        cls.other_unit = BusinessUnit.objects.create(customer=customer, name='Ajena')
+        BusinessUnitUser.objects.create(user=cls.operator, business_unit=cls.own_unit)
+
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(
+            MEDIA_ROOT=media_root, MEDIA_ACCEL_REDIRECT='/protected-media/'
+        ))
+        self.paths = {
+            'own': business_unit_media_path(self.own_unit.pk, 'recibo.pdf'),
+            'other': business_unit_media_path(self.other_unit.pk, 'recibo.pdf'),
+            'user': user_media_path(self.operator.pk, 'ingresos.csv'),
+            'shared': 'otros/archivo.txt',
+        }
+        for path in self.paths.values():
+            full_path = Path(media_root, path)
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            full_path.write_bytes(b'contenido')
+        self.client.force_login(self.operator)
+
+    def get(self, path):
+        return self.client.get(f'/media/{path}')
+
+    def test_owned_files_go_through_nginx(self):
+        for key in ('own', 'user'):
+            response = self.get(self.paths[key])
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response['X-Accel-Redirect'], f'/protected-media/{self.paths[key]}'
+            )
+            self.assertFalse(response.content)
+
+    def test_foreign_files_are_hidden(self):
+        for path in (self.paths['other'], self.paths['shared'], 'units/../otros/archivo.txt'):
+            self.assertEqual(self.get(path).status_code, 404)
+
+    def test_anonymous_redirects_to_login(self):
+        self.client.logout()
+        response = self.get(self.paths['own'])
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response['Location'])
+
+    def test_without_nginx(self):
+        with override_settings(MEDIA_ACCEL_REDIRECT=''):
+            response = self.get(self.paths['own'])
+        self.assertEqual(b''.join(response.streaming_content), b'contenido')
+
+
+class TenantAutocompleteTests(TestCase):
+    """
+    Autocompletado de unidades de negocio en el formulario de gastos:
+    limitado a las unidades del usuario, en caché hasta que cambian los
+    datos, y permitido a quien puede cargar gastos
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = User.objects.create_user(
+            'autocomplete-operator', 'autocomplete@example.com', 'x', is_staff=True
+        )
+        cls.operator.user_permissions.set(Permission.objects.filter(
+            content_type__app_label='expenses', codename='add_expenses'
+        ))
+        customer = Customer.objects.create(
+            name='Autocompletar', email='autocompletar@example.com'
+        )
+        cls.own_unit = BusinessUnit.objects.create(customer=customer, name='Propia')
+        cls.other_unit = BusinessUnit.objects.create(customer=customer, name='Ajena')
+        BusinessUnitUser.objects.create(user=cls.operator, business_unit=cls.own_unit)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.operator)
+
+    def search(self):
+        return self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'expenses',
+            'model_name': 'expenses',
+            'field_name': 'business_unit',
+            'term': 'autocompletar',
+        })
+
+    def results(self):
+        response = self.search()
+        self.assertEqual(response.status_code, 200)
+        return [
+            (int(row['id']), row['text']) for row in response.json()['results']
+        ]
+
+    def test_only_own_units(self):
+        # Sin permisos sobre las unidades de negocio: alcanza con cargar gastos
+        self.assertEqual(
+            self.results(), [(self.own_unit.pk, 'Autocompletar - Propia')]
+        )
+
+        admin = User.objects.create_superuser(
+            'autocomplete-admin', 'autocomplete-admin@example.com', 'x'
+        )
+        self.client.force_login(admin)
+        self.assertEqual(
+            {pk for pk, _ in self.results()}, {self.own_unit.pk, self.other_unit.pk}
+        )
+
+    def test_without_permission(self):
+        self.operator.user_permissions.clear()
+        self.assertEqual(self.search().status_code, 403)
+
+    def test_cached_until_data_changes(self):
+        self.results()
+
+        # Un UPDATE en bloque no sube la versión: sigue la respuesta en caché
+        BusinessUnit.objects.filter(pk=self.own_unit.pk).update(name='Renombrada')
+        self.assertEqual(
+            self.results(), [(self.own_unit.pk, 'Autocompletar - Propia')]
+        )
+
+        self.own_unit.refresh_from_db()
+        self.own_unit.save()
+        self.assertEqual(
+            self.results(), [(self.own_unit.pk, 'Autocompletar - Renombrada')]
+        )
@@ -14,16 +14,36 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.conf import settings
 from django.contrib import admin
-from django.urls import path
-from django.views.static import serve
+from django.urls import include, path
 from django.views.generic import RedirectView
+from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import (
+    TokenObtainPairView, TokenRefreshView
+)
+
+from expenses.views import ExpensesViewSet, ExpenseTypeViewSet, expense_stats
+from incomes.views import IncomeViewSet, income_stats
+from suppliers.views import SupplierViewSet
+from thot.media import protected_media
+
+router = DefaultRouter()
+router.register('incomes', IncomeViewSet)
+router.register('expenses', ExpensesViewSet)
+router.register('expense-types', ExpenseTypeViewSet)
+router.register('suppliers', SupplierViewSet)
 
 urlpatterns = [
     path('', RedirectView.as_view(url='/panel/login/', permanent=True)),
     path('panel/', admin.site.urls),
 
-    # Servir archivos de medios incluso en producción
-    path('media/<path:path>', serve, {'document_root': settings.MEDIA_ROOT}),
+    # API REST
+    path('api/stats/incomes/', income_stats, name='income_stats'),
+    path('api/stats/expenses/', expense_stats, name='expense_stats'),
+    path('api/', include(router.urls)),
+    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+
+    # Archivos de medios: Django controla el acceso y nginx los envía
+    path('media/<path:path>', protected_media, name='protected_media'),
 ]
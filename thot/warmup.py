@@ -0,0 +1,132 @@
+"""
+Precarga de la aplicación antes de crear los workers. uwsgi importa
+thot.wsgi en el master y luego hace fork: lo que se cargue aquí (módulos,
+URLs resueltas, plantillas compiladas) lo comparten todos los workers por
+copy-on-write, y los que se crean bajo carga o al reciclarse atienden su
+primer request sin pagar ese costo.
+
+No debe abrir conexiones a la base ni a la caché: el socket quedaría
+compartido entre procesos
+"""
+import gc
+import importlib
+import logging
+import os
+import time
+
+from django.contrib import admin
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.forms.renderers import get_default_renderer
+from django.template.loader import get_template, select_template
+from django.urls import NoReverseMatch, resolve, reverse
+
+logger = logging.getLogger(__name__)
+
+# Se importan recién al exportar o al atender la API
+MODULES = (
+    'openpyxl',
+    'tablib',
+    'import_export.admin',
+    'import_export.formats.base_formats',
+    'rest_framework.renderers',
+    'rest_framework.parsers',
+    'rest_framework_simplejwt.authentication',
+    'rangefilter.filters',
+)
+
+# Plantillas que incluyen o extienden las páginas del admin
+TEMPLATES = (
+    'admin/index.html',
+    'admin/login.html',
+    'admin/base.html',
+    'admin/base_site.html',
+    'admin/app_list.html',
+    'admin/nav_sidebar.html',
+    'admin/change_list_results.html',
+    'admin/change_list_object_tools.html',
+    'admin/actions.html',
+    'admin/filter.html',
+    'admin/date_hierarchy.html',
+    'admin/pagination.html',
+    'admin/search_form.html',
+    'admin/submit_line.html',
+    'admin/includes/fieldset.html',
+    'admin/edit_inline/tabular.html',
+    'admin/edit_inline/stacked.html',
+    'admin/prepopulated_fields_js.html',
+    'admin/fast_delete_confirmation.html',
+)
+
+# Plantillas de los widgets, que usan su propio motor (FORM_RENDERER)
+FORM_TEMPLATES = (
+    'django/forms/widgets/attrs.html',
+    'django/forms/widgets/input.html',
+    'django/forms/widgets/text.html',
+    'django/forms/widgets/number.html',
+    'django/forms/widgets/email.html',
+    'django/forms/widgets/date.html',
+    'django/forms/widgets/checkbox.html',
+    'django/forms/widgets/hidden.html',
+    'django/forms/widgets/textarea.html',
+    'django/forms/widgets/select.html',
+    'django/forms/widgets/select_option.html',
+    'django/forms/widgets/splitdatetime.html',
+    'django/forms/widgets/multiwidget.html',
+    'admin/widgets/related_widget_wrapper.html',
+    'admin/widgets/split_datetime.html',
+)
+
+ADMIN_VIEWS = ('changelist', 'add')
+ADMIN_TEMPLATES = ('change_list.html', 'change_form.html')
+
+
+def warm_up():
+    """
+    Importa los módulos de uso diferido, compila las URLs y plantillas del
+    admin y congela los objetos creados para que el recolector de basura
+    no toque sus páginas de memoria en los workers
+    """
+    if os.environ.get('THOT_WARMUP', '1') == '0':
+        return
+
+    started = time.perf_counter()
+
+    for module in MODULES:
+        importlib.import_module(module)
+
+    for model in admin.site._registry:
+        opts = model._meta
+        for view in ADMIN_VIEWS:
+            try:
+                resolve(reverse(f'admin:{opts.app_label}_{opts.model_name}_{view}'))
+            except NoReverseMatch:
+                continue
+        for name in ADMIN_TEMPLATES:
+            select_template([
+                f'admin/{opts.app_label}/{opts.model_name}/{name}',
+                f'admin/{opts.app_label}/{name}',
+                f'admin/{name}',
+            ])
+
+    for name in ('admin:index', 'api-root'):
+        resolve(reverse(name))
+
+    for name in TEMPLATES:
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            pass
+
+    renderer = get_default_renderer()
+    for name in FORM_TEMPLATES:
+        try:
+            renderer.get_template(name)
+        except TemplateDoesNotExist:
+            pass
+
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+
+    logger.info('Warm-up en %.0f ms', (time.perf_counter() - started) * 1000)